@@ -2,18 +2,32 @@
 Embedding provider abstraction for the semantic search API.
 
 This module provides a pluggable architecture for embedding generation,
-allowing the service to use different providers (Ollama, Gemini, etc.)
+allowing the service to use different providers (Ollama, Gemini, a local ONNX model)
 without changing core search logic.
 """
 
-from app.embeddings.base import EmbeddingClient
+from app.embeddings.base import AsyncEmbeddingClient, EmbeddingClient, as_embedding_matrix, close_embedding_client
+from app.embeddings.batching import AsyncBatchingEmbeddingClient
+from app.embeddings.cache import AsyncCachedEmbeddingClient, CachedEmbeddingClient, EmbeddingCache
 from app.embeddings.factory import EmbeddingProviderFactory
-from app.embeddings.ollama_client import OllamaEmbeddingClient
-from app.embeddings.gemini_client import GeminiEmbeddingClient
+from app.embeddings.ollama_client import AsyncOllamaEmbeddingClient, OllamaEmbeddingClient
+from app.embeddings.gemini_client import AsyncGeminiEmbeddingClient, GeminiEmbeddingClient
+from app.embeddings.local_client import AsyncLocalOnnxEmbeddingClient, LocalOnnxEmbeddingClient
 
 __all__ = [
     "EmbeddingClient",
+    "AsyncEmbeddingClient",
     "EmbeddingProviderFactory",
     "OllamaEmbeddingClient",
+    "AsyncOllamaEmbeddingClient",
     "GeminiEmbeddingClient",
+    "AsyncGeminiEmbeddingClient",
+    "LocalOnnxEmbeddingClient",
+    "AsyncLocalOnnxEmbeddingClient",
+    "EmbeddingCache",
+    "CachedEmbeddingClient",
+    "AsyncCachedEmbeddingClient",
+    "AsyncBatchingEmbeddingClient",
+    "as_embedding_matrix",
+    "close_embedding_client",
 ]
@@ -2,9 +2,17 @@
 Base embedding client protocol.
 
 Defines the interface that all embedding providers must implement.
+
+Embeddings are returned as C-contiguous float32 NumPy arrays: embed() gives
+a (texts, dimensions) matrix and embed_one() a single row. Compared with
+nested lists of Python floats this uses about 8x less memory in caches and
+lets rows be sliced, compared and normalized without copying element-wise.
 """
 
-from typing import List, Protocol
+import inspect
+from typing import Any, Iterator, List, Protocol
+
+import numpy as np
 
 
 class EmbeddingClient(Protocol):
@@ -14,7 +22,7 @@ class EmbeddingClient(Protocol):
     All embedding providers (Ollama, Gemini, etc.) must implement this interface.
     """
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts.
 
@@ -22,9 +30,8 @@ class EmbeddingClient(Protocol):
             texts: List of text strings to embed.
 
         Returns:
-            List of embedding vectors, one per input text.
-            Each vector is a list of floats.
-            Order must match input order.
+            float32 matrix of shape (len(texts), dimensions), one row per
+            input text. Order must match input order.
 
         Raises:
             EmbeddingProviderError: On provider-specific failures.
@@ -32,7 +39,7 @@ class EmbeddingClient(Protocol):
         """
         ...
 
-    def embed_one(self, text: str) -> List[float]:
+    def embed_one(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text.
 
@@ -42,7 +49,49 @@ class EmbeddingClient(Protocol):
             text: Text string to embed.
 
         Returns:
-            Embedding vector as a list of floats.
+            Embedding vector as a 1-D float32 array.
+
+        Raises:
+            EmbeddingProviderError: On provider-specific failures.
+            ValueError: On invalid input (e.g., empty text).
+        """
+        ...
+
+
+class AsyncEmbeddingClient(Protocol):
+    """
+    Async variant of the EmbeddingClient protocol.
+
+    Used by the async search pipeline so that waiting on the embedding
+    provider does not block the event loop.
+    """
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts.
+
+        Args:
+            texts: List of text strings to embed.
+
+        Returns:
+            float32 matrix of shape (len(texts), dimensions), one row per
+            input text. Order must match input order.
+
+        Raises:
+            EmbeddingProviderError: On provider-specific failures.
+            ValueError: On invalid input (e.g., empty texts).
+        """
+        ...
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a single text.
+
+        Args:
+            text: Text string to embed.
+
+        Returns:
+            Embedding vector as a 1-D float32 array.
 
         Raises:
             EmbeddingProviderError: On provider-specific failures.
@@ -59,3 +108,61 @@ class EmbeddingProviderError(Exception):
     (network, auth, rate limit, etc.).
     """
     pass
+
+
+def iter_batches(texts: List[str], batch_size: int) -> Iterator[List[str]]:
+    """
+    Split texts into consecutive chunks of at most batch_size items.
+
+    Used by providers to respect their per-request batch limits.
+    """
+    for start in range(0, len(texts), batch_size):
+        yield texts[start:start + batch_size]
+
+
+def as_embedding_matrix(vectors: Any, normalize: bool = False) -> np.ndarray:
+    """
+    Convert embedding vectors to a C-contiguous float32 matrix.
+
+    Provider responses (lists of float lists) are converted in one pass;
+    float32 arrays are returned as is, without copying, unless normalize
+    is set.
+
+    Args:
+        vectors: Sequence of vectors or a 2-D array.
+        normalize: L2-normalize the rows (zero vectors are left unchanged).
+
+    Returns:
+        float32 array of shape (len(vectors), dimensions).
+
+    Raises:
+        EmbeddingProviderError: If the vectors do not form a 2-D matrix
+            (e.g. a provider returned vectors of different lengths).
+    """
+    try:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    except ValueError as e:
+        raise EmbeddingProviderError(f"Embedding vectors have inconsistent dimensions: {e}") from e
+    if matrix.ndim != 2:
+        raise EmbeddingProviderError(f"Expected a 2-D embedding matrix, got shape {matrix.shape}")
+    if normalize:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+    return matrix
+
+
+async def close_embedding_client(client: Any) -> None:
+    """
+    Release the connections or threads held by an embedding client.
+
+    Uses aclose() when the client has one (async HTTP clients), else close()
+    (sessions, thread pools). Cache and metrics wrappers forward attribute
+    lookups, so the provider client is reached through them.
+    """
+    close = getattr(client, "aclose", None) or getattr(client, "close", None)
+    if close is None:
+        return
+    result = close()
+    if inspect.isawaitable(result):
+        await result
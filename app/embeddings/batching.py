@@ -0,0 +1,192 @@
+"""
+Micro-batching scheduler for async embedding clients.
+
+Concurrent requests usually embed one or two queries each. The scheduler
+queues texts from all callers and sends them to the provider as one embed()
+call once max_batch_size texts are waiting or the oldest text has waited
+max_wait_ms, then hands each caller its own vectors. Providers such as
+Ollama process one batched call far more efficiently than many small ones;
+the cost is at most max_wait_ms of added latency per call.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+import numpy as np
+
+from app.embeddings.base import (
+    AsyncEmbeddingClient, EmbeddingProviderError, as_embedding_matrix, close_embedding_client
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AsyncBatchingEmbeddingClient:
+    """
+    Async embedding client wrapper merging concurrent embed() calls.
+
+    Identical texts within one flush are embedded once. embed_one() is passed
+    through unchanged, so it keeps using the provider's single-text endpoint.
+    """
+
+    def __init__(self, client: AsyncEmbeddingClient, max_batch_size: int = 32,
+                 max_wait_ms: float = 3.0, max_queue_size: int = 1024,
+                 on_batch: Optional[Callable[[int, float], None]] = None):
+        """
+        Args:
+            client: Async embedding client to send merged batches to.
+            max_batch_size: Texts per merged call; reaching it flushes immediately.
+            max_wait_ms: Longest time a text waits for other texts to join its batch.
+            max_queue_size: Maximum texts waiting; further calls are rejected.
+            on_batch: Optional callback (batch size, seconds the oldest text waited)
+                called for every flush, e.g. to record metrics.
+
+        Raises:
+            ValueError: If a size is not positive or max_wait_ms is negative.
+        """
+        if max_batch_size < 1 or max_queue_size < 1:
+            raise ValueError("max_batch_size and max_queue_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms cannot be negative")
+
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.on_batch = on_batch
+        self.queued_texts = 0
+        self.batches = 0
+        self.texts = 0
+        self.rejected = 0
+        self._queue: Deque[_Job] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()  # Strong references to batch tasks
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose wrapped client attributes (model, task_type, ...) unchanged
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Queue texts for the next merged call and wait for their vectors.
+
+        Raises:
+            EmbeddingProviderError: If the queue is full or the merged call fails.
+            ValueError: On empty input.
+        """
+        if not texts:
+            raise ValueError("texts list cannot be empty")
+        if self.queued_texts + len(texts) > self.max_queue_size:
+            self.rejected += 1
+            raise EmbeddingProviderError(
+                f"Embedding queue full ({self.queued_texts} texts waiting, limit {self.max_queue_size})"
+            )
+
+        loop = asyncio.get_running_loop()
+        job = _Job(list(texts), loop.create_future())
+        self._queue.append(job)
+        self.queued_texts += len(job.texts)
+
+        if self.queued_texts >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await job.future
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        return await self.client.embed_one(text)
+
+    def _take_batch(self) -> List[_Job]:
+        """Pop whole jobs up to max_batch_size texts (a larger job goes alone)."""
+        jobs: List[_Job] = []
+        size = 0
+        while self._queue and (not jobs or size + len(self._queue[0].texts) <= self.max_batch_size):
+            job = self._queue.popleft()
+            jobs.append(job)
+            size += len(job.texts)
+        self.queued_texts -= size
+        return jobs
+
+    def _flush(self) -> None:
+        """Send everything queued, in calls of at most max_batch_size texts."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            task = asyncio.ensure_future(self._run_batch(self._take_batch()))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    def _fail(jobs: List[_Job], error: BaseException) -> None:
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    async def _run_batch(self, jobs: List[_Job]) -> None:
+        unique = list(dict.fromkeys(text for job in jobs for text in job.texts))
+        size = sum(len(job.texts) for job in jobs)
+        self.batches += 1
+        self.texts += size
+        if self.on_batch is not None:
+            self.on_batch(size, time.monotonic() - jobs[0].enqueued_at)
+
+        try:
+            vectors = as_embedding_matrix(await self.client.embed(unique))
+            if len(vectors) != len(unique):
+                raise EmbeddingProviderError(
+                    f"Embedding provider returned {len(vectors)} vectors for {len(unique)} texts"
+                )
+        except Exception as e:
+            logger.error(f"Batched embedding call failed ({size} texts): {str(e)}")
+            self._fail(jobs, e)
+            return
+        except BaseException:
+            # Cancelled (shutdown, timeout): waiting callers must not hang
+            logger.warning(f"Batched embedding call cancelled ({size} texts)")
+            self._fail(jobs, EmbeddingProviderError("Batched embedding call was cancelled"))
+            raise
+
+        row_of = {text: row for row, text in enumerate(unique)}
+        for job in jobs:
+            if not job.future.done():
+                # Fancy indexing gives each caller its own contiguous matrix
+                job.future.set_result(vectors[[row_of[text] for text in job.texts]])
+
+    async def aclose(self) -> None:
+        """Fail queued calls, cancel merged calls in flight and close the wrapped client."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queued, self._queue = list(self._queue), deque()
+        self.queued_texts = 0
+        self._fail(queued, EmbeddingProviderError("Embedding client closed"))
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        await close_embedding_client(self.client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and lifetime counters."""
+        return {
+            "queued_texts": self.queued_texts,
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
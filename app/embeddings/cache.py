@@ -0,0 +1,261 @@
+"""
+Query embedding cache.
+
+Wraps any EmbeddingClient (sync or async) with a bounded LRU/TTL cache so
+repeated query strings skip the embedding provider round trip entirely.
+Vectors are kept as read-only float32 rows (4 bytes per dimension).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.embeddings.base import AsyncEmbeddingClient, EmbeddingClient, as_embedding_matrix
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Approximate size of one Python float inside a list (float object + pointer)
+_LIST_FLOAT_BYTES = 32
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize query text for cache lookups.
+
+    Collapses runs of whitespace and trims the ends. Case is preserved
+    because embedding models are case-sensitive.
+    """
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _cached_row(vector: Any) -> np.ndarray:
+    """
+    Copy a vector for caching.
+
+    Rows of a provider matrix are views; storing them would keep the whole
+    matrix alive. The copy is read-only because it is shared between callers.
+    """
+    row = np.array(vector, dtype=np.float32)
+    row.flags.writeable = False
+    return row
+
+
+def _estimate_size(vector: Any) -> int:
+    """Estimate the memory held by a cached vector in bytes."""
+    nbytes = getattr(vector, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return len(vector) * _LIST_FLOAT_BYTES
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache with TTL expiry and an optional memory budget.
+
+    Entries are evicted least-recently-used first whenever max_entries or
+    max_bytes would be exceeded, and are treated as misses once older than
+    ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = 3600,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached vectors.
+            ttl_seconds: Entry lifetime in seconds (None or 0 disables expiry).
+            max_bytes: Optional memory budget for cached vectors.
+
+        Raises:
+            ValueError: If max_entries is not positive.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self.max_bytes = max_bytes or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached vector for key, or None on miss/expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            vector, stored_at, size = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.current_bytes -= size
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Hashable, vector: Any) -> None:
+        """Store a vector, evicting least-recently-used entries as needed."""
+        size = _estimate_size(vector)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+
+            self._entries[key] = (vector, time.monotonic(), size)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.current_bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class _CacheKeyMixin:
+    """Cache key construction shared by the sync and async wrappers."""
+
+    def _init_cache(self, client: Any, provider: str, cache: Optional[EmbeddingCache]) -> None:
+        self.client = client
+        self.provider = provider
+        self.cache = cache if cache is not None else EmbeddingCache()
+        # Everything besides the text that changes the resulting vector
+        self._key_prefix = (
+            provider,
+            getattr(client, "model", None),
+            getattr(client, "task_type", None),
+            getattr(client, "output_dimensionality", None),
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose wrapped client attributes (model, task_type, ...) unchanged
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _key(self, text: str) -> Tuple:
+        return self._key_prefix + (normalize_text(text),)
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[Optional[Any]], List[int]]:
+        """Return cached vectors (None for misses) and indices of missing texts."""
+        vectors = [self.cache.get(self._key(text)) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        return vectors, missing
+
+    def _fill(self, texts: List[str], vectors: List[Optional[Any]],
+              missing: List[int], fetched: Any) -> np.ndarray:
+        """Store fetched vectors and return all vectors as one matrix."""
+        if missing:
+            for index, vector in zip(missing, as_embedding_matrix(fetched)):
+                vectors[index] = vector
+                self.cache.put(self._key(texts[index]), _cached_row(vector))
+        return np.stack(vectors)
+
+
+class CachedEmbeddingClient(_CacheKeyMixin):
+    """
+    EmbeddingClient wrapper that serves repeated texts from an EmbeddingCache.
+
+    Only texts missing from the cache are sent to the wrapped client, in a
+    single embed() call.
+    """
+
+    def __init__(self, client: EmbeddingClient, provider: str,
+                 cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            client: Embedding client to wrap.
+            provider: Provider name, part of the cache key (e.g. "ollama").
+            cache: Cache instance to use (a default-sized one is created if omitted).
+        """
+        self._init_cache(client, provider, cache)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            raise ValueError("texts list cannot be empty")
+
+        vectors, missing = self._lookup(texts)
+        fetched = self.client.embed([texts[i] for i in missing]) if missing else None
+        return self._fill(texts, vectors, missing, fetched)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = _cached_row(self.client.embed_one(text))
+            self.cache.put(key, vector)
+        return vector
+
+
+class AsyncCachedEmbeddingClient(_CacheKeyMixin):
+    """Async counterpart of CachedEmbeddingClient."""
+
+    def __init__(self, client: AsyncEmbeddingClient, provider: str,
+                 cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            client: Async embedding client to wrap.
+            provider: Provider name, part of the cache key (e.g. "ollama").
+            cache: Cache instance to use (a default-sized one is created if omitted).
+        """
+        self._init_cache(client, provider, cache)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            raise ValueError("texts list cannot be empty")
+
+        vectors, missing = self._lookup(texts)
+        fetched = await self.client.embed([texts[i] for i in missing]) if missing else None
+        return self._fill(texts, vectors, missing, fetched)
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = _cached_row(await self.client.embed_one(text))
+            self.cache.put(key, vector)
+        return vector
@@ -6,11 +6,15 @@ Creates the appropriate embedding client based on environment configuration.
 
 import logging
 import os
-from typing import Optional
 
-from app.embeddings.base import EmbeddingClient
-from app.embeddings.ollama_client import OllamaEmbeddingClient
-from app.embeddings.gemini_client import GeminiEmbeddingClient
+from typing import Any, Callable, Dict, Optional
+
+from app.embeddings.base import AsyncEmbeddingClient, EmbeddingClient
+from app.embeddings.batching import AsyncBatchingEmbeddingClient
+from app.embeddings.cache import AsyncCachedEmbeddingClient, CachedEmbeddingClient, EmbeddingCache
+from app.embeddings.ollama_client import AsyncOllamaEmbeddingClient, OllamaEmbeddingClient
+from app.embeddings.gemini_client import AsyncGeminiEmbeddingClient, GeminiEmbeddingClient
+from app.embeddings.local_client import AsyncLocalOnnxEmbeddingClient, LocalOnnxEmbeddingClient
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +28,12 @@ class EmbeddingProviderFactory:
     """
 
     @staticmethod
-    def from_env() -> EmbeddingClient:
+    def from_env(wrap: Optional[Callable[[Any, str], Any]] = None) -> EmbeddingClient:
         """
         Create an embedding client based on environment configuration.
 
         Environment Variables:
-            EMBEDDING_PROVIDER: Provider name ("ollama" or "gemini"). Default: "ollama".
+            EMBEDDING_PROVIDER: Provider name ("ollama", "gemini" or "local"). Default: "ollama".
             
             For Ollama:
                 OLLAMA_HOST: Ollama server host.
@@ -40,6 +44,41 @@ class EmbeddingProviderFactory:
                 GEMINI_EMBEDDING_MODEL: Gemini model name (default: gemini-embedding-001).
                 GEMINI_EMBEDDING_TASK_TYPE: Task type (default: RETRIEVAL_QUERY).
                 GEMINI_EMBEDDING_DIM: Output dimensionality (default: 768).
+                GEMINI_BASE_URL: API base URL (default: the public v1beta endpoint).
+                GEMINI_HTTP_POOL_SIZE: Pooled keep-alive connections (default: 10).
+                GEMINI_HTTP_KEEPALIVE_SECONDS: Idle connection lifetime (default: 60).
+                GEMINI_HTTP2: Use HTTP/2 for the async client (default: false).
+
+            For local (in-process ONNX model, needs onnxruntime and tokenizers):
+                LOCAL_EMBEDDING_MODEL_DIR: Directory with the ONNX model and tokenizer.json (required).
+                LOCAL_EMBEDDING_MODEL_FILE: ONNX file name (default: model.onnx).
+                LOCAL_EMBEDDING_THREADS: Inference threads (default: 0, one per CPU core).
+                LOCAL_EMBEDDING_WORKERS: Concurrent inference runs of the async client (default: 1).
+                LOCAL_EMBEDDING_QUANTIZE: Run an int8 quantized copy of the model (default: false).
+                LOCAL_EMBEDDING_MAX_LENGTH: Tokens per text (default: 256).
+                LOCAL_EMBEDDING_POOLING: "mean" or "cls" (default: mean).
+                LOCAL_EMBEDDING_QUERY_PREFIX: Text prepended to every query (default: empty).
+
+            EMBEDDING_MAX_BATCH_SIZE: Optional cap on texts per provider call
+                (default: 64 for Ollama, 100 for Gemini, 32 for local).
+            EMBEDDING_NORMALIZE: L2-normalize Ollama/Gemini vectors (default: false;
+                the local provider always normalizes).
+
+            Query embedding cache:
+                EMBEDDING_CACHE_ENABLED: Wrap the client in an LRU/TTL cache (default: false).
+                EMBEDDING_CACHE_MAX_ENTRIES: Maximum cached vectors (default: 10000).
+                EMBEDDING_CACHE_MAX_BYTES: Optional memory budget in bytes (default: 0, unlimited).
+                EMBEDDING_CACHE_TTL_SECONDS: Entry lifetime (default: 3600, 0 disables expiry).
+
+            Micro-batching (async clients only, see async_from_env()):
+                EMBEDDING_BATCHING_ENABLED: Merge concurrent embed() calls (default: false).
+                EMBEDDING_BATCH_MAX_TEXTS: Texts per merged call (default: 32).
+                EMBEDDING_BATCH_MAX_WAIT_MS: Maximum wait for a batch to fill (default: 3).
+                EMBEDDING_BATCH_MAX_QUEUE: Maximum queued texts before rejecting (default: 1024).
+
+        Args:
+            wrap: Optional callable (client, provider) -> client applied to the
+                provider client before caching, e.g. to add metrics.
 
         Returns:
             Configured embedding client instance.
@@ -52,15 +91,78 @@ class EmbeddingProviderFactory:
         logger.info(f"Initializing embedding provider: {provider}")
 
         if provider == "ollama":
-            return EmbeddingProviderFactory._create_ollama_client()
+            client = EmbeddingProviderFactory._create_ollama_client()
+        elif provider == "gemini":
+            client = EmbeddingProviderFactory._create_gemini_client()
+        elif provider == "local":
+            config = EmbeddingProviderFactory._local_config()
+            config.pop("workers")
+            client = LocalOnnxEmbeddingClient(**config)
+        else:
+            raise ValueError(
+                f"Unknown EMBEDDING_PROVIDER: {provider}. "
+                "Supported values: 'ollama', 'gemini', 'local'"
+            )
+
+        if wrap is not None:
+            client = wrap(client, provider)
+
+        cache = EmbeddingProviderFactory._cache_from_env()
+        if cache is not None:
+            return CachedEmbeddingClient(client, provider=provider, cache=cache)
+        return client
+
+    @staticmethod
+    def async_from_env(wrap: Optional[Callable[[Any, str], Any]] = None,
+                       on_batch: Optional[Callable[[int, float], None]] = None) -> AsyncEmbeddingClient:
+        """
+        Create an async embedding client based on environment configuration.
+
+        Reads the same environment variables as from_env() and returns the
+        async variant of the selected provider. With EMBEDDING_BATCHING_ENABLED
+        the client is wrapped in an AsyncBatchingEmbeddingClient between the
+        provider (and wrap) and the cache, so only cache misses are merged.
+
+        Args:
+            wrap: Optional callable (client, provider) -> client applied to the
+                provider client before caching.
+            on_batch: Optional callback (batch size, wait seconds) for every
+                merged call when micro-batching is enabled.
+
+        Returns:
+            Configured async embedding client instance.
+
+        Raises:
+            ValueError: If configuration is invalid or missing required values.
+        """
+        provider = os.getenv("EMBEDDING_PROVIDER", "ollama").lower()
+
+        logger.info(f"Initializing async embedding provider: {provider}")
+
+        if provider == "ollama":
+            client = AsyncOllamaEmbeddingClient(**EmbeddingProviderFactory._ollama_config())
         elif provider == "gemini":
-            return EmbeddingProviderFactory._create_gemini_client()
+            client = AsyncGeminiEmbeddingClient(**EmbeddingProviderFactory._gemini_config())
+        elif provider == "local":
+            client = AsyncLocalOnnxEmbeddingClient(**EmbeddingProviderFactory._local_config())
         else:
             raise ValueError(
                 f"Unknown EMBEDDING_PROVIDER: {provider}. "
-                "Supported values: 'ollama', 'gemini'"
+                "Supported values: 'ollama', 'gemini', 'local'"
             )
 
+        if wrap is not None:
+            client = wrap(client, provider)
+
+        batching = EmbeddingProviderFactory._batching_from_env()
+        if batching is not None:
+            client = AsyncBatchingEmbeddingClient(client, on_batch=on_batch, **batching)
+
+        cache = EmbeddingProviderFactory._cache_from_env()
+        if cache is not None:
+            return AsyncCachedEmbeddingClient(client, provider=provider, cache=cache)
+        return client
+
     @staticmethod
     def _create_ollama_client() -> OllamaEmbeddingClient:
         """
@@ -69,6 +171,93 @@ class EmbeddingProviderFactory:
         Returns:
             Configured OllamaEmbeddingClient.
 
+        Raises:
+            ValueError: If required env vars are missing.
+        """
+        return OllamaEmbeddingClient(**EmbeddingProviderFactory._ollama_config())
+
+    @staticmethod
+    def _create_gemini_client() -> GeminiEmbeddingClient:
+        """
+        Create Gemini embedding client from environment.
+
+        Returns:
+            Configured GeminiEmbeddingClient.
+
+        Raises:
+            ValueError: If required env vars are missing.
+        """
+        return GeminiEmbeddingClient(**EmbeddingProviderFactory._gemini_config())
+
+    @staticmethod
+    def _cache_from_env() -> Optional[EmbeddingCache]:
+        """
+        Create the query embedding cache if EMBEDDING_CACHE_ENABLED=true.
+
+        Returns:
+            Configured EmbeddingCache, or None when caching is disabled.
+
+        Raises:
+            ValueError: If a cache setting is not a valid number.
+        """
+        if os.getenv("EMBEDDING_CACHE_ENABLED", "false").lower() != "true":
+            return None
+
+        settings = {}
+        for env_name, key, default in (
+            ("EMBEDDING_CACHE_MAX_ENTRIES", "max_entries", "10000"),
+            ("EMBEDDING_CACHE_MAX_BYTES", "max_bytes", "0"),
+            ("EMBEDDING_CACHE_TTL_SECONDS", "ttl_seconds", "3600"),
+        ):
+            value = os.getenv(env_name, default) or default
+            try:
+                settings[key] = int(value)
+            except ValueError:
+                raise ValueError(f"{env_name} must be an integer, got: {value}")
+
+        logger.info(
+            f"Query embedding cache enabled (max_entries={settings['max_entries']}, "
+            f"max_bytes={settings['max_bytes']}, ttl={settings['ttl_seconds']}s)"
+        )
+        return EmbeddingCache(**settings)
+
+    @staticmethod
+    def _batching_from_env() -> Optional[Dict[str, Any]]:
+        """
+        Read micro-batching settings if EMBEDDING_BATCHING_ENABLED=true.
+
+        Returns:
+            AsyncBatchingEmbeddingClient keyword arguments, or None when disabled.
+
+        Raises:
+            ValueError: If a batching setting is not a valid number.
+        """
+        if os.getenv("EMBEDDING_BATCHING_ENABLED", "false").lower() != "true":
+            return None
+
+        settings: Dict[str, Any] = {}
+        for env_name, key, default, parse in (
+            ("EMBEDDING_BATCH_MAX_TEXTS", "max_batch_size", "32", int),
+            ("EMBEDDING_BATCH_MAX_WAIT_MS", "max_wait_ms", "3", float),
+            ("EMBEDDING_BATCH_MAX_QUEUE", "max_queue_size", "1024", int),
+        ):
+            value = os.getenv(env_name, default) or default
+            try:
+                settings[key] = parse(value)
+            except ValueError:
+                raise ValueError(f"{env_name} must be a number, got: {value}")
+
+        logger.info(
+            f"Embedding micro-batching enabled (max_texts={settings['max_batch_size']}, "
+            f"max_wait={settings['max_wait_ms']}ms, max_queue={settings['max_queue_size']})"
+        )
+        return settings
+
+    @staticmethod
+    def _ollama_config() -> Dict[str, Any]:
+        """
+        Read Ollama client settings from environment.
+
         Raises:
             ValueError: If required env vars are missing.
         """
@@ -80,18 +269,17 @@ class EmbeddingProviderFactory:
         if not model:
             raise ValueError("DEFAULT_EMBEDDING_MODEL is required when EMBEDDING_PROVIDER=ollama")
 
-        return OllamaEmbeddingClient(host=host, model=model)
+        config = {"host": host, "model": model, "normalize": EmbeddingProviderFactory._normalize_config()}
+        config.update(EmbeddingProviderFactory._batch_size_config())
+        return config
 
     @staticmethod
-    def _create_gemini_client() -> GeminiEmbeddingClient:
+    def _gemini_config() -> Dict[str, Any]:
         """
-        Create Gemini embedding client from environment.
-
-        Returns:
-            Configured GeminiEmbeddingClient.
+        Read Gemini client settings from environment.
 
         Raises:
-            ValueError: If required env vars are missing.
+            ValueError: If required env vars are missing or invalid.
         """
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -112,9 +300,85 @@ class EmbeddingProviderFactory:
                 f"GEMINI_EMBEDDING_DIM must be an integer, got: {dim_str}"
             )
 
-        return GeminiEmbeddingClient(
-            api_key=api_key,
-            model=model,
-            task_type=task_type,
-            output_dimensionality=output_dim,
-        )
+        pool_size = os.getenv("GEMINI_HTTP_POOL_SIZE", "10")
+        keepalive = os.getenv("GEMINI_HTTP_KEEPALIVE_SECONDS", "60")
+        try:
+            pool_size = int(pool_size)
+        except ValueError:
+            raise ValueError(f"GEMINI_HTTP_POOL_SIZE must be an integer, got: {pool_size}")
+        try:
+            keepalive = float(keepalive)
+        except ValueError:
+            raise ValueError(f"GEMINI_HTTP_KEEPALIVE_SECONDS must be a number, got: {keepalive}")
+
+        config = {
+            "api_key": api_key,
+            "model": model,
+            "task_type": task_type,
+            "output_dimensionality": output_dim,
+            "base_url": os.getenv("GEMINI_BASE_URL") or None,
+            "pool_size": pool_size,
+            "keepalive_seconds": keepalive,
+            "http2": os.getenv("GEMINI_HTTP2", "false").lower() == "true",
+            "normalize": EmbeddingProviderFactory._normalize_config(),
+        }
+        config.update(EmbeddingProviderFactory._batch_size_config())
+        return config
+
+    @staticmethod
+    def _local_config() -> Dict[str, Any]:
+        """
+        Read local ONNX client settings from environment.
+
+        Raises:
+            ValueError: If required env vars are missing or invalid.
+        """
+        model_dir = os.getenv("LOCAL_EMBEDDING_MODEL_DIR")
+        if not model_dir:
+            raise ValueError("LOCAL_EMBEDDING_MODEL_DIR is required when EMBEDDING_PROVIDER=local")
+
+        config: Dict[str, Any] = {
+            "model_dir": model_dir,
+            "model_file": os.getenv("LOCAL_EMBEDDING_MODEL_FILE") or "model.onnx",
+            "quantize": os.getenv("LOCAL_EMBEDDING_QUANTIZE", "false").lower() == "true",
+            "pooling": os.getenv("LOCAL_EMBEDDING_POOLING", "mean").lower(),
+            "query_prefix": os.getenv("LOCAL_EMBEDDING_QUERY_PREFIX", ""),
+        }
+        for env_name, key, default in (
+            ("LOCAL_EMBEDDING_THREADS", "threads", "0"),
+            ("LOCAL_EMBEDDING_WORKERS", "workers", "1"),
+            ("LOCAL_EMBEDDING_MAX_LENGTH", "max_length", "256"),
+        ):
+            value = os.getenv(env_name, default) or default
+            try:
+                config[key] = int(value)
+            except ValueError:
+                raise ValueError(f"{env_name} must be an integer, got: {value}")
+        config["threads"] = config["threads"] or None
+        config.update(EmbeddingProviderFactory._batch_size_config())
+        return config
+
+    @staticmethod
+    def _normalize_config() -> bool:
+        """Read EMBEDDING_NORMALIZE (L2-normalize provider vectors)."""
+        return os.getenv("EMBEDDING_NORMALIZE", "false").lower() == "true"
+
+    @staticmethod
+    def _batch_size_config() -> Dict[str, Any]:
+        """
+        Read the optional EMBEDDING_MAX_BATCH_SIZE override.
+
+        Returns:
+            {"max_batch_size": n} when set, otherwise an empty dict so the
+            provider default applies.
+
+        Raises:
+            ValueError: If the value is not an integer.
+        """
+        value = os.getenv("EMBEDDING_MAX_BATCH_SIZE")
+        if not value:
+            return {}
+        try:
+            return {"max_batch_size": int(value)}
+        except ValueError:
+            raise ValueError(f"EMBEDDING_MAX_BATCH_SIZE must be an integer, got: {value}")
@@ -2,13 +2,21 @@
 Google Gemini embedding client implementation.
 
 Integrates with the Gemini Embeddings API for query-time embedding generation.
+Requests go through a pooled keep-alive session (requests.Session for the
+sync client, httpx.AsyncClient with optional HTTP/2 for the async client), so
+repeated queries reuse warm TCP/TLS connections instead of opening one per call.
 """
 
+import asyncio
+import importlib.util
 import logging
+import httpx
+import numpy as np
 import requests
-from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional
 
-from app.embeddings.base import EmbeddingProviderError
+from app.embeddings.base import EmbeddingProviderError, as_embedding_matrix, iter_batches
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +30,12 @@ class GeminiEmbeddingClient:
     """
 
     # Gemini API endpoint
-    EMBED_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/{model}:embedContent"
-    BATCH_EMBED_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/{model}:batchEmbedContents"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    EMBED_ENDPOINT = "{base_url}/models/{model}:embedContent"
+    BATCH_EMBED_ENDPOINT = "{base_url}/models/{model}:batchEmbedContents"
+
+    # batchEmbedContents accepts at most 100 requests per call
+    MAX_BATCH_SIZE = 100
 
     def __init__(
         self,
@@ -32,6 +44,12 @@ class GeminiEmbeddingClient:
         task_type: str = "RETRIEVAL_QUERY",
         output_dimensionality: Optional[int] = 768,
         timeout: int = 5,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        base_url: Optional[str] = None,
+        pool_size: int = 10,
+        keepalive_seconds: float = 60.0,
+        http2: bool = False,
+        normalize: bool = False,
     ):
         """
         Initialize Gemini embedding client.
@@ -43,12 +61,26 @@ class GeminiEmbeddingClient:
             output_dimensionality: Output vector dimension (default: 768).
                 Must match Qdrant collection vector size.
             timeout: Request timeout in seconds (default: 5).
+            max_batch_size: Maximum texts per batchEmbedContents call
+                (default and upper bound: 100).
+            base_url: API base URL (default: BASE_URL), e.g. a local stand-in for tests.
+            pool_size: Maximum pooled connections (default: 10).
+            keepalive_seconds: Idle time before a pooled connection is dropped
+                (async client; default: 60).
+            http2: Use HTTP/2 for the async client (requires the h2 package).
+            normalize: L2-normalize the returned vectors (default: False).
 
         Raises:
-            ValueError: If api_key is empty or output_dimensionality is invalid.
+            ValueError: If api_key is empty, output_dimensionality or pool_size is invalid.
         """
         if not api_key or not api_key.strip():
             raise ValueError("api_key cannot be empty")
+
+        if not 1 <= max_batch_size <= self.MAX_BATCH_SIZE:
+            raise ValueError(f"max_batch_size must be between 1 and {self.MAX_BATCH_SIZE}")
+
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
         
         if output_dimensionality and output_dimensionality not in [128, 256, 512, 768, 1536, 2048, 3072]:
             logger.warning(
@@ -61,23 +93,46 @@ class GeminiEmbeddingClient:
         self.task_type = task_type
         self.output_dimensionality = output_dimensionality
         self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = http2
+        self.normalize = normalize
+
+        # Request templates: URLs, headers and per-text fields are built once
+        self._request_headers = {
+            "x-goog-api-key": api_key,
+            "Content-Type": "application/json",
+        }
+        self._embed_endpoint = self.EMBED_ENDPOINT.format(base_url=self.base_url, model=model)
+        self._batch_endpoint = self.BATCH_EMBED_ENDPOINT.format(base_url=self.base_url, model=model)
+        self._embed_fields: Dict[str, Any] = {}
+        if task_type:
+            self._embed_fields["task_type"] = task_type
+        if output_dimensionality:
+            self._embed_fields["output_dimensionality"] = output_dimensionality
+        self._batch_fields = {"model": f"models/{model}", **self._embed_fields}
+
+        self._session: Optional[requests.Session] = None
 
         logger.info(
             f"Initialized GeminiEmbeddingClient with model={model}, "
             f"task_type={task_type}, output_dim={output_dimensionality}"
         )
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts using Gemini.
 
-        Uses batch embedding endpoint for efficiency.
+        Uses batch embedding endpoint for efficiency, split into chunks of
+        at most max_batch_size texts.
 
         Args:
             texts: List of text strings to embed.
 
         Returns:
-            List of embedding vectors.
+            float32 matrix with one embedding per text.
 
         Raises:
             EmbeddingProviderError: On Gemini API failures.
@@ -91,63 +146,16 @@ class GeminiEmbeddingClient:
                 raise ValueError("text cannot be empty or whitespace-only")
 
         try:
-            # Build batch request payload
-            # Note: batchEmbedContents expects "requests" array with each request
-            # containing model, content, task_type, and output_dimensionality
-            requests_payload = []
-            for text in texts:
-                req = {
-                    "model": f"models/{self.model}",
-                    "content": {"parts": [{"text": text}]},
-                }
-                if self.task_type:
-                    req["task_type"] = self.task_type
-                if self.output_dimensionality:
-                    req["output_dimensionality"] = self.output_dimensionality
-                
-                requests_payload.append(req)
-
-            payload = {"requests": requests_payload}
-
-            # Call Gemini batch embeddings API
-            url = self.BATCH_EMBED_ENDPOINT.format(model=self.model)
-            headers = {
-                "x-goog-api-key": self.api_key,
-                "Content-Type": "application/json",
-            }
-
-            response = requests.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=self.timeout,
-            )
-
-            # Handle errors
-            if response.status_code != 200:
-                error_detail = self._sanitize_error(response)
-                logger.error(f"Gemini API error: {response.status_code} - {error_detail}")
-                raise EmbeddingProviderError(
-                    f"Gemini API returned {response.status_code}: {error_detail}"
-                )
-
-            # Parse response
-            data = response.json()
             embeddings = []
-            
-            for embedding_response in data.get("embeddings", []):
-                values = embedding_response.get("values", [])
-                if not values:
-                    raise EmbeddingProviderError("Gemini returned empty embedding")
-                embeddings.append(values)
-
-            if len(embeddings) != len(texts):
-                raise EmbeddingProviderError(
-                    f"Gemini returned {len(embeddings)} embeddings for {len(texts)} texts"
+            for batch in iter_batches(texts, self.max_batch_size):
+                response = self._get_session().post(
+                    self._batch_url(),
+                    json=self._build_batch_payload(batch),
+                    headers=self._headers(),
+                    timeout=self.timeout,
                 )
-
-            logger.debug(f"Generated {len(embeddings)} embeddings via Gemini")
-            return embeddings
+                embeddings.extend(self._parse_batch_response(response, len(batch)))
+            return as_embedding_matrix(embeddings, self.normalize)
 
         except requests.exceptions.Timeout:
             logger.error("Gemini API request timed out")
@@ -161,7 +169,7 @@ class GeminiEmbeddingClient:
             logger.error(f"Unexpected error in Gemini embedding: {e}")
             raise EmbeddingProviderError(f"Gemini embedding failed: {e}") from e
 
-    def embed_one(self, text: str) -> List[float]:
+    def embed_one(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text using Gemini.
 
@@ -169,7 +177,7 @@ class GeminiEmbeddingClient:
             text: Text string to embed.
 
         Returns:
-            Embedding vector.
+            Embedding vector (1-D float32 array).
 
         Raises:
             EmbeddingProviderError: On Gemini API failures.
@@ -179,47 +187,13 @@ class GeminiEmbeddingClient:
             raise ValueError("text cannot be empty or whitespace-only")
 
         try:
-            # Build request payload
-            payload = {
-                "content": {"parts": [{"text": text}]},
-            }
-            if self.task_type:
-                payload["task_type"] = self.task_type
-            if self.output_dimensionality:
-                payload["output_dimensionality"] = self.output_dimensionality
-
-            # Call Gemini embeddings API
-            url = self.EMBED_ENDPOINT.format(model=self.model)
-            headers = {
-                "x-goog-api-key": self.api_key,
-                "Content-Type": "application/json",
-            }
-
-            response = requests.post(
-                url,
-                json=payload,
-                headers=headers,
+            response = self._get_session().post(
+                self._embed_url(),
+                json=self._build_embed_payload(text),
+                headers=self._headers(),
                 timeout=self.timeout,
             )
-
-            # Handle errors
-            if response.status_code != 200:
-                error_detail = self._sanitize_error(response)
-                logger.error(f"Gemini API error: {response.status_code} - {error_detail}")
-                raise EmbeddingProviderError(
-                    f"Gemini API returned {response.status_code}: {error_detail}"
-                )
-
-            # Parse response
-            data = response.json()
-            embedding_data = data.get("embedding", {})
-            values = embedding_data.get("values", [])
-            
-            if not values:
-                raise EmbeddingProviderError("Gemini returned empty embedding")
-
-            logger.debug(f"Generated single embedding via Gemini (dim={len(values)})")
-            return values
+            return self._parse_embed_response(response)
 
         except requests.exceptions.Timeout:
             logger.error("Gemini API request timed out")
@@ -233,14 +207,98 @@ class GeminiEmbeddingClient:
             logger.error(f"Unexpected error in Gemini embedding: {e}")
             raise EmbeddingProviderError(f"Gemini embedding failed: {e}") from e
 
-    def _sanitize_error(self, response: requests.Response) -> str:
+    def _get_session(self) -> requests.Session:
+        """Lazily create the pooled keep-alive session."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def close(self) -> None:
+        """Close the pooled session and its connections."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _headers(self) -> Dict[str, str]:
+        """Request headers for the Gemini API."""
+        return self._request_headers
+
+    def _embed_url(self) -> str:
+        return self._embed_endpoint
+
+    def _batch_url(self) -> str:
+        return self._batch_endpoint
+
+    def _build_embed_payload(self, text: str) -> Dict[str, Any]:
+        """Build the embedContent request body for a single text."""
+        return {"content": {"parts": [{"text": text}]}, **self._embed_fields}
+
+    def _build_batch_payload(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Build the batchEmbedContents request body.
+
+        batchEmbedContents expects a "requests" array with each request
+        containing model, content, task_type, and output_dimensionality.
+        """
+        fields = self._batch_fields
+        return {"requests": [{"content": {"parts": [{"text": text}]}, **fields} for text in texts]}
+
+    def _raise_for_status(self, response) -> None:
+        """Raise EmbeddingProviderError on a non-200 Gemini response."""
+        if response.status_code != 200:
+            error_detail = self._sanitize_error(response)
+            logger.error(f"Gemini API error: {response.status_code} - {error_detail}")
+            raise EmbeddingProviderError(
+                f"Gemini API returned {response.status_code}: {error_detail}"
+            )
+
+    def _parse_embed_response(self, response) -> np.ndarray:
+        """Extract the embedding vector from an embedContent response."""
+        self._raise_for_status(response)
+
+        data = response.json()
+        embedding_data = data.get("embedding", {})
+        values = embedding_data.get("values", [])
+
+        if not values:
+            raise EmbeddingProviderError("Gemini returned empty embedding")
+
+        logger.debug(f"Generated single embedding via Gemini (dim={len(values)})")
+        return as_embedding_matrix([values], self.normalize)[0]
+
+    def _parse_batch_response(self, response, expected: int) -> List[List[float]]:
+        """Extract embedding vectors from a batchEmbedContents response."""
+        self._raise_for_status(response)
+
+        data = response.json()
+        embeddings = []
+
+        for embedding_response in data.get("embeddings", []):
+            values = embedding_response.get("values", [])
+            if not values:
+                raise EmbeddingProviderError("Gemini returned empty embedding")
+            embeddings.append(values)
+
+        if len(embeddings) != expected:
+            raise EmbeddingProviderError(
+                f"Gemini returned {len(embeddings)} embeddings for {expected} texts"
+            )
+
+        logger.debug(f"Generated {len(embeddings)} embeddings via Gemini")
+        return embeddings
+
+    def _sanitize_error(self, response) -> str:
         """
         Sanitize error response for logging/client display.
         
         Removes sensitive information while preserving useful error details.
         
         Args:
-            response: HTTP response object.
+            response: HTTP response object (requests or httpx).
             
         Returns:
             Sanitized error message.
@@ -256,3 +314,129 @@ class GeminiEmbeddingClient:
             return "Unknown error"
         except Exception:
             return response.text[:200] if response.text else "Unknown error"
+
+
+class AsyncGeminiEmbeddingClient(GeminiEmbeddingClient):
+    """
+    Async embedding client for Google Gemini.
+
+    Shares configuration, payload building and response parsing with
+    GeminiEmbeddingClient, but sends requests through an httpx.AsyncClient
+    so calls can be awaited from the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Lazily create the shared pooled httpx client (must run inside an event loop)."""
+        if self._http is None:
+            http2 = self.http2
+            if http2 and importlib.util.find_spec("h2") is None:
+                logger.warning("GEMINI_HTTP2 requires the h2 package (pip install 'httpx[http2]'), using HTTP/1.1")
+                http2 = False
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_seconds,
+                ),
+            )
+        return self._http
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts using Gemini.
+
+        Chunks larger than max_batch_size are sent concurrently.
+
+        Args:
+            texts: List of text strings to embed.
+
+        Returns:
+            float32 matrix with one embedding per text.
+
+        Raises:
+            EmbeddingProviderError: On Gemini API failures.
+            ValueError: On invalid input.
+        """
+        if not texts:
+            raise ValueError("texts list cannot be empty")
+
+        for text in texts:
+            if not text or not text.strip():
+                raise ValueError("text cannot be empty or whitespace-only")
+
+        try:
+            http = self._get_http_client()
+            batches = list(iter_batches(texts, self.max_batch_size))
+            responses = await asyncio.gather(*(
+                http.post(
+                    self._batch_url(),
+                    json=self._build_batch_payload(batch),
+                    headers=self._headers(),
+                )
+                for batch in batches
+            ))
+            embeddings = []
+            for batch, response in zip(batches, responses):
+                embeddings.extend(self._parse_batch_response(response, len(batch)))
+            return as_embedding_matrix(embeddings, self.normalize)
+
+        except httpx.TimeoutException:
+            logger.error("Gemini API request timed out")
+            raise EmbeddingProviderError("Gemini API request timed out")
+        except httpx.HTTPError as e:
+            logger.error(f"Gemini API request error: {e}")
+            raise EmbeddingProviderError(f"Gemini API request failed: {e}") from e
+        except EmbeddingProviderError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in Gemini embedding: {e}")
+            raise EmbeddingProviderError(f"Gemini embedding failed: {e}") from e
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a single text using Gemini.
+
+        Args:
+            text: Text string to embed.
+
+        Returns:
+            Embedding vector (1-D float32 array).
+
+        Raises:
+            EmbeddingProviderError: On Gemini API failures.
+            ValueError: On invalid input.
+        """
+        if not text or not text.strip():
+            raise ValueError("text cannot be empty or whitespace-only")
+
+        try:
+            response = await self._get_http_client().post(
+                self._embed_url(),
+                json=self._build_embed_payload(text),
+                headers=self._headers(),
+            )
+            return self._parse_embed_response(response)
+
+        except httpx.TimeoutException:
+            logger.error("Gemini API request timed out")
+            raise EmbeddingProviderError("Gemini API request timed out")
+        except httpx.HTTPError as e:
+            logger.error(f"Gemini API request error: {e}")
+            raise EmbeddingProviderError(f"Gemini API request failed: {e}") from e
+        except EmbeddingProviderError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in Gemini embedding: {e}")
+            raise EmbeddingProviderError(f"Gemini embedding failed: {e}") from e
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
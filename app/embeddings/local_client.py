@@ -0,0 +1,248 @@
+"""
+In-process ONNX embedding client.
+
+Runs an ONNX-exported sentence embedding model (e.g. a sentence-transformers
+encoder exported with Optimum) on CPU inside the API process, removing the
+network hop to Ollama or Gemini. The model directory holds the ONNX graph
+and the Hugging Face `tokenizer.json`.
+
+Requires the optional `onnxruntime` and `tokenizers` packages.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.embeddings.base import EmbeddingProviderError, as_embedding_matrix, iter_batches
+
+logger = logging.getLogger(__name__)
+
+POOLING_MODES = ("mean", "cls")
+
+
+def _validate_texts(texts: List[str]) -> None:
+    """Reject empty input lists and empty/whitespace-only texts."""
+    if not texts:
+        raise ValueError("texts list cannot be empty")
+
+    for text in texts:
+        if not text or not text.strip():
+            raise ValueError("text cannot be empty or whitespace-only")
+
+
+def _import_runtime():
+    try:
+        import onnxruntime
+        from tokenizers import Tokenizer
+    except ImportError as e:
+        raise ImportError(
+            "EMBEDDING_PROVIDER=local requires the 'onnxruntime' and 'tokenizers' packages"
+        ) from e
+    return onnxruntime, Tokenizer
+
+
+def _quantized_model_path(model_path: str) -> str:
+    """Create (once) an int8 dynamically quantized copy next to the model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    root, ext = os.path.splitext(model_path)
+    quantized_path = f"{root}.int8{ext}"
+    if not os.path.exists(quantized_path) or os.path.getmtime(quantized_path) < os.path.getmtime(model_path):
+        logger.info(f"Quantizing {model_path} to int8 ({quantized_path})")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+class LocalOnnxEmbeddingClient:
+    """
+    Embedding client running an ONNX sentence embedding model in-process.
+
+    Texts are tokenized and run in batches of at most max_batch_size;
+    token vectors are pooled (attention-masked mean or CLS) and
+    L2-normalized. Models that already output pooled sentence embeddings
+    (2-D output) are used as is.
+    """
+
+    # Texts per inference run; larger inputs are split into chunks
+    DEFAULT_MAX_BATCH_SIZE = 32
+
+    def __init__(self, model_dir: str, model_file: str = "model.onnx",
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_length: int = 256,
+                 threads: Optional[int] = None, quantize: bool = False, pooling: str = "mean",
+                 normalize: bool = True, query_prefix: str = ""):
+        """
+        Initialize the local ONNX embedding client.
+
+        Args:
+            model_dir: Directory containing the ONNX model and tokenizer.json.
+            model_file: ONNX file name inside model_dir (default: model.onnx).
+            max_batch_size: Maximum texts per inference run (default: 32).
+            max_length: Tokens per text; longer texts are truncated (default: 256).
+            threads: ONNX Runtime intra-op threads (default: number of CPU cores).
+            quantize: Run an int8 dynamically quantized copy of the model
+                (created next to the model on first use).
+            pooling: "mean" (attention-masked mean of token vectors) or "cls".
+            normalize: L2-normalize the vectors (default: True).
+            query_prefix: Text prepended to every input (instruction-tuned models).
+
+        Raises:
+            ValueError: On invalid settings or missing model files.
+            ImportError: If onnxruntime or tokenizers is not installed.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_length < 1:
+            raise ValueError("max_length must be at least 1")
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"pooling must be one of {POOLING_MODES}, got: {pooling}")
+
+        model_path = os.path.join(model_dir, model_file)
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        for path in (model_path, tokenizer_path):
+            if not os.path.isfile(path):
+                raise ValueError(f"Local embedding model file not found: {path}")
+
+        onnxruntime, Tokenizer = _import_runtime()
+
+        self.model_dir = model_dir
+        self.max_batch_size = max_batch_size
+        self.pooling = pooling
+        self.normalize = normalize
+        self.query_prefix = query_prefix
+        self.threads = threads or os.cpu_count() or 1
+        self.quantized = quantize
+        # Identifies the model in embedding cache keys
+        self.model = os.path.basename(os.path.normpath(model_dir)) + (":int8" if quantize else "")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        if self.tokenizer.padding is None:
+            pad_token = next(
+                (token for token in ("[PAD]", "<pad>") if self.tokenizer.token_to_id(token) is not None), "[PAD]"
+            )
+            self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session_path = _quantized_model_path(model_path) if quantize else model_path
+        self.session = onnxruntime.InferenceSession(
+            session_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        self._output_name = self.session.get_outputs()[0].name
+        logger.info(
+            f"Initialized LocalOnnxEmbeddingClient with model={session_path}, "
+            f"threads={self.threads}, pooling={pooling}"
+        )
+
+    def _encode(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        encodings = self.tokenizer.encode_batch([self.query_prefix + text for text in texts])
+        return {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+
+    def _pool(self, output: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if output.ndim == 2:
+            vectors = output
+        elif self.pooling == "cls":
+            vectors = output[:, 0]
+        else:
+            mask = attention_mask[:, :, np.newaxis].astype(output.dtype)
+            vectors = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return as_embedding_matrix(vectors, self.normalize)
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encoded = self._encode(texts)
+        feeds = {name: value for name, value in encoded.items() if name in self._input_names}
+        output = self.session.run([self._output_name], feeds)[0]
+        return self._pool(output, encoded["attention_mask"])
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts in-process.
+
+        Args:
+            texts: List of text strings to embed.
+
+        Returns:
+            float32 matrix with one embedding per text.
+
+        Raises:
+            EmbeddingProviderError: On inference failures.
+            ValueError: On invalid input.
+        """
+        _validate_texts(texts)
+
+        try:
+            batches = [self._run(batch) for batch in iter_batches(texts, self.max_batch_size)]
+            embeddings = batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+            logger.debug(f"Generated {len(embeddings)} embeddings via local ONNX model")
+            return embeddings
+
+        except Exception as e:
+            logger.error(f"Local embedding error: {e}")
+            raise EmbeddingProviderError(f"Local embedding failed: {e}") from e
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a single text in-process.
+
+        Raises:
+            EmbeddingProviderError: On inference failures.
+            ValueError: On invalid input.
+        """
+        if not text or not text.strip():
+            raise ValueError("text cannot be empty or whitespace-only")
+        return self.embed([text])[0]
+
+
+class AsyncLocalOnnxEmbeddingClient:
+    """
+    Async wrapper around LocalOnnxEmbeddingClient.
+
+    Inference runs on a dedicated thread pool so the event loop stays free;
+    ONNX Runtime releases the GIL and parallelizes each run over `threads`
+    cores. The default single worker keeps concurrent requests from
+    oversubscribing the cores; with micro-batching enabled they are merged
+    into one run instead.
+    """
+
+    def __init__(self, model_dir: str, workers: int = 1, **kwargs: Any):
+        """
+        Initialize the async local client.
+
+        Args:
+            model_dir: Directory containing the ONNX model and tokenizer.json.
+            workers: Inference runs executed concurrently (default: 1).
+            **kwargs: Further LocalOnnxEmbeddingClient settings.
+
+        Raises:
+            ValueError: On invalid settings or missing model files.
+            ImportError: If onnxruntime or tokenizers is not installed.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.client = LocalOnnxEmbeddingClient(model_dir, **kwargs)
+        self.model = self.client.model
+        self.max_batch_size = self.client.max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="local-embed")
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for multiple texts (see LocalOnnxEmbeddingClient.embed)."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.client.embed, texts)
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        """Generate embedding for a single text (see LocalOnnxEmbeddingClient.embed_one)."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.client.embed_one, text)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -4,15 +4,39 @@ Ollama embedding client implementation.
 Wraps the existing Ollama embedding logic into the EmbeddingClient interface.
 """
 
+import asyncio
 import logging
 from typing import List
+
+import numpy as np
+from ollama import AsyncClient as AsyncOllamaClient
 from ollama import Client as OllamaClient
 
-from app.embeddings.base import EmbeddingProviderError
+from app.embeddings.base import EmbeddingProviderError, as_embedding_matrix, iter_batches
 
 logger = logging.getLogger(__name__)
 
 
+def _validate_texts(texts: List[str]) -> None:
+    """Reject empty input lists and empty/whitespace-only texts."""
+    if not texts:
+        raise ValueError("texts list cannot be empty")
+
+    for text in texts:
+        if not text or not text.strip():
+            raise ValueError("text cannot be empty or whitespace-only")
+
+
+def _parse_embed_response(response, expected: int) -> List[List[float]]:
+    """Extract vectors from an /api/embed response and check the count."""
+    embeddings = list(response["embeddings"])
+    if len(embeddings) != expected:
+        raise EmbeddingProviderError(
+            f"Ollama returned {len(embeddings)} embeddings for {expected} texts"
+        )
+    return embeddings
+
+
 class OllamaEmbeddingClient:
     """
     Embedding client for Ollama.
@@ -21,78 +45,167 @@ class OllamaEmbeddingClient:
     Preserves all current behavior for backward compatibility.
     """
 
-    def __init__(self, host: str, model: str):
+    # Texts sent per /api/embed call; larger inputs are split into chunks
+    DEFAULT_MAX_BATCH_SIZE = 64
+
+    def __init__(self, host: str, model: str, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 normalize: bool = False):
         """
         Initialize Ollama embedding client.
 
         Args:
             host: Ollama server host (e.g., "http://localhost:11434").
             model: Embedding model name (e.g., "mxbai-embed-large").
+            max_batch_size: Maximum texts per embed request (default: 64).
+            normalize: L2-normalize the returned vectors (default: False).
         """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
         self.host = host
         self.model = model
+        self.max_batch_size = max_batch_size
+        self.normalize = normalize
         self.client = OllamaClient(host=host)
         logger.info(f"Initialized OllamaEmbeddingClient with host={host}, model={model}")
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts using Ollama.
 
+        Sends all texts through the multi-input /api/embed endpoint, split
+        into chunks of at most max_batch_size texts.
+
         Args:
             texts: List of text strings to embed.
 
         Returns:
-            List of embedding vectors.
+            float32 matrix with one embedding per text.
 
         Raises:
             EmbeddingProviderError: On Ollama API failures.
             ValueError: On invalid input.
         """
-        if not texts:
-            raise ValueError("texts list cannot be empty")
+        _validate_texts(texts)
 
         try:
             embeddings = []
-            for text in texts:
-                if not text or not text.strip():
-                    raise ValueError("text cannot be empty or whitespace-only")
-                
-                # Call Ollama embeddings API (existing behavior)
-                response = self.client.embeddings(model=self.model, prompt=text)
-                embeddings.append(response["embedding"])
+            for batch in iter_batches(texts, self.max_batch_size):
+                response = self.client.embed(model=self.model, input=batch)
+                embeddings.extend(_parse_embed_response(response, len(batch)))
             
             logger.debug(f"Generated {len(embeddings)} embeddings via Ollama")
-            return embeddings
+            return as_embedding_matrix(embeddings, self.normalize)
 
         except Exception as e:
             logger.error(f"Ollama embedding error: {e}")
             raise EmbeddingProviderError(f"Ollama embedding failed: {e}") from e
 
-    def embed_one(self, text: str) -> List[float]:
+    def embed_one(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text using Ollama.
 
+        Goes through embed() (/api/embed) so single and batched queries get
+        the same vector, which the shared embedding cache relies on.
+
         Args:
             text: Text string to embed.
 
         Returns:
-            Embedding vector.
+            Embedding vector (1-D float32 array).
 
         Raises:
             EmbeddingProviderError: On Ollama API failures.
             ValueError: On invalid input.
         """
-        if not text or not text.strip():
-            raise ValueError("text cannot be empty or whitespace-only")
+        return self.embed([text])[0]
+
+    def close(self) -> None:
+        """Close the HTTP connections of the underlying ollama.Client."""
+        # Closed directly: ollama 0.3 (the pinned minimum) has no Client.close()
+        self.client._client.close()
+
+
+class AsyncOllamaEmbeddingClient:
+    """
+    Async embedding client for Ollama.
+
+    Same behavior as OllamaEmbeddingClient, but built on ollama.AsyncClient
+    so embedding calls can be awaited from the event loop.
+    """
+
+    def __init__(self, host: str, model: str,
+                 max_batch_size: int = OllamaEmbeddingClient.DEFAULT_MAX_BATCH_SIZE,
+                 normalize: bool = False):
+        """
+        Initialize async Ollama embedding client.
+
+        Args:
+            host: Ollama server host (e.g., "http://localhost:11434").
+            model: Embedding model name (e.g., "mxbai-embed-large").
+            max_batch_size: Maximum texts per embed request (default: 64).
+            normalize: L2-normalize the returned vectors (default: False).
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.host = host
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.normalize = normalize
+        self.client = AsyncOllamaClient(host=host)
+        logger.info(f"Initialized AsyncOllamaEmbeddingClient with host={host}, model={model}")
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts using Ollama.
+
+        Chunks larger than max_batch_size are sent concurrently.
+
+        Args:
+            texts: List of text strings to embed.
+
+        Returns:
+            float32 matrix with one embedding per text.
+
+        Raises:
+            EmbeddingProviderError: On Ollama API failures.
+            ValueError: On invalid input.
+        """
+        _validate_texts(texts)
 
         try:
-            # Call Ollama embeddings API (existing behavior)
-            response = self.client.embeddings(model=self.model, prompt=text)
-            embedding = response["embedding"]
-            
-            logger.debug(f"Generated single embedding via Ollama (dim={len(embedding)})")
-            return embedding
+            batches = list(iter_batches(texts, self.max_batch_size))
+            responses = await asyncio.gather(*(
+                self.client.embed(model=self.model, input=batch) for batch in batches
+            ))
+            embeddings = []
+            for batch, response in zip(batches, responses):
+                embeddings.extend(_parse_embed_response(response, len(batch)))
+
+            logger.debug(f"Generated {len(embeddings)} embeddings via Ollama")
+            return as_embedding_matrix(embeddings, self.normalize)
 
         except Exception as e:
             logger.error(f"Ollama embedding error: {e}")
             raise EmbeddingProviderError(f"Ollama embedding failed: {e}") from e
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a single text using Ollama (through embed()).
+
+        Args:
+            text: Text string to embed.
+
+        Returns:
+            Embedding vector (1-D float32 array).
+
+        Raises:
+            EmbeddingProviderError: On Ollama API failures.
+            ValueError: On invalid input.
+        """
+        return (await self.embed([text]))[0]
+
+    async def aclose(self) -> None:
+        """Close the HTTP connections of the underlying ollama.AsyncClient."""
+        await self.client._client.aclose()
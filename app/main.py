@@ -1,20 +1,41 @@
 from fastapi import FastAPI, HTTPException, status, Request, Security, Depends
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field, conint
-from typing import List, Optional, Dict, Union, Any
+from pydantic import BaseModel, Field, confloat, conint
+from typing import AsyncIterator, Hashable, Iterator, List, Optional, Dict, Union, Any, Tuple
+import json
 import logging
+import time
 import uvicorn
 import os
+from contextlib import asynccontextmanager
 from contextvars import ContextVar
 from pythonjsonlogger import jsonlogger
 from fastapi.middleware.cors import CORSMiddleware
 import uuid
+import asyncio
+import numpy as np
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 import ollama
 
 # Import embedding provider abstraction
-from app.embeddings import EmbeddingProviderFactory, EmbeddingClient
+from app.embeddings import (
+    AsyncBatchingEmbeddingClient, AsyncEmbeddingClient, EmbeddingClient, EmbeddingProviderFactory,
+    as_embedding_matrix, close_embedding_client
+)
+from app.metrics import (
+    CACHE_STATS, COALESCED_CALLS, EMBEDDING_QUEUE_DEPTH, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT,
+    RequestTimings, count_request_event, instrument_embedding_client, observe_embedding_batch, render_latest,
+    collection_labels, request_timer, request_timings, stage_timer
+)
+from app.search import (
+    CONTEXT_PAYLOAD_FIELDS, DEFAULT_SPARSE_VECTOR_NAME, FILENAME_PAYLOAD_FIELDS, ClientPool, CollectionInfo, ContextPlan,
+    FilenameIndexManager, FilenameListing, InMemoryResponseBackend, PageCache, RespResponseBackend, ResponseCache,
+    SearchSystemRegistry, SemanticResultCache, SingleFlight, clean_whitespace, hit_payload_selector,
+    load_filename_counts_faceted, load_filenames_faceted, merge_ranges, mmr_rerank, query_sparse_vector,
+    sparse_vectors_config, window_point_ids
+)
 
 # ======== Configuration ========
 load_dotenv()
@@ -43,6 +64,77 @@ QDRANT_HOST = os.getenv("QDRANT_HOST", "192.168.153.47")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "192.168.153.46")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
 CONTEXT_WINDOW_SIZE = int(os.getenv("CONTEXT_WINDOW_SIZE", "5"))
+# How context pages are fetched: "scroll" (filter by filename/page range) or
+# "ids" (retrieve by deterministic page point IDs, see app/search/point_ids.py)
+CONTEXT_FETCH_MODE = os.getenv("CONTEXT_FETCH_MODE", "scroll").lower()
+
+# Retrieval mode: "dense" (embeddings only) or "hybrid" (dense + BM25 sparse
+# vector fused by Qdrant, see app/search/sparse.py); requests can override it
+SEARCH_MODE = os.getenv("SEARCH_MODE", "dense").lower()
+SPARSE_VECTOR_NAME = os.getenv("SPARSE_VECTOR_NAME", DEFAULT_SPARSE_VECTOR_NAME)
+# Fusion of the dense and sparse candidates: "rrf" (rank based) or "dbsf" (score based)
+def _hybrid_fusion_from_env() -> models.Fusion:
+    value = os.getenv("HYBRID_FUSION", "rrf").strip().lower()
+    if value not in {"rrf", "dbsf"}:
+        raise ValueError(f"HYBRID_FUSION must be 'rrf' or 'dbsf', got: {value}")
+    return models.Fusion(value)
+
+
+HYBRID_FUSION = _hybrid_fusion_from_env()
+# Candidates fetched per prefetch (dense and sparse) before fusion
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "50"))
+
+# Diversity reranking: fetch limit * MMR_OVERSAMPLE candidates with vectors and
+# keep `limit` of them by Maximal Marginal Relevance (see app/search/diversity.py);
+# requests can override it. MMR_LAMBDA=1 keeps the relevance order
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_OVERSAMPLE = max(1, int(os.getenv("MMR_OVERSAMPLE", "4")))
+
+# Cleaned page cache (shared by all requests of this process)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "false").lower() == "true"
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PAGE_CACHE_TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", "300"))
+
+# Semantic result cache: near-duplicate queries (cosine similarity of their
+# embeddings >= threshold) are answered from earlier results
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "300"))
+
+# Exact /search response cache for identical request bodies, in-process or on
+# a Redis-protocol server shared by replicas (RESPONSE_CACHE_URL=redis://...)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_STALE_SECONDS = int(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "300"))
+RESPONSE_CACHE_VERSION_POLL_SECONDS = float(os.getenv("RESPONSE_CACHE_VERSION_POLL_SECONDS", "5"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# How long cached collection info (existence, vector config) is trusted
+COLLECTION_INFO_TTL_SECONDS = int(os.getenv("COLLECTION_INFO_TTL_SECONDS", "60"))
+
+# Pool of clients for requests with custom Qdrant parameters
+QDRANT_CLIENT_POOL_MAX_SIZE = int(os.getenv("QDRANT_CLIENT_POOL_MAX_SIZE", "32"))
+QDRANT_CLIENT_POOL_IDLE_SECONDS = int(os.getenv("QDRANT_CLIENT_POOL_IDLE_SECONDS", "300"))
+
+# In-memory filename index for /search/filenames (see app/search/filename_index.py)
+FILENAME_INDEX_ENABLED = os.getenv("FILENAME_INDEX_ENABLED", "true").lower() == "true"
+FILENAME_INDEX_REFRESH_SECONDS = int(os.getenv("FILENAME_INDEX_REFRESH_SECONDS", "300"))
+# Maximum distinct filenames fetched per facet request
+FILENAME_FACET_MAX_VALUES = int(os.getenv("FILENAME_FACET_MAX_VALUES", "100000"))
+
+# Run concurrent identical embedding calls and searches once, sharing the result
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Per-request stage timings in a Server-Timing response header
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+# Distinct collection names reported in the "collection" label of stage
+# histograms (further collections are reported as "other")
+METRICS_MAX_COLLECTIONS = int(os.getenv("METRICS_MAX_COLLECTIONS", "50"))
+collection_labels.max_values = METRICS_MAX_COLLECTIONS
 
 # Embedding configuration
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING_MODEL", "mxbai-embed-large")
@@ -117,8 +209,6 @@ validate_production_config()
 # ===============================
 
 # ======== Content Cleaning Utilities ========
-import re
-
 def clean_whitespace_from_content(text: str) -> str:
     """
     Clean excessive whitespace from markdown content to reduce token usage.
@@ -139,50 +229,9 @@ def clean_whitespace_from_content(text: str) -> str:
         Input:  "| Column1     |     Column2     |"
         Output: "| Column1 | Column2 |"
     """
-    # Handle None, empty string, or non-string types
-    if not text or not isinstance(text, str):
-        return text
-    
-    # Collapse multiple spaces to single space (but preserve newlines)
-    text = re.sub(r' {2,}', ' ', text)
-    
-    # Remove trailing spaces from each line
-    text = re.sub(r' +\n', '\n', text)
-    
-    # Remove leading spaces from each line (optional, preserves indentation if removed)
-    # text = re.sub(r'\n +', '\n', text)
-    
-    return text.strip()
-
-
-def clean_response_content(results: List[List[Dict]]) -> List[List[Dict]]:
-    """
-    Post-process search results to clean whitespace from content fields.
-    
-    This reduces token usage for LLM consumption while preserving readability
-    and structure. Applied at query time to avoid re-indexing.
-    
-    Args:
-        results: Nested list of search results from batch_search
-        
-    Returns:
-        Same structure with cleaned content fields
-    """
-    for query_results in results:
-        for result in query_results:
-            # Clean combined_page field (context window results)
-            if 'combined_page' in result and result['combined_page']:
-                result['combined_page'] = clean_whitespace_from_content(result['combined_page'])
-            
-            # Clean content field (single page results)
-            if 'content' in result and result['content']:
-                result['content'] = clean_whitespace_from_content(result['content'])
-            
-            # Clean center_page field if present
-            if 'center_page' in result and result['center_page']:
-                result['center_page'] = clean_whitespace_from_content(result['center_page'])
-    
-    return results
+    # One precompiled pass plus str operations (app/search/cleaning.py);
+    # None, empty strings and non-string types are returned unchanged
+    return clean_whitespace(text)
 
 # ============================================
 
@@ -238,26 +287,25 @@ class SearchSystem:
     _qdrant_pool_prod = None
     _ollama_pool = None
     _embedding_client = None  # Singleton embedding client
+    _page_cache = None  # Singleton cleaned page cache (PAGE_CACHE_ENABLED)
+    _semantic_cache = None  # Singleton semantic result cache (SEMANTIC_CACHE_ENABLED)
 
     def __init__(self, collection_name: str, use_production: bool = False,
                  qdrant_url: Optional[str] = None, 
                  qdrant_api_key: Optional[str] = None, 
                  qdrant_verify_ssl: Optional[bool] = None,
                  context_window_size: Optional[int] = None):
-        self.collection_name = collection_name
-        self.context_window_size = context_window_size if context_window_size is not None else CONTEXT_WINDOW_SIZE
-        self.use_custom_client = any([qdrant_url, qdrant_api_key, qdrant_verify_ssl is not None])
-        
-        # Validate: cannot use both use_production flag and custom parameters
-        if self.use_custom_client and use_production:
-            raise ValueError("Cannot use both use_production flag and custom Qdrant parameters")
+        self._init_settings(collection_name, use_production, qdrant_url, qdrant_api_key,
+                            qdrant_verify_ssl, context_window_size)
         
         if self.use_custom_client:
-            # Create custom client for this request (ignore use_production)
+            # Create a custom client for this instance (ignore use_production);
+            # it is closed by close() (AsyncSearchSystem leases from a pool instead)
             self.qclient = self._create_qdrant_client(
                 qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production=False, is_pooled=False
             )
             self.custom_client = True
+            self.flight_scope = ClientPool.make_key(qdrant_url, qdrant_api_key, qdrant_verify_ssl)
         else:
             # Use pooled client (dev or prod based on use_production flag)
             self.qclient = self._get_qdrant_client(use_production)
@@ -269,14 +317,43 @@ class SearchSystem:
         # Keep Ollama client for backward compatibility (may be removed in future)
         self.oclient = self._get_ollama_client()
         self._ensure_collection()
+        collection_labels.admit(self.collection_name)
+
+    def _init_settings(self, collection_name: str, use_production: bool,
+                       qdrant_url: Optional[str], qdrant_api_key: Optional[str],
+                       qdrant_verify_ssl: Optional[bool], context_window_size: Optional[int]):
+        """Store per-request settings and validate connection overrides"""
+        self.collection_name = collection_name
+        self.context_window_size = context_window_size if context_window_size is not None else CONTEXT_WINDOW_SIZE
+        self.use_custom_client = any([qdrant_url, qdrant_api_key, qdrant_verify_ssl is not None])
+        
+        # Validate: cannot use both use_production flag and custom parameters
+        if self.use_custom_client and use_production:
+            raise ValueError("Cannot use both use_production flag and custom Qdrant parameters")
+        
+        # Identifies the Qdrant cluster in cache keys (same collection name
+        # can hold different data in dev, prod or a custom cluster)
+        self.cache_scope = qdrant_url or ("prod" if use_production else "dev")
+        # Also tells credentials apart, for keys of shared search results
+        self.flight_scope = self.cache_scope
+        self.page_cache = self._get_page_cache()
+        self.semantic_cache = self._get_semantic_cache()
+        self.collection_info = CollectionInfo()
+        self._hybrid_fallback_logged = False
+
+    def close(self):
+        """Close the custom client of this instance, if any (shared clients stay open)"""
+        if self.custom_client and self.qclient is not None:
+            client, self.qclient = self.qclient, None
+            self.custom_client = False
+            client.close()
 
     def __del__(self):
-        """Close custom client when instance is destroyed"""
-        if self.custom_client and hasattr(self, 'qclient'):
-            try:
-                self.qclient.close()
-            except:
-                pass
+        """Close the custom client if close() was not called"""
+        try:
+            self.close()
+        except Exception:
+            pass
 
     @staticmethod
     def _create_qdrant_client(qdrant_url: Optional[str] = None,
@@ -284,8 +361,30 @@ class SearchSystem:
                              qdrant_verify_ssl: Optional[bool] = None,
                              use_production: bool = False,
                              is_pooled: bool = False) -> QdrantClient:
+        """Create a sync Qdrant client (see _qdrant_client_params for configuration priority)"""
+        return QdrantClient(**SearchSystem._qdrant_client_params(
+            qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production, is_pooled
+        ))
+
+    @staticmethod
+    def _create_async_qdrant_client(qdrant_url: Optional[str] = None,
+                                   qdrant_api_key: Optional[str] = None,
+                                   qdrant_verify_ssl: Optional[bool] = None,
+                                   use_production: bool = False,
+                                   is_pooled: bool = False) -> AsyncQdrantClient:
+        """Create an async Qdrant client (see _qdrant_client_params for configuration priority)"""
+        return AsyncQdrantClient(**SearchSystem._qdrant_client_params(
+            qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production, is_pooled
+        ))
+
+    @staticmethod
+    def _qdrant_client_params(qdrant_url: Optional[str] = None,
+                              qdrant_api_key: Optional[str] = None,
+                              qdrant_verify_ssl: Optional[bool] = None,
+                              use_production: bool = False,
+                              is_pooled: bool = False) -> Dict[str, Any]:
         """
-        Create a Qdrant client with configuration priority:
+        Resolve Qdrant client parameters with configuration priority:
         1. Request parameters (qdrant_url, qdrant_api_key, qdrant_verify_ssl)
         2. Environment-specific variables (DEV_* or PROD_* based on use_production)
         3. Generic environment variables (QDRANT_URL, QDRANT_API_KEY, QDRANT_VERIFY_SSL)
@@ -401,7 +500,7 @@ class SearchSystem:
             }
         )
         
-        return QdrantClient(**client_params)
+        return client_params
 
     @classmethod
     def _get_qdrant_client(cls, use_production: bool = False):
@@ -452,7 +551,7 @@ class SearchSystem:
         """
         if cls._embedding_client is None:
             try:
-                cls._embedding_client = EmbeddingProviderFactory.from_env()
+                cls._embedding_client = EmbeddingProviderFactory.from_env(wrap=instrument_embedding_client)
                 logger.info("Embedding client initialized successfully")
             except ValueError as e:
                 logger.error(f"Embedding client configuration error: {str(e)}")
@@ -462,6 +561,29 @@ class SearchSystem:
                 raise EmbeddingError("Embedding service initialization error") from e
         return cls._embedding_client
 
+    @classmethod
+    def _get_page_cache(cls) -> Optional[PageCache]:
+        """Get singleton page cache, or None when PAGE_CACHE_ENABLED is false"""
+        if cls._page_cache is None and PAGE_CACHE_ENABLED:
+            SearchSystem._page_cache = PageCache(
+                max_bytes=PAGE_CACHE_MAX_BYTES,
+                ttl_seconds=PAGE_CACHE_TTL_SECONDS
+            )
+            logger.info(f"Page cache enabled (max_bytes={PAGE_CACHE_MAX_BYTES}, ttl={PAGE_CACHE_TTL_SECONDS}s)")
+        return cls._page_cache
+
+    @classmethod
+    def _get_semantic_cache(cls) -> Optional[SemanticResultCache]:
+        """Get singleton semantic result cache, or None when SEMANTIC_CACHE_ENABLED is false"""
+        if cls._semantic_cache is None and SEMANTIC_CACHE_ENABLED:
+            SearchSystem._semantic_cache = SemanticResultCache(
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS
+            )
+            logger.info(f"Semantic result cache enabled (threshold={SEMANTIC_CACHE_THRESHOLD})")
+        return cls._semantic_cache
+
     def _ensure_collection(self):
         if not self.qclient.collection_exists(self.collection_name):
             self.qclient.create_collection(
@@ -469,7 +591,8 @@ class SearchSystem:
                 vectors_config=models.VectorParams(
                     size=DEFAULT_VECTOR_SIZE,
                     distance=models.Distance.COSINE
-                )
+                ),
+                sparse_vectors_config=sparse_vectors_config(SPARSE_VECTOR_NAME)
             )
             logger.info(f"Created collection '{self.collection_name}' with vector size {DEFAULT_VECTOR_SIZE}")
 
@@ -488,50 +611,214 @@ class SearchSystem:
         except (KeyError, TypeError):
             return False
 
-    def _get_context_pages(self, filename: str, center_page_number: int) -> List[Dict]:
-        try:
-            window_size = self.context_window_size
-            page_range = models.Range(
-                gte=max(0, center_page_number - window_size),
-                lte=min(1000, center_page_number + window_size)
+    @staticmethod
+    def _has_page_metadata(payload: Dict) -> bool:
+        """Detect collection type based on payload structure"""
+        return (
+            "metadata" in payload and
+            "filename" in payload.get("metadata", {}) and
+            "page_number" in payload.get("metadata", {})
+        )
+
+    def _context_file_filter(self, filename: str, ranges: List[tuple]) -> models.Filter:
+        """Filter selecting the given page ranges of one file"""
+        range_conditions = [
+            models.FieldCondition(
+                key="metadata.page_number",
+                range=models.Range(gte=first, lte=last)
             )
-            
-            logger.debug(f"Fetching context: file={filename}, center={center_page_number}, range={page_range.gte}-{page_range.lte}")
-            
-            # Calculate dynamic limit: 2 * window_size + 1 (center ± window)
-            # Max window_size=11 → 23 pages, supports larger context windows
-            max_pages = 2 * window_size + 1
-            
-            scroll_result = self.qclient.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="metadata.filename",
-                            match=models.MatchText(text=filename)
-                        ),
-                        models.FieldCondition(
-                            key="metadata.page_number",
-                            range=page_range
-                        )
-                    ]
+            for first, last in ranges
+        ]
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.filename",
+                    match=models.MatchText(text=filename)
                 ),
-                with_payload=True,
-                limit=max_pages
-            )
-            
-            points = scroll_result[0]
-            logger.debug(f"Retrieved {len(points)} points from scroll")
-            
-            valid_pages = [p.payload for p in points if self._has_page_structure(p.payload)]
-            logger.debug(f"Valid pages after filtering: {len(valid_pages)}")
-            
-            return sorted(valid_pages, key=lambda x: x["metadata"]["page_number"])
+                range_conditions[0] if len(range_conditions) == 1 else models.Filter(should=range_conditions)
+            ]
+        )
+
+    def _context_scroll_args(self, filename: str, ranges: List[tuple]) -> Dict[str, Any]:
+        """Build scroll arguments fetching all requested page ranges of one file"""
+        # One page per page number in the requested ranges; further matches
+        # (e.g. other files containing this filename) are paged through
+        max_pages = sum(last - first + 1 for first, last in ranges)
+        
+        logger.debug(f"Fetching context: file={filename}, ranges={ranges}")
+        
+        return {
+            "collection_name": self.collection_name,
+            "scroll_filter": self._context_file_filter(filename, ranges),
+            "with_payload": CONTEXT_PAYLOAD_FIELDS,
+            "limit": max_pages
+        }
+
+    def _select_file_pages(self, filename: str, points: List[Any]) -> List[Dict]:
+        """Keep valid page payloads that belong exactly to filename"""
+        return [
+            p.payload for p in points
+            if self._has_page_structure(p.payload) and p.payload["metadata"]["filename"] == filename
+        ]
+
+    def _fetch_file_context(self, filename: str, ranges: List[tuple]) -> Optional[List[Dict]]:
+        """Fetch all pages of one file inside the merged ranges (None on failure)"""
+        try:
+            scroll_args = self._context_scroll_args(filename, ranges)
+            pages = []
+            offset = None
+            while True:
+                points, offset = self.qclient.scroll(offset=offset, **scroll_args)
+                count_request_event("context_fetches")
+                pages.extend(self._select_file_pages(filename, points))
+                if offset is None:
+                    break
+            logger.debug(f"Retrieved {len(pages)} context pages for {filename}")
+            return pages
         except Exception as e:
-            logger.error(f"Context retrieval failed for page {center_page_number}: {str(e)}")
+            logger.error(f"Context retrieval failed for {filename}: {str(e)}")
+            return None
+
+    def _plan_context(self, batch_response: List[Any], window_size: int) -> ContextPlan:
+        """Collect the context windows needed by every page-based hit of the batch"""
+        plan = ContextPlan(window_size)
+        has_hits = False
+        for query_response in batch_response:
+            for scored_point in query_response.points:
+                has_hits = True
+                payload = scored_point.payload
+                if not self._has_page_metadata(payload):
+                    continue
+                try:
+                    plan.add(payload["metadata"]["filename"], payload["metadata"]["page_number"])
+                except (KeyError, TypeError):
+                    continue
+        if has_hits:
+            self.collection_info.layout = "page" if len(plan) else "generic"
+        return plan
+
+    @staticmethod
+    def _clean_page(page: Dict) -> Dict:
+        """Return a copy of a page payload with whitespace-cleaned pagecontent"""
+        return {**page, "pagecontent": clean_whitespace_from_content(page["pagecontent"])}
+
+    def _read_cached_pages(self, plan: ContextPlan) -> List[tuple]:
+        """
+        Fill the plan from the page cache.
+        
+        Returns:
+            (filename, ranges) still to be fetched from Qdrant
+        """
+        files = plan.files()
+        if self.page_cache is None:
+            return files
+        
+        to_fetch = []
+        for filename, ranges in files:
+            page_numbers = [n for first, last in ranges for n in range(first, last + 1)]
+            cached, missing = self.page_cache.get_pages(
+                self.cache_scope, self.collection_name, filename, page_numbers
+            )
+            plan.store(filename, cached)
+            if missing:
+                to_fetch.append((filename, merge_ranges((n, n) for n in missing)))
+        logger.debug(f"Page cache: {len(files) - len(to_fetch)}/{len(files)} files fully cached")
+        return to_fetch
+
+    def _store_fetched_pages(self, plan: ContextPlan, filename: str, ranges: List[tuple],
+                             pages: Optional[List[Dict]]) -> None:
+        """Clean fetched pages once, add them to the plan and the page cache"""
+        if pages is None:
+            # Fetch failed: leave the window empty and do not cache absence
+            return
+        with stage_timer("clean", self.collection_name):
+            cleaned = [self._clean_page(page) for page in pages]
+        plan.store(filename, cleaned)
+        if self.page_cache is not None:
+            self.page_cache.put_pages(
+                self.cache_scope, self.collection_name, filename,
+                (n for first, last in ranges for n in range(first, last + 1)),
+                cleaned
+            )
+
+    def _context_point_ids(self, files: List[tuple]) -> List[str]:
+        """Deterministic point IDs of every page in the given file ranges"""
+        return [
+            point_id
+            for filename, ranges in files
+            for point_id in window_point_ids(filename, ranges)
+        ]
+
+    def _store_retrieved_context(self, plan: ContextPlan, files: List[tuple],
+                                 points: List[Any]) -> List[tuple]:
+        """
+        Store pages returned by retrieve() into the plan.
+        
+        Returns:
+            (filename, ranges) of files for which no page was found, so they
+            can be fetched by scroll (collection not migrated to page IDs yet)
+        """
+        by_file: Dict[str, List[Dict]] = {}
+        for point in points:
+            if self._has_page_structure(point.payload):
+                by_file.setdefault(point.payload["metadata"]["filename"], []).append(point.payload)
+        
+        missing = []
+        for filename, ranges in files:
+            if filename in by_file:
+                self._store_fetched_pages(plan, filename, ranges, by_file[filename])
+            else:
+                missing.append((filename, ranges))
+        if missing:
+            logger.warning(f"No pages found by point ID for {len(missing)} files, falling back to scroll")
+        return missing
+
+    def _fetch_context(self, plan: ContextPlan) -> None:
+        """
+        Fetch every page in the plan that is not in the page cache.
+        
+        With CONTEXT_FETCH_MODE=ids all pages are retrieved by deterministic
+        point ID in a single call; otherwise each file is fetched with one
+        paginated scroll.
+        """
+        logger.debug(f"Fetching context for {len(plan)} files")
+        files = self._read_cached_pages(plan)
+        if CONTEXT_FETCH_MODE == "ids" and files:
+            try:
+                points = self.qclient.retrieve(
+                    collection_name=self.collection_name,
+                    ids=self._context_point_ids(files),
+                    with_payload=CONTEXT_PAYLOAD_FIELDS
+                )
+                count_request_event("context_fetches")
+                files = self._store_retrieved_context(plan, files, points)
+            except Exception as e:
+                logger.error(f"Context retrieval by point ID failed: {str(e)}")
+        for filename, ranges in files:
+            self._store_fetched_pages(plan, filename, ranges, self._fetch_file_context(filename, ranges))
+
+    def _get_context_pages(self, filename: str, center_page_number: int) -> List[Dict]:
+        """Fetch the context window around a single page"""
+        plan = ContextPlan(self.context_window_size)
+        plan.add(filename, center_page_number)
+        self._fetch_context(plan)
+        return plan.pages_for(filename, center_page_number)
+
+    def _get_point_context(self, scored_point, plan: ContextPlan) -> Optional[List[Dict]]:
+        """
+        Slice a scored point's context pages out of a fetched plan.
+        
+        Returns None for generic (non page-based) payloads.
+        """
+        payload = scored_point.payload
+        if not self._has_page_metadata(payload):
+            return None
+        try:
+            return plan.pages_for(payload["metadata"]["filename"], payload["metadata"]["page_number"])
+        except (KeyError, TypeError):
             return []
 
-    def _generate_query_embedding(self, query: str, embedding_model: str) -> List[float]:
+    def _generate_query_embedding(self, query: str, embedding_model: str) -> np.ndarray:
         """
         Generate embedding for a query string.
         
@@ -544,7 +831,7 @@ class SearchSystem:
             embedding_model: Model name (used by Ollama, ignored by Gemini).
             
         Returns:
-            Embedding vector as list of floats.
+            Embedding vector (1-D float32 array).
             
         Raises:
             EmbeddingError: If embedding generation fails.
@@ -558,6 +845,30 @@ class SearchSystem:
             logger.error(f"Embedding generation failed: {str(e)}")
             raise EmbeddingError("Failed to process query") from e
 
+    def _generate_query_embeddings(self, queries: List[str], embedding_model: str) -> np.ndarray:
+        """
+        Generate embeddings for all queries with a single provider call.
+        
+        The provider splits the batch into chunks if it exceeds its limit.
+        
+        Args:
+            queries: Query strings to embed.
+            embedding_model: Model name (kept for backward compatibility).
+            
+        Returns:
+            float32 matrix with one row per query, in query order.
+            
+        Raises:
+            EmbeddingError: If embedding generation fails.
+        """
+        try:
+            embeddings = as_embedding_matrix(self.embedding_client.embed(queries))
+            logger.debug(f"Generated {len(embeddings)} query embeddings in one batch")
+            return embeddings
+        except Exception as e:
+            logger.error(f"Embedding generation failed: {str(e)}")
+            raise EmbeddingError("Failed to process query") from e
+
     def _build_filter_conditions(self, filter_dict: Optional[Dict]) -> Optional[models.Filter]:
         """
         Build Qdrant filter from filter dictionary.
@@ -689,100 +1000,784 @@ class SearchSystem:
             })
             raise SearchException("Invalid filter configuration") from e
 
+    def _build_query_requests(self, embeddings: np.ndarray, filter_: Optional[models.Filter],
+                              limit: int, payload_include: Optional[List[str]] = None,
+                              payload_exclude: Optional[List[str]] = None,
+                              sparse_vectors: Optional[List[models.SparseVector]] = None,
+                              mmr_lambda: Optional[float] = None) -> List[models.QueryRequest]:
+        """
+        One Qdrant query per embedding.
+        
+        With sparse_vectors (hybrid mode) each query prefetches dense and
+        BM25 candidates and Qdrant fuses both lists (HYBRID_FUSION), so the
+        hit scores are fusion scores instead of cosine similarities.
+        With mmr_lambda, limit * MMR_OVERSAMPLE candidates are fetched with
+        their vectors for _diversify.
+        """
+        # Page hits only need metadata once the collection layout is known
+        with_payload = hit_payload_selector(self.collection_info.layout, payload_include, payload_exclude)
+        with_vector = mmr_lambda is not None
+        if with_vector:
+            limit *= MMR_OVERSAMPLE
+        if sparse_vectors is None:
+            return [
+                models.QueryRequest(
+                    # One C-level conversion; gRPC sends the values as packed float32 again
+                    query=embedding.tolist(),
+                    filter=filter_,
+                    limit=limit,
+                    with_payload=with_payload,
+                    with_vector=with_vector
+                )
+                for embedding in embeddings
+            ]
+        
+        prefetch_limit = max(limit, HYBRID_PREFETCH_LIMIT)
+        return [
+            models.QueryRequest(
+                prefetch=[
+                    models.Prefetch(query=embedding.tolist(), filter=filter_, limit=prefetch_limit),
+                    models.Prefetch(query=sparse, using=SPARSE_VECTOR_NAME, filter=filter_, limit=prefetch_limit),
+                ],
+                query=models.FusionQuery(fusion=HYBRID_FUSION),
+                limit=limit,
+                with_payload=with_payload,
+                with_vector=with_vector
+            )
+            for embedding, sparse in zip(embeddings, sparse_vectors)
+        ]
+
+    @staticmethod
+    def _resolve_search_mode(search_mode: Optional[str]) -> str:
+        return (search_mode or SEARCH_MODE).lower()
+
+    def _encode_sparse_queries(self, search_queries: List[str]) -> Optional[List[models.SparseVector]]:
+        """BM25 query vectors, or None (dense fallback) if the collection has no sparse vector"""
+        if SPARSE_VECTOR_NAME not in (self.collection_info.sparse_vectors or {}):
+            if not self._hybrid_fallback_logged:
+                logger.warning(
+                    f"Collection '{self.collection_name}' has no sparse vector '{SPARSE_VECTOR_NAME}', "
+                    "hybrid search falls back to dense search (see app/search/sparse.py)"
+                )
+                self._hybrid_fallback_logged = True
+            return None
+        return [query_sparse_vector(query) for query in search_queries]
+
+    def _sparse_query_vectors(self, search_queries: List[str],
+                              search_mode: Optional[str]) -> Optional[List[models.SparseVector]]:
+        """Sparse query vectors for hybrid search, None for dense search"""
+        if self._resolve_search_mode(search_mode) != "hybrid":
+            return None
+        if self.collection_info.checked_at is None:
+            info = self.qclient.get_collection(self.collection_name)
+            self.collection_info.mark_checked(info.config.params.vectors, info.config.params.sparse_vectors)
+        return self._encode_sparse_queries(search_queries)
+
+    @staticmethod
+    def _resolve_mmr_lambda(mmr: Optional[bool], mmr_lambda: Optional[float]) -> Optional[float]:
+        """MMR trade-off of a call, None when diversity reranking is off"""
+        if not (MMR_ENABLED if mmr is None else mmr):
+            return None
+        return MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+
+    def _diversify(self, batch_response: List[Any], embeddings: np.ndarray, limit: int,
+                   mmr_lambda: Optional[float], hybrid: bool) -> None:
+        """
+        Rerank oversampled hits in place, keeping `limit` diverse hits per query.
+        
+        Runs before the context plan, so near-duplicate hits that were dropped
+        cost no context fetches. Hybrid hits are ranked by their fusion
+        scores, so lexical matches keep their weight.
+        """
+        if mmr_lambda is None:
+            return
+        with stage_timer("rerank", self.collection_name):
+            for query_response, embedding in zip(batch_response, embeddings):
+                query_response.points = mmr_rerank(
+                    query_response.points, embedding, limit, mmr_lambda, use_scores=hybrid
+                )
+
+    def _build_result(self, scored_point, context_pages: Optional[List[Dict]],
+                      seen_pages: set) -> Optional[Dict]:
+        """
+        Build a single result dict from a scored point and its context pages.
+        
+        Args:
+            scored_point: Point returned by the vector query
+            context_pages: Context pages from _get_point_context (None for generic payloads)
+            seen_pages: (filename, page_number) pairs already used by earlier results of the same query
+            
+        Returns:
+            Result dict, or None if the payload is malformed
+        """
+        payload = scored_point.payload
+        
+        if context_pages is not None:
+            # Page-based content collection (e.g., "content")
+            try:
+                # Deduplicate: filter out pages already seen in previous results
+                filename = payload["metadata"]["filename"]
+                unique_pages = []
+                for page in context_pages:
+                    page_id = (filename, page["metadata"]["page_number"])
+                    if page_id not in seen_pages:
+                        unique_pages.append(page)
+                        seen_pages.add(page_id)
+                
+                page_numbers = [p["metadata"]["page_number"] for p in unique_pages]
+                return {
+                    "filename": filename,
+                    "score": scored_point.score,
+                    "center_page": payload["metadata"]["page_number"],
+                    # Pages were whitespace-cleaned when fetched; skip pages left empty
+                    "combined_page": " ".join(p["pagecontent"] for p in unique_pages if p.get("pagecontent")),
+                    "page_numbers": page_numbers
+                }
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Skipping malformed page-based payload: {str(e)}")
+                return None
+        
+        # Generic/flexible collection structure (e.g., filenames)
+        # Return clean, non-redundant fields
+        result = {
+            "score": scored_point.score
+        }
+        
+        # Extract filename from source or pagecontent
+        if "source" in payload:
+            result["filename"] = payload["source"]
+        elif "pagecontent" in payload:
+            result["filename"] = payload["pagecontent"]
+        
+        # Add metadata if present
+        if "metadata" in payload:
+            result["metadata"] = payload["metadata"]
+        
+        return result
+
+    def _assemble_query_results(self, query_response, plan: ContextPlan) -> List[Dict]:
+        """Build the result list of one query from its hits and the fetched context"""
+        query_results = []
+        seen_pages = set()  # Track (filename, page_number) to deduplicate across results
+        
+        for scored_point in query_response.points:
+            context_pages = self._get_point_context(scored_point, plan)
+            result = self._build_result(scored_point, context_pages, seen_pages)
+            if result is not None:
+                query_results.append(result)
+        return query_results
+
+    def _semantic_partition(self, filter: Optional[Dict], limit: int, embedding_model: str,
+                            window_size: int, payload_include: Optional[List[str]],
+                            payload_exclude: Optional[List[str]], mmr_lambda: Optional[float]) -> tuple:
+        """Semantic cache partition: everything but the query text that shapes the results"""
+        return (
+            self.flight_scope, self.collection_name, embedding_model,
+            json.dumps(filter, sort_keys=True, default=str), limit, window_size,
+            tuple(payload_include or ()), tuple(payload_exclude or ()), mmr_lambda
+        )
+
+    def _cached_results(self, partition: Optional[tuple],
+                        embeddings: np.ndarray) -> Tuple[List[Optional[List[Dict]]], List[int]]:
+        """
+        Look up results of near-duplicate queries in the semantic cache
+        (partition None bypasses it).
+        
+        Returns:
+            (results per query, None where not cached; indices of queries to search)
+        """
+        if self.semantic_cache is None or partition is None:
+            return [None] * len(embeddings), list(range(len(embeddings)))
+        results = self.semantic_cache.get_many(partition, embeddings)
+        missing = [index for index, query_results in enumerate(results) if query_results is None]
+        if len(missing) < len(results):
+            count_request_event("semantic_cache_hits", len(results) - len(missing))
+        return results, missing
+
+    def _merge_searched_results(self, partition: Optional[tuple], embeddings: np.ndarray,
+                                results: List[Optional[List[Dict]]], missing: List[int],
+                                searched: List[List[Dict]]) -> List[List[Dict]]:
+        """Fill in results of the searched queries and store them in the semantic cache"""
+        for index, query_results in zip(missing, searched):
+            results[index] = query_results
+        if self.semantic_cache is not None and partition is not None and missing:
+            self.semantic_cache.put_many(partition, embeddings[missing], searched)
+        return results
+
     def batch_search(self, search_queries: List[str], filter: Optional[Dict], 
-                    limit: int = 5, embedding_model: str = "mxbai-embed-large") -> List[List[Dict]]:
+                    limit: int = 5, embedding_model: str = "mxbai-embed-large",
+                    context_window_size: Optional[int] = None,
+                    payload_include: Optional[List[str]] = None,
+                    payload_exclude: Optional[List[str]] = None,
+                    search_mode: Optional[str] = None, mmr: Optional[bool] = None,
+                    mmr_lambda: Optional[float] = None) -> List[List[Dict]]:
+        """
+        Run all queries in one batch and assemble results with context pages.
+        
+        context_window_size overrides the instance default for this call only,
+        so one instance can serve requests with different window sizes.
+        search_mode ("dense" or "hybrid") overrides SEARCH_MODE; mmr and
+        mmr_lambda override MMR_ENABLED and MMR_LAMBDA.
+        
+        With the semantic cache enabled, queries matching a cached query are
+        answered from the cache; only the others are searched. Hybrid searches
+        bypass it: near-identical embeddings can differ in the exact terms
+        (e.g. error codes) that hybrid search is meant to match.
+        """
+        window_size = context_window_size if context_window_size is not None else self.context_window_size
+        mmr_lambda = self._resolve_mmr_lambda(mmr, mmr_lambda)
         try:
             # Build filter conditions using the new helper method
             filter_ = self._build_filter_conditions(filter)
 
-            search_requests = []
-            for query in search_queries:
-                embedding = self._generate_query_embedding(query, embedding_model)
-                search_requests.append(
-                    models.QueryRequest(
-                        query=embedding,
-                        filter=filter_,
-                        limit=limit,
-                        with_payload=True
+            with stage_timer("embed", self.collection_name):
+                embeddings = self._generate_query_embeddings(search_queries, embedding_model)
+                sparse_vectors = self._sparse_query_vectors(search_queries, search_mode)
+
+            partition = None if sparse_vectors is not None else self._semantic_partition(
+                filter, limit, embedding_model, window_size, payload_include, payload_exclude, mmr_lambda
+            )
+            results, missing = self._cached_results(partition, embeddings)
+            if not missing:
+                return results
+
+            with stage_timer("vector_search", self.collection_name):
+                batch_response = self.qclient.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._build_query_requests(
+                        embeddings[missing], filter_, limit, payload_include, payload_exclude,
+                        None if sparse_vectors is None else [sparse_vectors[index] for index in missing],
+                        mmr_lambda
                     )
                 )
+            self._diversify(batch_response, embeddings[missing], limit, mmr_lambda, sparse_vectors is not None)
+
+            # Fetch context for the whole batch: one scroll per distinct file
+            plan = self._plan_context(batch_response, window_size)
+            with stage_timer("context", self.collection_name):
+                self._fetch_context(plan)
+
+            with stage_timer("assemble", self.collection_name):
+                searched = [self._assemble_query_results(query_response, plan) for query_response in batch_response]
+            return self._merge_searched_results(partition, embeddings, results, missing, searched)
+
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            raise SearchException("Search operation failed") from e
+
+    def iter_batch_search(self, search_queries: List[str], filter: Optional[Dict],
+                          limit: int = 5, embedding_model: str = "mxbai-embed-large",
+                          context_window_size: Optional[int] = None,
+                          payload_include: Optional[List[str]] = None,
+                          payload_exclude: Optional[List[str]] = None,
+                          search_mode: Optional[str] = None, mmr: Optional[bool] = None,
+                          mmr_lambda: Optional[float] = None) -> Iterator[List[Dict]]:
+        """
+        Generator version of batch_search yielding each query's results in order.
+        
+        Embedding and vector search still run once for the whole batch; context
+        pages are fetched and results assembled one query at a time, so the
+        first results are available early and only one query's pages are held.
+        """
+        window_size = context_window_size if context_window_size is not None else self.context_window_size
+        mmr_lambda = self._resolve_mmr_lambda(mmr, mmr_lambda)
+        try:
+            filter_ = self._build_filter_conditions(filter)
+            with stage_timer("embed", self.collection_name):
+                embeddings = self._generate_query_embeddings(search_queries, embedding_model)
+                sparse_vectors = self._sparse_query_vectors(search_queries, search_mode)
+            with stage_timer("vector_search", self.collection_name):
+                batch_response = self.qclient.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._build_query_requests(
+                        embeddings, filter_, limit, payload_include, payload_exclude, sparse_vectors, mmr_lambda
+                    )
+                )
+            self._diversify(batch_response, embeddings, limit, mmr_lambda, sparse_vectors is not None)
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            raise SearchException("Search operation failed") from e
+
+        for index, query_response in enumerate(batch_response):
+            batch_response[index] = None  # Release hits of already streamed queries
+            try:
+                plan = self._plan_context([query_response], window_size)
+                with stage_timer("context", self.collection_name):
+                    self._fetch_context(plan)
+                with stage_timer("assemble", self.collection_name):
+                    query_results = self._assemble_query_results(query_response, plan)
+            except Exception as e:
+                logger.error(f"Batch search failed: {str(e)}")
+                raise SearchException("Search operation failed") from e
+            yield query_results
+
+
+class AsyncSearchSystem(SearchSystem):
+    """
+    Async-native variant of SearchSystem.
+    
+    Uses AsyncQdrantClient and async embedding clients so that waiting on
+    Qdrant or the embedding provider never blocks the event loop. Request
+    validation, filter building and result assembly are shared with
+    SearchSystem; only the I/O methods are overridden.
+    
+    Construct with `await AsyncSearchSystem.create(...)` so the collection
+    check can be awaited.
+    """
+    _async_qdrant_pool_dev = None
+    _async_qdrant_pool_prod = None
+    _async_embedding_client = None  # Singleton async embedding client
+    _client_pool = None  # Shared pool of clients for custom Qdrant parameters
+
+    def __init__(self, collection_name: str, use_production: bool = False,
+                 qdrant_url: Optional[str] = None,
+                 qdrant_api_key: Optional[str] = None,
+                 qdrant_verify_ssl: Optional[bool] = None,
+                 context_window_size: Optional[int] = None):
+        self._init_settings(collection_name, use_production, qdrant_url, qdrant_api_key,
+                            qdrant_verify_ssl, context_window_size)
+        
+        if self.use_custom_client:
+            # Leased from the client pool in create()
+            self.qclient = None
+            self.custom_client = True
+            self._custom_params = (qdrant_url, qdrant_api_key, qdrant_verify_ssl)
+            # Credentials are part of the key: callers never share results across API keys
+            self.flight_scope = ClientPool.make_key(qdrant_url, qdrant_api_key, qdrant_verify_ssl)
+        else:
+            self.qclient = self._get_async_qdrant_client(use_production)
+            self.custom_client = False
+            self.flight_scope = self.cache_scope
+        
+        self.embedding_client = self._get_async_embedding_client()
+        
+        # Keep Ollama client for backward compatibility (/health reports on it)
+        self.oclient = self._get_ollama_client()
+
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncSearchSystem":
+        """Construct the search system and ensure the collection exists"""
+        system = cls(*args, **kwargs)
+        try:
+            if system.custom_client:
+                system.qclient = await cls._get_client_pool().acquire(*system._custom_params)
+            await system._ensure_collection()
+        except Exception:
+            await system.aclose()
+            raise
+        return system
+
+    def close(self):
+        """Async clients are returned to the pool via aclose()"""
+
+    def __del__(self):
+        """Async clients are returned to the pool via aclose()"""
+
+    async def aclose(self):
+        """Return the custom client leased for this request to the pool, if any"""
+        if self.custom_client and self.qclient is not None:
+            client, self.qclient = self.qclient, None
+            await self._get_client_pool().release(client)
+
+    @classmethod
+    def _get_client_pool(cls) -> ClientPool:
+        """Get the shared pool of clients for custom Qdrant parameters"""
+        if AsyncSearchSystem._client_pool is None:
+            AsyncSearchSystem._client_pool = ClientPool(
+                factory=lambda url, api_key, verify_ssl, use_production: SearchSystem._create_async_qdrant_client(
+                    url, api_key, verify_ssl, use_production=use_production, is_pooled=True
+                ),
+                max_clients=QDRANT_CLIENT_POOL_MAX_SIZE,
+                idle_timeout_seconds=QDRANT_CLIENT_POOL_IDLE_SECONDS
+            )
+        return AsyncSearchSystem._client_pool
+
+    @classmethod
+    async def close_clients(cls):
+        """Close pooled and environment Qdrant clients (application shutdown)"""
+        if AsyncSearchSystem._client_pool is not None:
+            await AsyncSearchSystem._client_pool.close_all()
+        for pool_attr in ('_async_qdrant_pool_dev', '_async_qdrant_pool_prod'):
+            client = getattr(AsyncSearchSystem, pool_attr)
+            if client is not None:
+                setattr(AsyncSearchSystem, pool_attr, None)
+                try:
+                    await client.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close Qdrant client: {str(e)}")
+
+    @classmethod
+    async def close_embedding_clients(cls):
+        """Close the shared embedding clients (HTTP sessions, inference threads) on shutdown"""
+        for owner, attr in ((AsyncSearchSystem, '_async_embedding_client'), (SearchSystem, '_embedding_client')):
+            client = getattr(owner, attr)
+            if client is not None:
+                setattr(owner, attr, None)
+                try:
+                    await close_embedding_client(client)
+                except Exception as e:
+                    logger.warning(f"Failed to close embedding client: {str(e)}")
+
+    @classmethod
+    def _get_async_qdrant_client(cls, use_production: bool = False) -> AsyncQdrantClient:
+        """Get pooled async Qdrant client using environment configuration"""
+        pool_attr = '_async_qdrant_pool_prod' if use_production else '_async_qdrant_pool_dev'
+        
+        if getattr(cls, pool_attr) is None:
+            try:
+                client = cls._create_async_qdrant_client(
+                    qdrant_url=None,
+                    qdrant_api_key=None,
+                    qdrant_verify_ssl=None,
+                    use_production=use_production,
+                    is_pooled=True
+                )
+                setattr(cls, pool_attr, client)
+            except Exception as e:
+                logger.error(f"Qdrant connection failed: {str(e)}")
+                raise QdrantConnectionError("Database connection error")
+        
+        return getattr(cls, pool_attr)
+
+    @classmethod
+    def _get_async_embedding_client(cls) -> AsyncEmbeddingClient:
+        """Get singleton async embedding client based on environment configuration"""
+        if cls._async_embedding_client is None:
+            try:
+                cls._async_embedding_client = EmbeddingProviderFactory.async_from_env(
+                    wrap=instrument_embedding_client, on_batch=observe_embedding_batch
+                )
+                logger.info("Async embedding client initialized successfully")
+            except ValueError as e:
+                logger.error(f"Embedding client configuration error: {str(e)}")
+                raise
+            except Exception as e:
+                logger.error(f"Embedding client initialization failed: {str(e)}")
+                raise EmbeddingError("Embedding service initialization error") from e
+        return cls._async_embedding_client
 
-            batch_response = self.qclient.query_batch_points(
+    async def _ensure_collection(self):
+        if not await self.qclient.collection_exists(self.collection_name):
+            await self.qclient.create_collection(
                 collection_name=self.collection_name,
-                requests=search_requests
+                vectors_config=models.VectorParams(
+                    size=DEFAULT_VECTOR_SIZE,
+                    distance=models.Distance.COSINE
+                ),
+                sparse_vectors_config=sparse_vectors_config(SPARSE_VECTOR_NAME)
             )
+            logger.info(f"Created collection '{self.collection_name}' with vector size {DEFAULT_VECTOR_SIZE}")
 
-            results = []
-            for query_response in batch_response:
-                query_results = []
-                seen_pages = set()  # Track (filename, page_number) to deduplicate across results
-                
-                for scored_point in query_response.points:
-                    payload = scored_point.payload
-                    
-                    # Detect collection type based on payload structure
-                    has_page_structure = (
-                        "metadata" in payload and
-                        "filename" in payload.get("metadata", {}) and
-                        "page_number" in payload.get("metadata", {})
+    async def refresh_collection_info(self):
+        """Ensure the collection exists and cache its vector configuration"""
+        await self._ensure_collection()
+        info = await self.qclient.get_collection(self.collection_name)
+        self.collection_info.mark_checked(info.config.params.vectors, info.config.params.sparse_vectors)
+        collection_labels.admit(self.collection_name)
+
+    async def _sparse_query_vectors(self, search_queries: List[str],
+                                    search_mode: Optional[str]) -> Optional[List[models.SparseVector]]:
+        """Sparse query vectors for hybrid search, None for dense search"""
+        if self._resolve_search_mode(search_mode) != "hybrid":
+            return None
+        if self.collection_info.checked_at is None:
+            await self.refresh_collection_info()
+        return self._encode_sparse_queries(search_queries)
+
+    async def collection_marker(self) -> str:
+        """
+        Marker that changes when points are added or removed (response cache versions).
+
+        In-place overwrites of existing point IDs (e.g. re-ingesting with
+        deterministic page IDs) keep it unchanged and need POST
+        /cache/invalidate. Segment counts are left out: optimizer merges
+        change them without changing any content.
+        """
+        info = await self.qclient.get_collection(self.collection_name)
+        return f"{info.points_count}-{info.indexed_vectors_count}"
+
+    async def _fetch_file_context(self, filename: str, ranges: List[tuple]) -> Optional[List[Dict]]:
+        try:
+            scroll_args = self._context_scroll_args(filename, ranges)
+            pages = []
+            offset = None
+            while True:
+                points, offset = await self.qclient.scroll(offset=offset, **scroll_args)
+                count_request_event("context_fetches")
+                pages.extend(self._select_file_pages(filename, points))
+                if offset is None:
+                    break
+            logger.debug(f"Retrieved {len(pages)} context pages for {filename}")
+            return pages
+        except Exception as e:
+            logger.error(f"Context retrieval failed for {filename}: {str(e)}")
+            return None
+
+    async def _fetch_context(self, plan: ContextPlan) -> None:
+        """Fetch uncached pages in the plan (by point ID, or one concurrent scroll per file)"""
+        logger.debug(f"Fetching context for {len(plan)} files")
+        files = self._read_cached_pages(plan)
+        if CONTEXT_FETCH_MODE == "ids" and files:
+            try:
+                points = await self.qclient.retrieve(
+                    collection_name=self.collection_name,
+                    ids=self._context_point_ids(files),
+                    with_payload=CONTEXT_PAYLOAD_FIELDS
+                )
+                count_request_event("context_fetches")
+                files = self._store_retrieved_context(plan, files, points)
+            except Exception as e:
+                logger.error(f"Context retrieval by point ID failed: {str(e)}")
+        fetched = await asyncio.gather(*(
+            self._fetch_file_context(filename, ranges) for filename, ranges in files
+        ))
+        for (filename, ranges), pages in zip(files, fetched):
+            self._store_fetched_pages(plan, filename, ranges, pages)
+
+    async def _get_context_pages(self, filename: str, center_page_number: int) -> List[Dict]:
+        plan = ContextPlan(self.context_window_size)
+        plan.add(filename, center_page_number)
+        await self._fetch_context(plan)
+        return plan.pages_for(filename, center_page_number)
+
+    @staticmethod
+    async def _coalesce(flights: SingleFlight, kind: str, key: Any, fn) -> Any:
+        """
+        Await fn(), sharing one execution among concurrent identical calls.
+        
+        The shared call records its stages in its own RequestTimings, which
+        are added to the timings of every caller (leader and waiters alike).
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return await fn()
+        
+        async def run():
+            # Runs in the flight's task: the timings only replace the leader's there
+            timings = RequestTimings()
+            request_timings.set(timings)
+            return await fn(), timings
+        
+        (result, shared_timings), shared = await flights.do(key, run)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.merge(shared_timings)
+        if shared:
+            COALESCED_CALLS.labels(kind=kind).inc()
+            count_request_event(f"coalesced_{kind}")
+        return result
+
+    async def _generate_query_embedding(self, query: str, embedding_model: str) -> np.ndarray:
+        return await self._coalesce(
+            embedding_flights, "embedding", ("one", embedding_model, query),
+            lambda: self._embed_query(query)
+        )
+
+    async def _generate_query_embeddings(self, queries: List[str], embedding_model: str) -> np.ndarray:
+        return await self._coalesce(
+            embedding_flights, "embedding", ("batch", embedding_model, tuple(queries)),
+            lambda: self._embed_queries(queries)
+        )
+
+    async def _embed_query(self, query: str) -> np.ndarray:
+        try:
+            embedding = await self.embedding_client.embed_one(query)
+            logger.debug(f"Generated embedding for query: {query[:50]}... (dim={len(embedding)})")
+            return embedding
+        except Exception as e:
+            logger.error(f"Embedding generation failed: {str(e)}")
+            raise EmbeddingError("Failed to process query") from e
+
+    async def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        try:
+            embeddings = as_embedding_matrix(await self.embedding_client.embed(queries))
+            logger.debug(f"Generated {len(embeddings)} query embeddings in one batch")
+            return embeddings
+        except Exception as e:
+            logger.error(f"Embedding generation failed: {str(e)}")
+            raise EmbeddingError("Failed to process query") from e
+
+    async def batch_search(self, search_queries: List[str], filter: Optional[Dict],
+                           limit: int = 5, embedding_model: str = "mxbai-embed-large",
+                           context_window_size: Optional[int] = None,
+                           payload_include: Optional[List[str]] = None,
+                           payload_exclude: Optional[List[str]] = None,
+                           search_mode: Optional[str] = None, mmr: Optional[bool] = None,
+                           mmr_lambda: Optional[float] = None) -> List[List[Dict]]:
+        """
+        Run all queries in one batch and assemble results with context pages.
+        
+        Concurrent calls with an identical canonical request (cluster and
+        credentials, collection, queries, filter, limit, model, window,
+        payload fields, search mode and MMR setting) run once and share the result.
+        """
+        window_size = context_window_size if context_window_size is not None else self.context_window_size
+        search_mode = self._resolve_search_mode(search_mode)
+        mmr_lambda = self._resolve_mmr_lambda(mmr, mmr_lambda)
+        key = (
+            self.flight_scope, self.collection_name, tuple(search_queries),
+            json.dumps(filter, sort_keys=True, default=str), limit, embedding_model, window_size,
+            tuple(payload_include or ()), tuple(payload_exclude or ()), search_mode, mmr_lambda
+        )
+        return await self._coalesce(search_flights, "search", key, lambda: self._run_batch_search(
+            search_queries, filter, limit, embedding_model, window_size, payload_include, payload_exclude,
+            search_mode, mmr_lambda
+        ))
+
+    async def _run_batch_search(self, search_queries: List[str], filter: Optional[Dict], limit: int,
+                                embedding_model: str, window_size: int,
+                                payload_include: Optional[List[str]],
+                                payload_exclude: Optional[List[str]],
+                                search_mode: str, mmr_lambda: Optional[float]) -> List[List[Dict]]:
+        try:
+            filter_ = self._build_filter_conditions(filter)
+
+            with stage_timer("embed", self.collection_name):
+                embeddings = await self._generate_query_embeddings(search_queries, embedding_model)
+                sparse_vectors = await self._sparse_query_vectors(search_queries, search_mode)
+
+            partition = None if sparse_vectors is not None else self._semantic_partition(
+                filter, limit, embedding_model, window_size, payload_include, payload_exclude, mmr_lambda
+            )
+            results, missing = self._cached_results(partition, embeddings)
+            if not missing:
+                return results
+
+            with stage_timer("vector_search", self.collection_name):
+                batch_response = await self.qclient.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._build_query_requests(
+                        embeddings[missing], filter_, limit, payload_include, payload_exclude,
+                        None if sparse_vectors is None else [sparse_vectors[index] for index in missing],
+                        mmr_lambda
                     )
-                    
-                    if has_page_structure:
-                        # Page-based content collection (e.g., "content")
-                        try:
-                            context_pages = self._get_context_pages(
-                                filename=payload["metadata"]["filename"],
-                                center_page_number=payload["metadata"]["page_number"]
-                            )
-                            
-                            # Deduplicate: filter out pages already seen in previous results
-                            filename = payload["metadata"]["filename"]
-                            unique_pages = []
-                            for page in context_pages:
-                                page_id = (filename, page["metadata"]["page_number"])
-                                if page_id not in seen_pages:
-                                    unique_pages.append(page)
-                                    seen_pages.add(page_id)
-                            
-                            page_numbers = [p["metadata"]["page_number"] for p in unique_pages]
-                            result = {
-                                "filename": filename,
-                                "score": scored_point.score,
-                                "center_page": payload["metadata"]["page_number"],
-                                "combined_page": " ".join(p.get("pagecontent", "") for p in unique_pages),
-                                "page_numbers": page_numbers
-                            }
-                        except (KeyError, TypeError) as e:
-                            logger.warning(f"Skipping malformed page-based payload: {str(e)}")
-                            continue
-                    else:
-                        # Generic/flexible collection structure (e.g., filenames)
-                        # Return clean, non-redundant fields
-                        result = {
-                            "score": scored_point.score
-                        }
-                        
-                        # Extract filename from source or pagecontent
-                        if "source" in payload:
-                            result["filename"] = payload["source"]
-                        elif "pagecontent" in payload:
-                            result["filename"] = payload["pagecontent"]
-                        
-                        # Add metadata if present
-                        if "metadata" in payload:
-                            result["metadata"] = payload["metadata"]
-                    
-                    query_results.append(result)
-                results.append(query_results)
-            
-            return results
+                )
+            self._diversify(batch_response, embeddings[missing], limit, mmr_lambda, sparse_vectors is not None)
+
+            # Fetch context for the whole batch: one scroll per distinct file
+            plan = self._plan_context(batch_response, window_size)
+            with stage_timer("context", self.collection_name):
+                await self._fetch_context(plan)
+
+            with stage_timer("assemble", self.collection_name):
+                searched = [self._assemble_query_results(query_response, plan) for query_response in batch_response]
+            return self._merge_searched_results(partition, embeddings, results, missing, searched)
 
         except Exception as e:
             logger.error(f"Batch search failed: {str(e)}")
             raise SearchException("Search operation failed") from e
 
+    async def iter_batch_search(self, search_queries: List[str], filter: Optional[Dict],
+                                limit: int = 5, embedding_model: str = "mxbai-embed-large",
+                                context_window_size: Optional[int] = None,
+                                payload_include: Optional[List[str]] = None,
+                                payload_exclude: Optional[List[str]] = None,
+                                search_mode: Optional[str] = None, mmr: Optional[bool] = None,
+                                mmr_lambda: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Async generator version of batch_search (see SearchSystem.iter_batch_search)"""
+        window_size = context_window_size if context_window_size is not None else self.context_window_size
+        mmr_lambda = self._resolve_mmr_lambda(mmr, mmr_lambda)
+        try:
+            filter_ = self._build_filter_conditions(filter)
+            with stage_timer("embed", self.collection_name):
+                embeddings = await self._generate_query_embeddings(search_queries, embedding_model)
+                sparse_vectors = await self._sparse_query_vectors(search_queries, search_mode)
+            with stage_timer("vector_search", self.collection_name):
+                batch_response = await self.qclient.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._build_query_requests(
+                        embeddings, filter_, limit, payload_include, payload_exclude, sparse_vectors, mmr_lambda
+                    )
+                )
+            self._diversify(batch_response, embeddings, limit, mmr_lambda, sparse_vectors is not None)
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            raise SearchException("Search operation failed") from e
+
+        for index, query_response in enumerate(batch_response):
+            batch_response[index] = None  # Release hits of already streamed queries
+            try:
+                plan = self._plan_context([query_response], window_size)
+                with stage_timer("context", self.collection_name):
+                    await self._fetch_context(plan)
+                with stage_timer("assemble", self.collection_name):
+                    query_results = self._assemble_query_results(query_response, plan)
+            except Exception as e:
+                logger.error(f"Batch search failed: {str(e)}")
+                raise SearchException("Search operation failed") from e
+            yield query_results
+
+# Warm AsyncSearchSystem per (collection, environment) for requests
+# without custom Qdrant parameters
+search_registry = SearchSystemRegistry(
+    factory=AsyncSearchSystem,
+    ttl_seconds=COLLECTION_INFO_TTL_SECONDS
+)
+
+# Filename indexes per (Qdrant cluster, collection) for /search/filenames
+filename_indexes = FilenameIndexManager(refresh_seconds=FILENAME_INDEX_REFRESH_SECONDS)
+# Sorted filenames with page counts per (Qdrant cluster, collection) for list mode
+filename_listings = FilenameIndexManager(
+    refresh_seconds=FILENAME_INDEX_REFRESH_SECONDS, factory=FilenameListing
+)
+
+# In-flight embedding calls and searches shared by concurrent identical requests
+embedding_flights = SingleFlight()
+search_flights = SingleFlight()
+
+def _create_response_cache() -> Optional[ResponseCache]:
+    """Response cache from RESPONSE_CACHE_* settings, or None when disabled"""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if RESPONSE_CACHE_URL:
+        backend = RespResponseBackend(RESPONSE_CACHE_URL)
+    else:
+        backend = InMemoryResponseBackend(max_bytes=RESPONSE_CACHE_MAX_BYTES)
+    logger.info(f"Response cache enabled ({type(backend).__name__}, ttl={RESPONSE_CACHE_TTL_SECONDS}s)")
+    return ResponseCache(
+        backend,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+        stale_seconds=RESPONSE_CACHE_STALE_SECONDS,
+        version_poll_seconds=RESPONSE_CACHE_VERSION_POLL_SECONDS
+    )
+
+# Rendered /search responses of identical requests (RESPONSE_CACHE_ENABLED)
+response_cache = _create_response_cache()
+
+# Caches reported on /metrics (read at scrape time; disabled caches are skipped)
+def _embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    cache = getattr(AsyncSearchSystem._async_embedding_client, "cache", None)
+    return cache.stats() if cache is not None else None
+
+CACHE_STATS.register("page", lambda: SearchSystem._page_cache.stats() if SearchSystem._page_cache else None)
+CACHE_STATS.register("embedding", _embedding_cache_stats)
+CACHE_STATS.register("response", lambda: response_cache.stats() if response_cache else None)
+CACHE_STATS.register(
+    "semantic", lambda: SearchSystem._semantic_cache.stats() if SearchSystem._semantic_cache else None
+)
+
+def _embedding_queue_depth() -> int:
+    """Texts queued in the micro-batching layer of the async embedding client (0 if disabled)"""
+    client = AsyncSearchSystem._async_embedding_client
+    # Wrappers (cache, batching, metrics) keep the wrapped client in .client
+    for _ in range(4):
+        if isinstance(client, AsyncBatchingEmbeddingClient):
+            return client.queued_texts
+        client = getattr(client, "client", None)
+    return 0
+
+EMBEDDING_QUEUE_DEPTH.set_function(_embedding_queue_depth)
+
 # ======== FastAPI Setup ========
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled Qdrant connections and embedding clients on shutdown
+    await AsyncSearchSystem.close_clients()
+    await AsyncSearchSystem.close_embedding_clients()
+    if response_cache is not None:
+        await response_cache.close()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -801,11 +1796,20 @@ class SearchRequest(BaseModel):
     qdrant_url: Optional[str] = Field(default=None, description="Override Qdrant URL for this request")
     qdrant_api_key: Optional[str] = Field(default=None, description="Override Qdrant API key for this request")
     qdrant_verify_ssl: Optional[bool] = Field(default=None, description="Override SSL verification for this request")
+    payload_include: Optional[List[str]] = Field(default=None, description="Only return these payload fields (e.g. 'metadata.filename') for non page-based hits")
+    payload_exclude: Optional[List[str]] = Field(default=None, description="Return all payload fields except these for non page-based hits")
+    stream: Optional[str] = Field(default=None, pattern="^(ndjson|sse)$", description="Stream each query's results as soon as they are ready: 'ndjson' (newline-delimited JSON) or 'sse' (server-sent events)")
+    include_timings: Optional[bool] = Field(default=False, description="Add a 'timings' block with per-stage durations (ms) to the response")
+    search_mode: Optional[str] = Field(default=None, pattern="^(dense|hybrid)$", description="'dense' (embeddings only) or 'hybrid' (dense + BM25 sparse vector, fused by Qdrant; scores are fusion scores). Overrides SEARCH_MODE env var.")
+    mmr: Optional[bool] = Field(default=None, description="Rerank oversampled hits with Maximal Marginal Relevance so results spread over different documents/sections instead of adjacent pages. Overrides MMR_ENABLED env var.")
+    mmr_lambda: Optional[confloat(ge=0, le=1)] = Field(default=None, description="MMR relevance/diversity trade-off: 1 keeps the relevance order, lower values favor diversity. Overrides MMR_LAMBDA env var.")
 
 @app.middleware("http")
 async def add_correlation_id(request: Request, call_next):
     corr_id = str(uuid.uuid4())
     correlation_id.set(corr_id)
+    timings = RequestTimings()
+    request_timings.set(timings)
     
     logger.info("Request started", extra={
         "path": request.url.path,
@@ -822,18 +1826,175 @@ async def add_correlation_id(request: Request, call_next):
         logger.info("Request completed")
     
     response.headers["X-Correlation-ID"] = corr_id
+    if SERVER_TIMING_ENABLED:
+        # Streaming responses only cover the stages that ran before the first event
+        response.headers["Server-Timing"] = timings.server_timing()
     return response
 
+def _metrics_path(request: Request) -> str:
+    """Route path used as metric label (unknown paths are grouped to bound cardinality)"""
+    path = request.url.path
+    return path if any(getattr(route, "path", None) == path for route in app.routes) else "other"
+
+@app.middleware("http")
+async def track_request_metrics(request: Request, call_next):
+    path = _metrics_path(request)
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(path=path)
+    in_flight.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method, path=path, status=str(status_code)
+        ).observe(time.perf_counter() - start)
+
+@app.get("/metrics")
+async def metrics(authenticated: bool = Depends(verify_api_key)):
+    """Prometheus metrics: per-stage search latency, embedding provider calls, caches, HTTP"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check(authenticated: bool = Depends(verify_api_key)):
     return {
         "status": "ok",
         "services": {
-            "qdrant": "ok" if (SearchSystem._qdrant_pool_dev or SearchSystem._qdrant_pool_prod) else "offline",
+            "qdrant": "ok" if (
+                SearchSystem._qdrant_pool_dev or SearchSystem._qdrant_pool_prod or
+                AsyncSearchSystem._async_qdrant_pool_dev or AsyncSearchSystem._async_qdrant_pool_prod
+            ) else "offline",
             "ollama": "ok" if SearchSystem._ollama_pool else "offline"
         }
     }
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _stream_event(stream_format: str, event: str, data: Dict) -> str:
+    """Encode one stream event as an NDJSON line or an SSE message"""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+async def _streaming_search_response(system: AsyncSearchSystem, search_request: SearchRequest) -> StreamingResponse:
+    """
+    Stream each query's results as soon as they are ready.
+    
+    The first query is awaited before responding, so failures of the shared
+    embedding/search stage still produce a regular HTTP error. Later failures
+    are sent as an "error" event that ends the stream.
+    """
+    stream_format = search_request.stream
+    query_results = system.iter_batch_search(
+        search_queries=search_request.search_queries,
+        filter=search_request.filter,
+        limit=search_request.limit,
+        embedding_model=search_request.embedding_model,
+        context_window_size=search_request.context_window_size,
+        payload_include=search_request.payload_include,
+        payload_exclude=search_request.payload_exclude,
+        search_mode=search_request.search_mode,
+        mmr=search_request.mmr,
+        mmr_lambda=search_request.mmr_lambda
+    )
+    try:
+        first = await query_results.__anext__()
+    except BaseException:
+        await query_results.aclose()
+        await system.aclose()
+        raise
+
+    async def events():
+        index = 0
+        results = first
+        try:
+            while True:
+                yield _stream_event(stream_format, "result", {
+                    "query_index": index,
+                    "query": search_request.search_queries[index],
+                    "results": results
+                })
+                index += 1
+                try:
+                    results = await query_results.__anext__()
+                except StopAsyncIteration:
+                    break
+            yield _stream_event(stream_format, "done", {"total_queries": index})
+            logger.info("Streaming search completed", extra={"query_count": index})
+        except Exception as e:
+            logger.error(f"Streaming search failed: {str(e)}")
+            yield _stream_event(stream_format, "error", {
+                "query_index": index,
+                "detail": "Search processing failed"
+            })
+        finally:
+            await query_results.aclose()
+            await system.aclose()
+
+    return StreamingResponse(events(), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+def _render_results(results: List[List[Dict]]) -> bytes:
+    """Serialize search results to JSON, timing the serialization"""
+    with request_timer("serialize"):
+        return json.dumps(results, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _search_json_response(rendered: bytes, include_timings: bool, cache_status: Optional[str] = None) -> Response:
+    """
+    Build the /search response from rendered results.
+    
+    Results are rendered first so the optional "timings" block (appended to
+    the same JSON object) can include the serialization time itself.
+    cache_status (HIT, STALE or MISS) is reported in an X-Cache header.
+    """
+    body = b'{"results":' + rendered
+    timings = request_timings.get()
+    if include_timings and timings is not None:
+        body += b',"timings":' + json.dumps(timings.as_dict()).encode("utf-8")
+    headers = {"X-Cache": cache_status} if cache_status else None
+    return Response(content=body + b"}", media_type="application/json", headers=headers)
+
+def _batch_search_args(search_request: SearchRequest) -> Dict[str, Any]:
+    return {
+        "search_queries": search_request.search_queries,
+        "filter": search_request.filter,
+        "limit": search_request.limit,
+        "embedding_model": search_request.embedding_model,
+        "context_window_size": search_request.context_window_size,
+        "payload_include": search_request.payload_include,
+        "payload_exclude": search_request.payload_exclude,
+        "search_mode": search_request.search_mode,
+        "mmr": search_request.mmr,
+        "mmr_lambda": search_request.mmr_lambda,
+    }
+
+async def _response_cache_key(system: AsyncSearchSystem, search_request: SearchRequest) -> Optional[str]:
+    """Response cache key of a request, or None to bypass the cache"""
+    try:
+        version = await response_cache.collection_version(
+            system.cache_scope, system.collection_name, system.collection_marker
+        )
+    except Exception as e:
+        logger.warning(f"Response cache bypassed, collection version unavailable: {str(e)}")
+        return None
+    args = _batch_search_args(search_request)
+    if args["context_window_size"] is None:
+        args["context_window_size"] = system.context_window_size
+    args["search_mode"] = system._resolve_search_mode(args["search_mode"])
+    args["mmr_lambda"] = system._resolve_mmr_lambda(args.pop("mmr"), args["mmr_lambda"])
+    return ResponseCache.make_key(
+        {"environment": system.cache_scope, "collection": system.collection_name, **args}, version
+    )
+
+async def _refresh_search_response(search_request: SearchRequest) -> bytes:
+    """Re-run a search for a stale response cache entry (background task)"""
+    request_timings.set(None)  # The originating request has already been answered
+    system = await search_registry.get(search_request.collection_name, use_production=search_request.use_production)
+    return _render_results(await system.batch_search(**_batch_search_args(search_request)))
+
 @app.post("/search", status_code=status.HTTP_200_OK)
 async def search(request: Request, search_request: SearchRequest, authenticated: bool = Depends(verify_api_key)):
     try:
@@ -849,31 +2010,61 @@ async def search(request: Request, search_request: SearchRequest, authenticated:
             ])
         })
         
-        # Create SearchSystem with connection parameters
-        system = SearchSystem(
-            collection_name=search_request.collection_name,
-            use_production=search_request.use_production,
-            qdrant_url=search_request.qdrant_url,
-            qdrant_api_key=search_request.qdrant_api_key,
-            qdrant_verify_ssl=search_request.qdrant_verify_ssl,
-            context_window_size=search_request.context_window_size
-        )
+        custom_config = any([
+            search_request.qdrant_url,
+            search_request.qdrant_api_key,
+            search_request.qdrant_verify_ssl is not None
+        ])
+        if custom_config:
+            # Custom Qdrant parameters: dedicated SearchSystem for this request
+            system = await AsyncSearchSystem.create(
+                collection_name=search_request.collection_name,
+                use_production=search_request.use_production,
+                qdrant_url=search_request.qdrant_url,
+                qdrant_api_key=search_request.qdrant_api_key,
+                qdrant_verify_ssl=search_request.qdrant_verify_ssl
+            )
+        else:
+            # Warm SearchSystem from the registry (collection checked at most once per TTL)
+            system = await search_registry.get(
+                search_request.collection_name,
+                use_production=search_request.use_production
+            )
         
-        results = system.batch_search(
-            search_queries=search_request.search_queries,
-            filter=search_request.filter,
-            limit=search_request.limit,
-            embedding_model=search_request.embedding_model
-        )
+        if search_request.stream:
+            return await _streaming_search_response(system, search_request)
         
-        # Clean whitespace from content to reduce token usage
-        results = clean_response_content(results)
+        # Identical requests to environment clusters can be answered from the response cache
+        cache_key = None
+        if response_cache is not None and not custom_config:
+            cache_key = await _response_cache_key(system, search_request)
+        if cache_key is not None:
+            body, state = await response_cache.get(cache_key)
+            if body is not None:
+                if state == ResponseCache.STALE:
+                    response_cache.refresh(cache_key, lambda: _refresh_search_response(search_request))
+                count_request_event("response_cache_hits")
+                logger.info("Search served from response cache", extra={"cache_state": state})
+                return _search_json_response(
+                    body, search_request.include_timings, "STALE" if state == ResponseCache.STALE else "HIT"
+                )
+        
+        try:
+            results = await system.batch_search(**_batch_search_args(search_request))
+        finally:
+            await system.aclose()
+        
+        # Content is already whitespace-cleaned: pages are cleaned once when
+        # fetched (or served cleaned from the page cache)
         
         logger.info("Search completed successfully", extra={
             "correlation_id": correlation_id,
             "result_count": sum(len(r) for r in results)
         })
-        return {"results": results}
+        rendered = _render_results(results)
+        if cache_key is not None:
+            await response_cache.set(cache_key, rendered)
+        return _search_json_response(rendered, search_request.include_timings, "MISS" if cache_key else None)
     
     except ValueError as e:
         # Handle validation errors (e.g., conflicting parameters)
@@ -896,41 +2087,52 @@ async def search(request: Request, search_request: SearchRequest, authenticated:
         )
 
 class FilenameSearchRequest(BaseModel):
-    query: str = Field(..., min_length=1, description="Fuzzy search query for filename")
+    query: Optional[str] = Field(default=None, min_length=1, description="Fuzzy search query for filename (required in 'search' mode, optional substring filter in 'list' mode)")
     collection_name: str = Field(..., min_length=1, description="Name of the Qdrant collection")
-    limit: Optional[conint(ge=1, le=1000)] = Field(default=10, description="Maximum number of matching filenames to return")
+    limit: Optional[conint(ge=1, le=1000)] = Field(default=10, description="Maximum number of matching filenames to return (page size in 'list' mode)")
+    mode: Optional[str] = Field(default="search", pattern="^(search|list)$", description="'search' ranks filenames by relevance; 'list' pages through all unique filenames in name order")
+    cursor: Optional[str] = Field(default=None, description="'list' mode: next_cursor from the previous page")
     use_production: Optional[bool] = Field(default=False, description="Use production environment configuration")
     qdrant_url: Optional[str] = Field(default=None, description="Override Qdrant URL")
     qdrant_api_key: Optional[str] = Field(default=None, description="Override Qdrant API key")
     qdrant_verify_ssl: Optional[bool] = Field(default=None, description="Override SSL verification")
 
-@app.post("/search/filenames")
-async def search_filenames(request: FilenameSearchRequest, authenticated: bool = Depends(verify_api_key)):
+async def _lease_filename_client(request: FilenameSearchRequest, custom_config: bool):
+    """Client for a filename request: pooled per custom connection, else the environment client"""
+    if custom_config:
+        return await AsyncSearchSystem._get_client_pool().acquire(
+            request.qdrant_url, request.qdrant_api_key, request.qdrant_verify_ssl,
+            request.use_production
+        )
+    return AsyncSearchSystem._get_async_qdrant_client(request.use_production)
+
+def _filename_index_scope(request: FilenameSearchRequest, custom_config: bool) -> Hashable:
     """
-    Fuzzy search on metadata.filename field and return matching filenames.
-    Does not return page content - only unique filenames that match the query.
-    
-    Example: Searching "ecos 9.3" returns all files with "9.3" in the name.
+    Filename index scope of a request: custom connections are keyed like the
+    client pool (URL, API key hash, SSL flag), so cached filenames are only
+    served to callers presenting the same credentials.
     """
-    correlation_id = str(uuid.uuid4())
-    logger.info("Filename search request received", extra={
-        "correlation_id": correlation_id,
-        "query": request.query,
-        "collection": request.collection_name,
-        "limit": request.limit
-    })
-    
-    try:
-        # Create Qdrant client
-        qclient = SearchSystem._create_qdrant_client(
-            qdrant_url=request.qdrant_url,
-            qdrant_api_key=request.qdrant_api_key,
-            qdrant_verify_ssl=request.qdrant_verify_ssl,
-            use_production=request.use_production
+    if custom_config:
+        return ClientPool.make_key(
+            request.qdrant_url, request.qdrant_api_key, request.qdrant_verify_ssl, request.use_production
         )
-        
+    return "prod" if request.use_production else "dev"
+
+async def _load_collection_filenames(request: FilenameSearchRequest, custom_config: bool) -> set:
+    """Load every unique filename of the requested collection"""
+    qclient = await _lease_filename_client(request, custom_config)
+    try:
+        return await load_filenames_faceted(qclient, request.collection_name, FILENAME_FACET_MAX_VALUES)
+    finally:
+        if custom_config:
+            await AsyncSearchSystem._get_client_pool().release(qclient)
+
+async def _scroll_matching_filenames(request: FilenameSearchRequest, custom_config: bool) -> List[Dict]:
+    """Match filenames with a MatchText scroll (used when FILENAME_INDEX_ENABLED is false)"""
+    qclient = await _lease_filename_client(request, custom_config)
+    try:
         # Use scroll with match_text filter for fuzzy filename matching
-        scroll_result = qclient.scroll(
+        scroll_result = await qclient.scroll(
             collection_name=request.collection_name,
             scroll_filter=models.Filter(
                 must=[
@@ -941,7 +2143,7 @@ async def search_filenames(request: FilenameSearchRequest, authenticated: bool =
                 ]
             ),
             limit=request.limit * 3,  # Get more to deduplicate
-            with_payload=True
+            with_payload=FILENAME_PAYLOAD_FIELDS
         )
         
         # Extract unique filenames
@@ -962,6 +2164,80 @@ async def search_filenames(request: FilenameSearchRequest, authenticated: bool =
                     if len(results) >= request.limit:
                         break
         
+        return results
+    finally:
+        if custom_config:
+            await AsyncSearchSystem._get_client_pool().release(qclient)
+
+async def _load_filename_counts(request: FilenameSearchRequest, custom_config: bool) -> List[Tuple[str, int]]:
+    """Load (filename, page count) of every unique filename of the requested collection"""
+    qclient = await _lease_filename_client(request, custom_config)
+    try:
+        return await load_filename_counts_faceted(qclient, request.collection_name, FILENAME_FACET_MAX_VALUES)
+    finally:
+        if custom_config:
+            await AsyncSearchSystem._get_client_pool().release(qclient)
+
+async def _list_filenames_page(request: FilenameSearchRequest, custom_config: bool) -> Dict:
+    """One page of unique filenames from the collection's cached filename listing"""
+    listing = await filename_listings.get(
+        _filename_index_scope(request, custom_config), request.collection_name,
+        lambda: _load_filename_counts(request, custom_config)
+    )
+    page, next_cursor, total = listing.page(request.limit, cursor=request.cursor, query=request.query)
+    return {
+        "query": request.query,
+        "mode": "list",
+        "total_matches": total,
+        "filenames": [{"filename": filename, "pages": count} for filename, count in page],
+        "next_cursor": next_cursor
+    }
+
+@app.post("/search/filenames")
+async def search_filenames(request: FilenameSearchRequest, authenticated: bool = Depends(verify_api_key)):
+    """
+    Fuzzy search on metadata.filename field and return matching filenames.
+    Does not return page content - only unique filenames that match the query.
+    
+    Filenames are ranked by relevance score from the in-memory filename index
+    (FILENAME_INDEX_ENABLED), e.g. "ecos 9.3" ranks "ECOS_9.3.7.0_Release_Notes"
+    first and tolerates small typos.
+    
+    With mode="list", all unique filenames are listed in name order from a
+    cached listing (loaded with a facet request), paged with next_cursor.
+    """
+    correlation_id = str(uuid.uuid4())
+    logger.info("Filename search request received", extra={
+        "correlation_id": correlation_id,
+        "query": request.query,
+        "collection": request.collection_name,
+        "limit": request.limit
+    })
+    
+    custom_config = any([request.qdrant_url, request.qdrant_api_key, request.qdrant_verify_ssl is not None])
+    try:
+        if request.mode == "list":
+            response = await _list_filenames_page(request, custom_config)
+            logger.info(f"Listed {len(response['filenames'])} unique filenames", extra={
+                "correlation_id": correlation_id
+            })
+            return response
+        if not request.query:
+            raise ValueError("query is required in 'search' mode")
+        
+        if FILENAME_INDEX_ENABLED:
+            # Ranked lookup in the local filename index (built on first use)
+            index = await filename_indexes.get(
+                _filename_index_scope(request, custom_config), request.collection_name,
+                lambda: _load_collection_filenames(request, custom_config)
+            )
+            results = [
+                {"filename": filename, "score": score}
+                for filename, score in index.search(request.query, limit=request.limit)
+            ]
+        else:
+            results = await _scroll_matching_filenames(request, custom_config)
+        
         logger.info(f"Found {len(results)} unique matching filenames", extra={
             "correlation_id": correlation_id
         })
@@ -981,6 +2257,36 @@ async def search_filenames(request: FilenameSearchRequest, authenticated: bool =
             detail=f"Filename search failed: {str(e)}"
         )
 
+class CacheInvalidateRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, description="Collection whose cached data should be dropped")
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidateRequest, authenticated: bool = Depends(verify_api_key)):
+    """
+    Drop cached data of a collection (e.g. after re-indexing documents).
+    """
+    page_cache = SearchSystem._page_cache
+    removed_pages = page_cache.invalidate(request.collection_name) if page_cache else 0
+    semantic_cache = SearchSystem._semantic_cache
+    removed_results = semantic_cache.invalidate(request.collection_name) if semantic_cache else 0
+    if response_cache is not None:
+        # Bumps the collection generation: cached responses are no longer used
+        await response_cache.invalidate(request.collection_name)
+    search_registry.invalidate(request.collection_name)
+    filename_indexes.invalidate(request.collection_name)
+    filename_listings.invalidate(request.collection_name)
+    
+    logger.info("Cache invalidated", extra={
+        "collection": request.collection_name,
+        "removed_pages": removed_pages,
+        "removed_results": removed_results
+    })
+    return {
+        "collection_name": request.collection_name,
+        "removed_pages": removed_pages,
+        "removed_results": removed_results
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         app, 
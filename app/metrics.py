@@ -0,0 +1,307 @@
+"""
+Prometheus metrics for the search API.
+
+Exposes per-stage latency histograms for batch_search, embedding provider
+call/error counters, cache statistics and HTTP request metrics on a
+dedicated registry served by GET /metrics.
+
+stage_timer() also records into the RequestTimings of the current request
+(if any), which is reported per request in the Server-Timing header and the
+optional "timings" block of /search.
+
+Stages (label "stage"):
+    embed          Query embedding (cache lookup + provider call)
+    vector_search  query_batch_points
+    rerank         MMR diversity reranking (only when enabled)
+    context        Context page fetch (cache read, retrieve/scrolls, cleaning)
+    clean          Whitespace cleaning of fetched pages (part of "context")
+    assemble       Result assembly and page deduplication
+
+The "collection" label only takes names admitted to collection_labels
+(resolved collections, at most METRICS_MAX_COLLECTIONS); others are "other".
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, PlatformCollector,
+    ProcessCollector, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SEARCH_STAGE_SECONDS = Histogram(
+    "search_stage_duration_seconds", "Duration of batch_search stages",
+    ["stage", "collection"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+EMBEDDING_CALLS = Counter(
+    "embedding_provider_calls_total", "Embedding provider calls",
+    ["provider"], registry=REGISTRY
+)
+EMBEDDING_ERRORS = Counter(
+    "embedding_provider_errors_total", "Failed embedding provider calls",
+    ["provider"], registry=REGISTRY
+)
+EMBEDDING_TEXTS = Counter(
+    "embedding_provider_texts_total", "Texts sent to the embedding provider",
+    ["provider"], registry=REGISTRY
+)
+EMBEDDING_SECONDS = Histogram(
+    "embedding_provider_duration_seconds", "Duration of embedding provider calls",
+    ["provider"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per merged embedding call (micro-batching)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256), registry=REGISTRY
+)
+EMBEDDING_BATCH_WAIT_SECONDS = Histogram(
+    "embedding_batch_wait_seconds", "Time the oldest text of a merged embedding call waited",
+    buckets=(0.0005, 0.001, 0.002, 0.003, 0.005, 0.01, 0.025, 0.05, 0.1), registry=REGISTRY
+)
+EMBEDDING_QUEUE_DEPTH = Gauge(
+    "embedding_batch_queue_depth", "Texts waiting for the next merged embedding call",
+    registry=REGISTRY
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls_total", "Calls served by an identical call already in flight",
+    ["kind"], registry=REGISTRY
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request duration",
+    ["method", "path", "status"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+    ["path"], registry=REGISTRY
+)
+
+
+class RequestTimings:
+    """
+    Stage durations and counters of a single request.
+
+    Durations of a stage that runs several times (e.g. context fetches of a
+    streamed search) are summed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def merge(self, other: "RequestTimings") -> None:
+        """Add the durations and counters of other (e.g. of a shared single-flight call)."""
+        for stage, seconds in other.durations.items():
+            self.add(stage, seconds)
+        for name, amount in other.counts.items():
+            self.count(name, amount)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Timings for a JSON response: {stage}_ms durations, counters and total_ms."""
+        timings: Dict[str, Any] = {f"{stage}_ms": round(seconds * 1000, 3) for stage, seconds in self.durations.items()}
+        timings.update(self.counts)
+        timings["total_ms"] = round(self.elapsed() * 1000, 3)
+        return timings
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in milliseconds)."""
+        entries = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.durations.items()]
+        entries.extend(f'{name};desc="{value}"' for name, value in self.counts.items())
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(entries)
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class CollectionLabels:
+    """
+    Bounded set of collection names used as the "collection" metric label.
+
+    Collection names come from requests (and missing collections are
+    auto-created), so names are only admitted once the collection resolved,
+    up to max_values distinct names; everything else is reported as "other".
+    """
+
+    def __init__(self, max_values: int = 50):
+        self.max_values = max_values
+        self._admitted: set = set()
+
+    def admit(self, collection: str) -> None:
+        """Record a resolved collection name while the cap allows it."""
+        if len(self._admitted) < self.max_values:
+            self._admitted.add(collection)
+
+    def label(self, collection: str) -> str:
+        return collection if collection in self._admitted else "other"
+
+    def clear(self) -> None:
+        self._admitted.clear()
+
+
+collection_labels = CollectionLabels()
+
+
+@contextmanager
+def stage_timer(stage: str, collection: str) -> Iterator[None]:
+    """Observe the duration of a search stage (works around awaits too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SEARCH_STAGE_SECONDS.labels(stage=stage, collection=collection_labels.label(collection)).observe(elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add(stage, elapsed)
+
+
+@contextmanager
+def request_timer(stage: str) -> Iterator[None]:
+    """Record a stage in the current request's timings only (no histogram)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add(stage, time.perf_counter() - start)
+
+
+def count_request_event(name: str, amount: int = 1) -> None:
+    """Increment a counter of the current request's timings (e.g. context fetches)."""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.count(name, amount)
+
+
+@contextmanager
+def _provider_call(provider: str, text_count: int) -> Iterator[None]:
+    EMBEDDING_CALLS.labels(provider=provider).inc()
+    EMBEDDING_TEXTS.labels(provider=provider).inc(text_count)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EMBEDDING_ERRORS.labels(provider=provider).inc()
+        raise
+    finally:
+        EMBEDDING_SECONDS.labels(provider=provider).observe(time.perf_counter() - start)
+
+
+class _InstrumentedMixin:
+    def __init__(self, client: Any, provider: str):
+        self.client = client
+        self.provider = provider
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose model/task settings of the wrapped client (used for cache keys)
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+class InstrumentedEmbeddingClient(_InstrumentedMixin):
+    """Counts and times calls of a sync embedding client."""
+
+    def embed(self, texts: List[str]) -> Any:
+        with _provider_call(self.provider, len(texts)):
+            return self.client.embed(texts)
+
+    def embed_one(self, text: str) -> Any:
+        with _provider_call(self.provider, 1):
+            return self.client.embed_one(text)
+
+
+class AsyncInstrumentedEmbeddingClient(_InstrumentedMixin):
+    """Counts and times calls of an async embedding client."""
+
+    async def embed(self, texts: List[str]) -> Any:
+        with _provider_call(self.provider, len(texts)):
+            return await self.client.embed(texts)
+
+    async def embed_one(self, text: str) -> Any:
+        with _provider_call(self.provider, 1):
+            return await self.client.embed_one(text)
+
+
+def instrument_embedding_client(client: Any, provider: str) -> Any:
+    """Wrap a provider client (sync or async) with call/error metrics."""
+    if asyncio.iscoroutinefunction(client.embed):
+        return AsyncInstrumentedEmbeddingClient(client, provider)
+    return InstrumentedEmbeddingClient(client, provider)
+
+
+def observe_embedding_batch(size: int, wait_seconds: float) -> None:
+    """on_batch callback of AsyncBatchingEmbeddingClient."""
+    EMBEDDING_BATCH_SIZE.observe(size)
+    EMBEDDING_BATCH_WAIT_SECONDS.observe(wait_seconds)
+
+
+class CacheStatsCollector:
+    """
+    Reports hit/miss counters, hit ratio and occupancy of registered caches.
+
+    Sources are callables returning a stats() dict (or None when the cache
+    is disabled), read at scrape time.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+
+    def register(self, name: str, source: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        self._sources[name] = source
+
+    def _stats(self) -> List[Tuple[str, Dict[str, Any]]]:
+        collected = []
+        for name, source in self._sources.items():
+            stats = source()
+            if stats is not None:
+                collected.append((name, stats))
+        return collected
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("cache_evictions", "Cache evictions", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        size = GaugeMetricFamily("cache_bytes", "Approximate bytes currently cached", labels=["cache"])
+        for name, stats in self._stats():
+            hits.add_metric([name], stats.get("hits", 0))
+            misses.add_metric([name], stats.get("misses", 0))
+            evictions.add_metric([name], stats.get("evictions", 0))
+            ratio.add_metric([name], stats.get("hit_ratio", 0.0))
+            entries.add_metric([name], stats.get("entries", 0))
+            size.add_metric([name], stats.get("bytes", 0))
+        yield from (hits, misses, evictions, ratio, entries, size)
+
+
+CACHE_STATS = CacheStatsCollector()
+REGISTRY.register(CACHE_STATS)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Return the exposition body and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+"""
+Search pipeline building blocks for the semantic search API.
+
+Helpers used by SearchSystem to assemble results efficiently, kept
+independent of FastAPI and of any particular Qdrant client.
+"""
+
+from app.search.client_pool import ClientPool
+from app.search.cleaning import clean_whitespace
+from app.search.context import ContextPlan, merge_ranges, page_window
+from app.search.diversity import mmr_rerank, mmr_select
+from app.search.filename_index import (
+    FilenameIndex, FilenameIndexManager, FilenameListing, create_filename_index, facet_filenames,
+    load_filename_counts, load_filename_counts_faceted, load_filenames, load_filenames_faceted, page_filenames
+)
+from app.search.page_cache import PageCache
+from app.search.point_ids import assign_page_point_ids, page_point_id, window_point_ids
+from app.search.projection import (
+    CONTEXT_PAYLOAD_FIELDS, FILENAME_PAYLOAD_FIELDS, hit_payload_selector, payload_selector
+)
+from app.search.registry import CollectionInfo, SearchSystemRegistry
+from app.search.response_cache import (
+    InMemoryResponseBackend, RespResponseBackend, ResponseCache, ResponseCacheError
+)
+from app.search.semantic_cache import SemanticResultCache
+from app.search.singleflight import SingleFlight
+from app.search.sparse import (
+    DEFAULT_SPARSE_VECTOR_NAME, document_sparse_vector, index_sparse_vectors, query_sparse_vector,
+    sparse_vectors_config, tokenize
+)
+
+__all__ = [
+    "ClientPool",
+    "clean_whitespace",
+    "ContextPlan",
+    "merge_ranges",
+    "page_window",
+    "mmr_rerank",
+    "mmr_select",
+    "FilenameIndex",
+    "FilenameIndexManager",
+    "FilenameListing",
+    "create_filename_index",
+    "facet_filenames",
+    "load_filename_counts",
+    "load_filename_counts_faceted",
+    "load_filenames",
+    "load_filenames_faceted",
+    "page_filenames",
+    "PageCache",
+    "CONTEXT_PAYLOAD_FIELDS",
+    "FILENAME_PAYLOAD_FIELDS",
+    "hit_payload_selector",
+    "payload_selector",
+    "assign_page_point_ids",
+    "page_point_id",
+    "window_point_ids",
+    "CollectionInfo",
+    "SearchSystemRegistry",
+    "InMemoryResponseBackend",
+    "RespResponseBackend",
+    "ResponseCache",
+    "ResponseCacheError",
+    "SemanticResultCache",
+    "SingleFlight",
+    "DEFAULT_SPARSE_VECTOR_NAME",
+    "document_sparse_vector",
+    "index_sparse_vectors",
+    "query_sparse_vector",
+    "sparse_vectors_config",
+    "tokenize",
+]
@@ -0,0 +1,166 @@
+"""
+Pool of reusable Qdrant clients for per-request connection overrides.
+
+Requests that pass their own qdrant_url/qdrant_api_key/qdrant_verify_ssl
+used to build (and tear down) a fresh client every time. The pool keeps one
+client per distinct connection so repeat callers reuse warm connections.
+API keys are only kept as SHA-256 digests in pool keys.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (url, api key digest, verify flag, use_production)
+PoolKey = Tuple[Optional[str], Optional[str], Optional[bool], bool]
+
+
+class _PooledClient:
+    __slots__ = ("key", "client", "refs", "last_used", "retired")
+
+    def __init__(self, key: PoolKey, client: Any):
+        self.key = key
+        self.client = client
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.retired = False
+
+
+class ClientPool:
+    """
+    Bounded LRU pool of async clients with an idle timeout.
+
+    Clients are leased with acquire()/release() (or the lease() context
+    manager). Clients evicted while leased are closed once the last lease is
+    released, so a request never loses its connection mid-flight.
+    """
+
+    def __init__(self, factory: Callable[..., Any], max_clients: int = 32,
+                 idle_timeout_seconds: Optional[float] = 300):
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Called as factory(qdrant_url, qdrant_api_key, qdrant_verify_ssl,
+                use_production) to build a client; the client must have an async close().
+            max_clients: Maximum number of pooled clients (least recently used are closed).
+            idle_timeout_seconds: Close clients unused for this long (None or 0 disables).
+
+        Raises:
+            ValueError: If max_clients is not positive.
+        """
+        if max_clients < 1:
+            raise ValueError("max_clients must be at least 1")
+
+        self._factory = factory
+        self.max_clients = max_clients
+        self.idle_timeout_seconds = idle_timeout_seconds or None
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self._entries: "OrderedDict[PoolKey, _PooledClient]" = OrderedDict()
+        self._leased: Dict[int, _PooledClient] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(qdrant_url: Optional[str], qdrant_api_key: Optional[str],
+                 qdrant_verify_ssl: Optional[bool], use_production: bool = False) -> PoolKey:
+        """Return the pool key of a connection (API key hashed)."""
+        key_digest = hashlib.sha256(qdrant_api_key.encode()).hexdigest() if qdrant_api_key else None
+        return qdrant_url, key_digest, qdrant_verify_ssl, bool(use_production)
+
+    def _collect_expired(self, now: float) -> List[_PooledClient]:
+        """Remove idle entries past the timeout and LRU entries over the size limit."""
+        removed = []
+        if self.idle_timeout_seconds is not None:
+            for entry in list(self._entries.values()):
+                if entry.refs == 0 and now - entry.last_used > self.idle_timeout_seconds:
+                    removed.append(self._entries.pop(entry.key))
+
+        while len(self._entries) > self.max_clients:
+            _, entry = self._entries.popitem(last=False)
+            removed.append(entry)
+
+        to_close = []
+        for entry in removed:
+            entry.retired = True
+            if entry.refs == 0:
+                to_close.append(entry)
+        return to_close
+
+    async def _close(self, entries: List[_PooledClient]) -> None:
+        for entry in entries:
+            self._leased.pop(id(entry.client), None)
+            try:
+                await entry.client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close pooled Qdrant client: {str(e)}")
+            self.closed += 1
+
+    async def acquire(self, qdrant_url: Optional[str], qdrant_api_key: Optional[str],
+                      qdrant_verify_ssl: Optional[bool], use_production: bool = False) -> Any:
+        """Lease the client for a connection, creating it if needed."""
+        key = self.make_key(qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PooledClient(key, self._factory(
+                qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production
+            ))
+            self._entries[key] = entry
+            self.created += 1
+        else:
+            self.reused += 1
+        self._entries.move_to_end(key)
+        entry.refs += 1
+        entry.last_used = now
+        self._leased[id(entry.client)] = entry
+
+        await self._close(self._collect_expired(now))
+        return entry.client
+
+    async def release(self, client: Any) -> None:
+        """Return a leased client; closes it if it was evicted meanwhile."""
+        entry = self._leased.get(id(client))
+        if entry is None:
+            return
+        entry.refs = max(0, entry.refs - 1)
+        entry.last_used = time.monotonic()
+        if entry.retired and entry.refs == 0:
+            await self._close([entry])
+
+    @asynccontextmanager
+    async def lease(self, qdrant_url: Optional[str], qdrant_api_key: Optional[str],
+                    qdrant_verify_ssl: Optional[bool], use_production: bool = False) -> AsyncIterator[Any]:
+        """Context manager around acquire()/release()."""
+        client = await self.acquire(qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production)
+        try:
+            yield client
+        finally:
+            await self.release(client)
+
+    async def close_all(self) -> None:
+        """Close every pooled client (e.g. on shutdown)."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.retired = True
+        await self._close(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy and lifetime counters."""
+        return {
+            "clients": len(self._entries),
+            "leased": sum(1 for entry in self._entries.values() if entry.refs),
+            "created": self.created,
+            "reused": self.reused,
+            "closed": self.closed,
+        }
@@ -0,0 +1,82 @@
+"""
+Context window assembly.
+
+Collects the (filename, page range) windows needed by every hit of a batch,
+merges overlapping windows of the same file so each file is fetched once,
+and slices the fetched pages back to each hit.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Highest page number considered when expanding a window (matches the
+# historic range clamp used by context retrieval)
+MAX_PAGE_NUMBER = 1000
+
+PageRange = Tuple[int, int]
+
+
+def page_window(center_page_number: int, window_size: int) -> PageRange:
+    """Return the inclusive (first, last) page range around a center page."""
+    return (
+        max(0, center_page_number - window_size),
+        min(MAX_PAGE_NUMBER, center_page_number + window_size),
+    )
+
+
+def merge_ranges(ranges: Iterable[PageRange]) -> List[PageRange]:
+    """
+    Merge overlapping or adjacent inclusive page ranges.
+
+    Example:
+        >>> merge_ranges([(4, 8), (1, 3), (10, 12), (7, 9)])
+        [(1, 9), (10, 12)]
+    """
+    merged: List[PageRange] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class ContextPlan:
+    """
+    Context windows required by one search batch.
+
+    Usage:
+        plan = ContextPlan(window_size)
+        plan.add(filename, center_page)       # for every page-based hit
+        for filename, ranges in plan.files():  # one fetch per file
+            plan.store(filename, fetched_pages)
+        plan.pages_for(filename, center_page)  # slice back to a hit
+    """
+
+    def __init__(self, window_size: int):
+        self.window_size = window_size
+        self._windows: Dict[str, List[PageRange]] = defaultdict(list)
+        self._pages: Dict[str, Dict[int, Dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def add(self, filename: str, center_page_number: int) -> None:
+        """Register the window around a hit."""
+        self._windows[filename].append(page_window(center_page_number, self.window_size))
+
+    def files(self) -> List[Tuple[str, List[PageRange]]]:
+        """Return each distinct file with its merged page ranges."""
+        return [(filename, merge_ranges(ranges)) for filename, ranges in self._windows.items()]
+
+    def store(self, filename: str, pages: Iterable[Dict]) -> None:
+        """Record fetched page payloads for a file, indexed by page number."""
+        by_number = self._pages.setdefault(filename, {})
+        for page in pages:
+            by_number.setdefault(page["metadata"]["page_number"], page)
+
+    def pages_for(self, filename: str, center_page_number: int) -> List[Dict]:
+        """Return the fetched pages inside a hit's window, sorted by page number."""
+        by_number = self._pages.get(filename, {})
+        first, last = page_window(center_page_number, self.window_size)
+        return [by_number[n] for n in sorted(by_number) if first <= n <= last]
@@ -0,0 +1,98 @@
+"""
+Maximal Marginal Relevance (MMR) diversity reranking.
+
+The raw top hits of a query often cluster on adjacent pages of one
+document; their context windows overlap and page deduplication leaves the
+later hits with little or no context. Reranking an oversampled candidate
+list with MMR picks hits that are relevant to the query but dissimilar to
+the hits already chosen:
+
+    score(d) = lambda * relevance(d) - (1 - lambda) * max_{s in selected} sim(d, s)
+
+lambda = 1 keeps the relevance order, lower values favor diversity.
+Candidate vectors are normalized once into a float32 matrix; each pick is
+one matrix-vector product that updates the redundancy of all candidates.
+"""
+
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Indices of k candidates in Maximal Marginal Relevance order.
+
+    Args:
+        relevance: Relevance of each candidate to the query, shape (n,).
+        vectors: L2-normalized candidate vectors, shape (n, dimensions).
+        k: Number of candidates to select.
+        lambda_mult: Relevance/diversity trade-off in [0, 1].
+
+    Returns:
+        Selected candidate indices, most relevant first. Negative
+        similarities count as no redundancy.
+    """
+    count = len(relevance)
+    k = min(k, count)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    redundancy = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    selected: List[int] = []
+    for _ in range(k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+        np.maximum(redundancy, vectors @ vectors[index], out=redundancy)
+    return selected
+
+
+def _dense_vector(vector: Any) -> Optional[Sequence[float]]:
+    """Unnamed dense vector of a hit (collections with sparse vectors return a dict)."""
+    if isinstance(vector, dict):
+        vector = vector.get("")
+    return vector if isinstance(vector, (list, np.ndarray)) else None
+
+
+def mmr_rerank(points: List[Any], query_vector: np.ndarray, limit: int, lambda_mult: float,
+               use_scores: bool = False) -> List[Any]:
+    """
+    Rerank scored points (fetched with their vectors) and keep `limit` of them.
+
+    Args:
+        points: Qdrant scored points, best first, with `vector` set.
+        query_vector: Query embedding.
+        limit: Number of hits to return.
+        lambda_mult: Relevance/diversity trade-off in [0, 1].
+        use_scores: Use the hit scores, scaled to [0, 1] by the best one, as
+            relevance (e.g. fusion scores of hybrid search) instead of the
+            cosine similarity to query_vector.
+
+    Returns:
+        The selected points in MMR order, with their vectors dropped. Points
+        are returned in their original order if any of them lacks a vector.
+    """
+    vectors = [_dense_vector(point.vector) for point in points]
+    if len(points) <= 1 or any(vector is None for vector in vectors):
+        selected = points[:limit]
+    else:
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if use_scores:
+            scores = np.array([point.score for point in points], dtype=np.float32)
+            relevance = scores / scores.max() if scores.max() > 0 else scores
+        else:
+            query = np.asarray(query_vector, dtype=np.float32)
+            relevance = matrix @ (query / (np.linalg.norm(query) or 1.0))
+        selected = [points[index] for index in mmr_select(relevance, matrix, limit, lambda_mult)]
+
+    for point in selected:
+        point.vector = None  # Vectors are only needed for reranking
+    return selected
@@ -0,0 +1,484 @@
+"""
+In-memory filename index for /search/filenames.
+
+Unique filenames of a collection are loaded once (facet request or
+payload-only scroll of metadata.filename) and indexed by character trigrams. Lookups are local:
+trigrams select candidate filenames, which are then scored for substring
+and fuzzy (typo-tolerant) matches. Indexes are refreshed in the background
+and updated incrementally (only added/removed filenames are re-indexed).
+
+Distinct filenames can also be listed with Qdrant's facet API (keyword
+index on metadata.filename, see create_filename_index), which returns one
+value per file instead of every page payload. FilenameListing keeps them
+sorted in memory and pages through them with a cursor.
+
+Usage (create the metadata.filename keyword index of a collection):
+    python -m app.search.filename_index --url http://localhost:6333 --collection content
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import logging
+import re
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from qdrant_client import AsyncQdrantClient, models
+
+logger = logging.getLogger(__name__)
+
+_TERM_SPLIT = re.compile(r"\s+")
+
+# Scroll page size used when loading filenames from Qdrant
+LOAD_BATCH_SIZE = 1000
+
+# Upper bound of distinct filenames requested from the facet API
+FACET_MAX_VALUES = 100000
+
+FILENAME_KEY = "metadata.filename"
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _terms(query: str) -> List[str]:
+    return [term for term in _TERM_SPLIT.split(query.lower().strip()) if term]
+
+
+class FilenameIndex:
+    """
+    Trigram index over a set of filenames with relevance scoring.
+
+    Scores are in [0, 1]: each query term scores 1.0 when it is a substring
+    of the filename, otherwise the fraction of its trigrams found in the
+    filename. The mean term score is combined with how much of the filename
+    the query covers, so exact and shorter matches rank first.
+    """
+
+    def __init__(self, filenames: Iterable[str] = ()):
+        self._filenames: Dict[str, str] = {}  # filename -> lowercased
+        self._postings: Dict[str, Set[str]] = {}
+        self.update(filenames)
+
+    def __len__(self) -> int:
+        return len(self._filenames)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._filenames
+
+    def add(self, filename: str) -> None:
+        if filename in self._filenames:
+            return
+        lowered = filename.lower()
+        self._filenames[filename] = lowered
+        for gram in _trigrams(lowered):
+            self._postings.setdefault(gram, set()).add(filename)
+
+    def remove(self, filename: str) -> None:
+        lowered = self._filenames.pop(filename, None)
+        if lowered is None:
+            return
+        for gram in _trigrams(lowered):
+            names = self._postings.get(gram)
+            if names is not None:
+                names.discard(filename)
+                if not names:
+                    del self._postings[gram]
+
+    def update(self, filenames: Iterable[str]) -> Tuple[int, int]:
+        """
+        Make the index hold exactly `filenames`.
+
+        Returns:
+            (added, removed) counts.
+        """
+        wanted = set(filenames)
+        removed = [name for name in self._filenames if name not in wanted]
+        added = [name for name in wanted if name not in self._filenames]
+        for name in removed:
+            self.remove(name)
+        for name in added:
+            self.add(name)
+        return len(added), len(removed)
+
+    def _candidates(self, terms: List[str]) -> Iterable[str]:
+        # Terms shorter than a trigram cannot use the postings
+        if any(len(term) < 3 for term in terms):
+            return self._filenames.keys()
+        candidates: Set[str] = set()
+        for term in terms:
+            for gram in _trigrams(term):
+                candidates.update(self._postings.get(gram, ()))
+        return candidates
+
+    def score(self, terms: List[str], filename: str) -> float:
+        lowered = self._filenames[filename]
+        term_scores = []
+        for term in terms:
+            if term in lowered:
+                term_scores.append(1.0)
+                continue
+            grams = _trigrams(term)
+            if not grams:
+                term_scores.append(0.0)
+                continue
+            term_scores.append(sum(1 for gram in grams if gram in lowered) / len(grams))
+
+        match = sum(term_scores) / len(term_scores)
+        coverage = min(1.0, sum(len(term) for term in terms) / len(lowered)) if lowered else 0.0
+        return round(0.9 * match + 0.1 * coverage, 4)
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.5) -> List[Tuple[str, float]]:
+        """
+        Return up to `limit` (filename, score) pairs, best first.
+
+        Filenames scoring below min_score are not returned.
+        """
+        terms = _terms(query)
+        if not terms:
+            return []
+        scored = []
+        for filename in self._candidates(terms):
+            score = self.score(terms, filename)
+            if score >= min_score:
+                scored.append((filename, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+async def load_filenames(client: Any, collection_name: str, batch_size: int = LOAD_BATCH_SIZE) -> Set[str]:
+    """Scroll a collection (filename payload only) and return its unique filenames."""
+    filenames: Set[str] = set()
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            with_payload=[FILENAME_KEY],
+            with_vectors=False,
+            limit=batch_size,
+            offset=offset,
+        )
+        for point in points:
+            metadata = (point.payload or {}).get("metadata")
+            if isinstance(metadata, dict) and isinstance(metadata.get("filename"), str):
+                filenames.add(metadata["filename"])
+        if offset is None:
+            return filenames
+
+
+async def facet_filenames(client: Any, collection_name: str,
+                          max_values: int = FACET_MAX_VALUES) -> List[Tuple[str, int]]:
+    """
+    Return (filename, page count) for the distinct filenames of a collection.
+
+    Uses one facet request on the metadata.filename keyword index. If the
+    collection has max_values or more distinct filenames the list may be
+    truncated.
+    """
+    response = await client.facet(
+        collection_name=collection_name,
+        key=FILENAME_KEY,
+        limit=max_values,
+        exact=True,
+    )
+    return [(hit.value, hit.count) for hit in response.hits if isinstance(hit.value, str)]
+
+
+async def load_filename_counts(client: Any, collection_name: str,
+                               batch_size: int = LOAD_BATCH_SIZE) -> List[Tuple[str, int]]:
+    """Scroll a collection (filename payload only) and count the pages of each filename."""
+    counts: Counter = Counter()
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            with_payload=[FILENAME_KEY],
+            with_vectors=False,
+            limit=batch_size,
+            offset=offset,
+        )
+        for point in points:
+            metadata = (point.payload or {}).get("metadata")
+            if isinstance(metadata, dict) and isinstance(metadata.get("filename"), str):
+                counts[metadata["filename"]] += 1
+        if offset is None:
+            return list(counts.items())
+
+
+async def _complete_facet(client: Any, collection_name: str,
+                          max_values: int) -> Optional[List[Tuple[str, int]]]:
+    """Facet values if the facet is available and complete, else None (scroll instead)."""
+    try:
+        values = await facet_filenames(client, collection_name, max_values)
+    except Exception as e:
+        logger.info(f"Facet on {FILENAME_KEY} unavailable for '{collection_name}', scrolling instead: {str(e)}")
+        return None
+    if len(values) >= max_values:
+        # Possibly truncated: only a full scroll is guaranteed complete
+        logger.warning(
+            f"'{collection_name}' has at least {max_values} filenames, listing them with a full scroll "
+            "(raise FILENAME_FACET_MAX_VALUES to keep using the facet)"
+        )
+        return None
+    return values
+
+
+async def load_filename_counts_faceted(client: Any, collection_name: str,
+                                       max_values: int = FACET_MAX_VALUES) -> List[Tuple[str, int]]:
+    """
+    Load (filename, page count) pairs with the facet API, falling back to a scroll.
+
+    The scroll is used when the collection has no keyword index on
+    metadata.filename or the facet may have been truncated at max_values
+    (logged as a warning), so the result is always complete.
+    """
+    values = await _complete_facet(client, collection_name, max_values)
+    if values is None:
+        return await load_filename_counts(client, collection_name)
+    return values
+
+
+async def create_filename_index(client: Any, collection_name: str) -> None:
+    """Create the metadata.filename keyword index used by facet requests (no-op if it exists)."""
+    await client.create_payload_index(
+        collection_name=collection_name,
+        field_name=FILENAME_KEY,
+        field_schema=models.PayloadSchemaType.KEYWORD,
+        wait=True,
+    )
+
+
+async def load_filenames_faceted(client: Any, collection_name: str,
+                                 max_values: int = FACET_MAX_VALUES) -> Set[str]:
+    """Load unique filenames with the facet API, falling back to a scroll."""
+    values = await _complete_facet(client, collection_name, max_values)
+    if values is None:
+        return await load_filenames(client, collection_name)
+    return {filename for filename, _ in values}
+
+
+def encode_cursor(filename: str) -> str:
+    return base64.urlsafe_b64encode(filename.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class FilenameListing:
+    """
+    Distinct filenames of a collection with their page counts, sorted by name.
+
+    Pages start with a binary search for the cursor, so listing a page
+    costs O(log n + limit) without a query filter.
+    """
+
+    def __init__(self, values: Iterable[Tuple[str, int]] = ()):
+        self._counts: Dict[str, int] = {}
+        self._names: List[str] = []
+        self.update(values)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def update(self, values: Iterable[Tuple[str, int]]) -> Tuple[int, int]:
+        """
+        Replace the listing with `values`.
+
+        Returns:
+            (added, removed) filename counts.
+        """
+        counts = dict(values)
+        added = sum(1 for name in counts if name not in self._counts)
+        removed = sum(1 for name in self._counts if name not in counts)
+        # Swap both at once so concurrent readers never see a half-built listing
+        self._counts, self._names = counts, sorted(counts)
+        return added, removed
+
+    def page(self, limit: int, cursor: Optional[str] = None,
+             query: Optional[str] = None) -> Tuple[List[Tuple[str, int]], Optional[str], int]:
+        """
+        Return one page of (filename, count), the next cursor and the total.
+
+        The cursor encodes the last filename returned, so pages stay stable when
+        documents are added or removed between calls.
+
+        Args:
+            limit: Page size.
+            cursor: Cursor returned by the previous page (None for the first page).
+            query: Only keep filenames containing this text (case-insensitive).
+
+        Returns:
+            (page, next cursor or None on the last page, number of filenames
+            matching the query across all pages)
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        counts, names = self._counts, self._names
+        start = bisect_right(names, decode_cursor(cursor)) if cursor else 0
+        if query:
+            needle = query.lower()
+            total = sum(1 for name in names if needle in name.lower())
+            selected = [name for name in names[start:] if needle in name.lower()][:limit + 1]
+        else:
+            total = len(names)
+            selected = names[start:start + limit + 1]
+        page = [(name, counts[name]) for name in selected[:limit]]
+        next_cursor = encode_cursor(page[-1][0]) if len(selected) > limit else None
+        return page, next_cursor, total
+
+
+def page_filenames(values: Iterable[Tuple[str, int]], limit: int, cursor: Optional[str] = None,
+                   query: Optional[str] = None) -> Tuple[List[Tuple[str, int]], Optional[str]]:
+    """
+    Return one page of (filename, count) sorted by filename, and the next cursor
+    (see FilenameListing.page; use a FilenameListing to page repeatedly).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    page, next_cursor, _ = FilenameListing(values).page(limit, cursor=cursor, query=query)
+    return page, next_cursor
+
+
+class _IndexEntry:
+    __slots__ = ("index", "loaded_at", "refresh_task")
+
+    def __init__(self, index: Any):
+        self.index = index
+        self.loaded_at = time.monotonic()
+        self.refresh_task: Optional[asyncio.Task] = None
+
+
+class FilenameIndexManager:
+    """
+    Per-collection filename indexes keyed by (scope, collection).
+
+    The first lookup of a collection waits for the index to be built; later
+    lookups are served from memory while indexes older than
+    refresh_seconds are refreshed in the background.
+
+    Indexes are FilenameIndex by default; any class built from the loaded
+    values with an update(values) method works (e.g. FilenameListing).
+    """
+
+    def __init__(self, refresh_seconds: float = 300, max_collections: int = 64,
+                 factory: Callable[[Any], Any] = FilenameIndex):
+        """
+        Args:
+            refresh_seconds: Age after which an index is refreshed in the background.
+            max_collections: Maximum number of indexes kept (least recently used are dropped).
+            factory: Builds an index from the values returned by a loader.
+        """
+        self.refresh_seconds = refresh_seconds
+        self.max_collections = max_collections
+        self.factory = factory
+        self._entries: "OrderedDict[Tuple[Hashable, str], _IndexEntry]" = OrderedDict()
+        self._building: Dict[Tuple[Hashable, str], asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, scope: Hashable, collection_name: str,
+                  loader: Callable[[], Awaitable[Iterable[Any]]]) -> Any:
+        """
+        Return the index of a collection.
+
+        Args:
+            scope: Qdrant cluster (and credentials) the collection is read with.
+            collection_name: Collection name.
+            loader: Coroutine function returning all filenames of the collection
+                (the values the factory expects).
+        """
+        key = (scope, collection_name)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = await self._build(key, loader)
+        else:
+            self._entries.move_to_end(key)
+
+        if time.monotonic() - entry.loaded_at > self.refresh_seconds and entry.refresh_task is None:
+            entry.refresh_task = asyncio.create_task(self._refresh(key, entry, loader))
+        return entry.index
+
+    async def _build(self, key: Tuple[Hashable, str], loader) -> _IndexEntry:
+        # Concurrent first lookups share one load; shielded so a caller that
+        # goes away does not cancel the load for the others
+        future = self._building.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, loader))
+            self._building[key] = future
+            future.add_done_callback(lambda done: self._finish_build(key, done))
+        return await asyncio.shield(future)
+
+    async def _load(self, key: Tuple[Hashable, str], loader) -> _IndexEntry:
+        entry = _IndexEntry(self.factory(await loader()))
+        self._entries[key] = entry
+        while len(self._entries) > self.max_collections:
+            self._entries.popitem(last=False)
+        logger.info(f"Built filename index for {key} ({len(entry.index)} filenames)")
+        # Returned rather than looked up, the key may be evicted before waiters resume
+        return entry
+
+    def _finish_build(self, key: Tuple[Hashable, str], future: asyncio.Future) -> None:
+        if self._building.get(key) is future:
+            del self._building[key]
+        if not future.cancelled() and future.exception() is not None:
+            # Retrieved here so a load nobody waits for does not log "never retrieved"
+            logger.debug(f"Filename index load failed for {key}: {future.exception()!r}")
+
+    async def _refresh(self, key: Tuple[Hashable, str], entry: _IndexEntry, loader) -> None:
+        try:
+            added, removed = entry.index.update(await loader())
+            logger.debug(f"Refreshed filename index for {key}: +{added} -{removed}")
+        except Exception as e:
+            logger.warning(f"Filename index refresh failed for {key}: {str(e)}")
+        finally:
+            entry.loaded_at = time.monotonic()
+            entry.refresh_task = None
+
+    def invalidate(self, collection_name: str) -> int:
+        """Drop the indexes of a collection (all scopes)."""
+        keys = [key for key in self._entries if key[1] == collection_name]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Create the metadata.filename keyword index of a collection")
+    parser.add_argument("--url", required=True, help="Qdrant URL, e.g. http://localhost:6333")
+    parser.add_argument("--api-key", default=None, help="Qdrant API key")
+    parser.add_argument("--collection", required=True, help="Collection to index")
+    args = parser.parse_args(argv)
+
+    async def run():
+        client = AsyncQdrantClient(url=args.url, api_key=args.api_key)
+        try:
+            await create_filename_index(client, args.collection)
+        finally:
+            await client.close()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
+    print(f"Created keyword index on {FILENAME_KEY} for '{args.collection}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Cleaned page payload cache.
+
+Keeps whitespace-cleaned page payloads per (scope, collection, filename,
+page_number) so popular documents are not re-fetched from Qdrant and
+re-cleaned on every hit. Page numbers known not to exist are cached too,
+so windows at the start or end of a document still resolve from cache.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (scope, collection, filename, page_number); scope separates Qdrant clusters
+PageKey = Tuple[str, str, str, int]
+
+# Marker stored for page numbers that do not exist in the document
+_ABSENT = object()
+
+# Fixed per-entry overhead (key tuple, dict, metadata) added to the text size
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def _page_size(page: Any) -> int:
+    if page is _ABSENT:
+        return _ENTRY_OVERHEAD_BYTES
+    return len(page.get("pagecontent", "")) + _ENTRY_OVERHEAD_BYTES
+
+
+class PageCache:
+    """
+    Thread-safe LRU cache of cleaned page payloads with a byte budget and TTL.
+
+    Entries can be invalidated per collection (optionally limited to one scope).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: Optional[float] = 300):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget for cached pages (approximate, text size + overhead).
+            ttl_seconds: Entry lifetime in seconds (None or 0 disables expiry).
+
+        Raises:
+            ValueError: If max_bytes is not positive.
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[PageKey, Tuple[Any, float, int]]" = OrderedDict()
+        self._by_collection: Dict[Tuple[str, str], Set[PageKey]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: PageKey) -> None:
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+        keys = self._by_collection.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_collection[key[:2]]
+
+    def get_pages(self, scope: str, collection: str, filename: str,
+                  page_numbers: Iterable[int]) -> Tuple[List[Dict], List[int]]:
+        """
+        Look up pages of one file.
+
+        Returns:
+            (cached pages that exist, page numbers not in the cache).
+            Page numbers cached as absent appear in neither list.
+        """
+        found = []
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for page_number in page_numbers:
+                key = (scope, collection, filename, page_number)
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+                    self._remove(key)
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    missing.append(page_number)
+                    continue
+
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if entry[0] is not _ABSENT:
+                    found.append(entry[0])
+        return found, missing
+
+    def put_pages(self, scope: str, collection: str, filename: str,
+                  page_numbers: Iterable[int], pages: Iterable[Dict]) -> None:
+        """
+        Store the result of fetching page_numbers of one file.
+
+        Requested page numbers without a matching page are stored as absent.
+        """
+        by_number = {page["metadata"]["page_number"]: page for page in pages}
+        now = time.monotonic()
+        with self._lock:
+            for page_number in page_numbers:
+                key = (scope, collection, filename, page_number)
+                value = by_number.get(page_number, _ABSENT)
+                size = _page_size(value)
+                if size > self.max_bytes:
+                    continue
+                if key in self._entries:
+                    self._remove(key)
+
+                self._entries[key] = (value, now, size)
+                self._by_collection.setdefault(key[:2], set()).add(key)
+                self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collection: str, scope: Optional[str] = None) -> int:
+        """
+        Drop cached pages of a collection.
+
+        Args:
+            collection: Collection name.
+            scope: Limit to one scope (Qdrant cluster); all scopes if None.
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            groups = [
+                group for group in self._by_collection
+                if group[1] == collection and (scope is None or group[0] == scope)
+            ]
+            removed = 0
+            for group in groups:
+                for key in list(self._by_collection.get(group, ())):
+                    self._remove(key)
+                    removed += 1
+        if removed:
+            logger.info(f"Invalidated {removed} cached pages for collection '{collection}'")
+        return removed
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._by_collection.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
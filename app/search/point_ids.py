@@ -0,0 +1,168 @@
+"""
+Deterministic page point IDs.
+
+Page points addressed by uuid5(filename, page_number) can be fetched with a
+primary-key retrieve() instead of a payload-filtered scroll. This module
+computes those IDs and provides a migration helper that re-keys existing
+page-based collections.
+
+Usage:
+    python -m app.search.point_ids --url http://localhost:6333 --collection content
+"""
+
+import argparse
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from qdrant_client import QdrantClient, models
+
+logger = logging.getLogger(__name__)
+
+# Fixed namespace so every indexer and the API derive identical IDs
+PAGE_ID_NAMESPACE = uuid.UUID("6f1b2c7e-3d4a-5b8c-9e0f-1a2b3c4d5e6f")
+
+
+def page_point_id(filename: str, page_number: int) -> str:
+    """Return the deterministic point ID of a page."""
+    return str(uuid.uuid5(PAGE_ID_NAMESPACE, f"{filename}\n{int(page_number)}"))
+
+
+def window_point_ids(filename: str, ranges: Iterable[Tuple[int, int]]) -> List[str]:
+    """Return the point IDs of every page inside the inclusive ranges."""
+    return [
+        page_point_id(filename, page_number)
+        for first, last in ranges
+        for page_number in range(first, last + 1)
+    ]
+
+
+def _page_key(payload: Optional[Dict[str, Any]]) -> Optional[Tuple[str, int]]:
+    """Return (filename, page_number) for page-based payloads, else None."""
+    metadata = (payload or {}).get("metadata")
+    if not isinstance(metadata, dict):
+        return None
+    filename = metadata.get("filename")
+    page_number = metadata.get("page_number")
+    if not isinstance(filename, str) or not isinstance(page_number, int):
+        return None
+    return filename, page_number
+
+
+def assign_page_point_ids(client: QdrantClient, collection_name: str,
+                          batch_size: int = 256, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Re-key page points of a collection to deterministic IDs.
+
+    Points are copied (vector and payload unchanged) to their deterministic
+    ID and the old point is deleted. Points that already have the right ID
+    or have no page metadata are left alone.
+
+    The collection is checked before any write: if two points map to the
+    same (filename, page_number) the migration aborts, because re-keying
+    would silently merge them.
+
+    Args:
+        client: Qdrant client connected to the target cluster.
+        collection_name: Collection to migrate.
+        batch_size: Points per scroll/upsert batch.
+        dry_run: Only count what would change.
+
+    Returns:
+        Counts: {"scanned", "migrated", "already_deterministic", "skipped"}.
+
+    Raises:
+        ValueError: If duplicate (filename, page_number) pairs are found.
+    """
+    counts = {"scanned": 0, "migrated": 0, "already_deterministic": 0, "skipped": 0}
+    owners: Dict[str, Any] = {}
+
+    # Pass 1: validate that the mapping is one-to-one (metadata only)
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            with_payload=["metadata.filename", "metadata.page_number"],
+            limit=batch_size,
+            offset=offset,
+        )
+        for point in points:
+            key = _page_key(point.payload)
+            if key is None:
+                continue
+            new_id = page_point_id(*key)
+            if new_id in owners and owners[new_id] != point.id:
+                raise ValueError(
+                    f"Duplicate page {key[0]!r} #{key[1]} (points {owners[new_id]} and {point.id}); "
+                    "cannot assign deterministic IDs"
+                )
+            owners[new_id] = point.id
+        if offset is None:
+            break
+
+    # Pass 2: copy points to their new ID, then delete the old ones.
+    # Copies can land ahead of the scroll cursor; they are recognised and
+    # not counted twice.
+    created = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            with_payload=True,
+            with_vectors=True,
+            limit=batch_size,
+            offset=offset,
+        )
+        moved = []
+        old_ids = []
+        for point in points:
+            if str(point.id) in created:
+                continue
+            counts["scanned"] += 1
+            key = _page_key(point.payload)
+            if key is None:
+                counts["skipped"] += 1
+                continue
+            new_id = page_point_id(*key)
+            if str(point.id) == new_id:
+                counts["already_deterministic"] += 1
+                continue
+            moved.append(models.PointStruct(id=new_id, vector=point.vector, payload=point.payload))
+            old_ids.append(point.id)
+
+        if moved and not dry_run:
+            client.upsert(collection_name=collection_name, points=moved, wait=True)
+            client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=old_ids),
+                wait=True,
+            )
+            created.update(str(point.id) for point in moved)
+        counts["migrated"] += len(moved)
+
+        if offset is None:
+            break
+
+    logger.info(f"Deterministic page ID migration for '{collection_name}': {counts}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Assign deterministic page point IDs to a collection")
+    parser.add_argument("--url", required=True, help="Qdrant URL, e.g. http://localhost:6333")
+    parser.add_argument("--api-key", default=None, help="Qdrant API key")
+    parser.add_argument("--collection", required=True, help="Collection to migrate")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = QdrantClient(url=args.url, api_key=args.api_key)
+    try:
+        print(assign_page_point_ids(client, args.collection, args.batch_size, args.dry_run))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
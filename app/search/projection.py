@@ -0,0 +1,68 @@
+"""
+Stage-aware payload selectors.
+
+Each stage of a search only needs part of a point's payload: page hits
+only need their metadata (context pages are fetched separately), context
+fetches need pagecontent and metadata, filename lookups need
+metadata.filename. Requesting just those fields keeps Qdrant responses
+small for collections with large pages.
+"""
+
+from typing import Iterable, List, Optional, Union
+
+from qdrant_client import models
+
+# Fields read from context pages (SearchSystem._has_page_structure, _build_result)
+CONTEXT_PAYLOAD_FIELDS = ["pagecontent", "metadata"]
+
+# Fields read from hits of page-based collections (context comes from the page fetch)
+PAGE_HIT_PAYLOAD_FIELDS = ["metadata"]
+
+# Fields needed to detect page-based hits and plan their context
+PAGE_KEY_FIELDS = ["metadata.filename", "metadata.page_number"]
+
+FILENAME_PAYLOAD_FIELDS = ["metadata.filename"]
+
+PayloadSelector = Union[bool, List[str], models.PayloadSelectorExclude]
+
+
+def payload_selector(include: Optional[Iterable[str]] = None,
+                     exclude: Optional[Iterable[str]] = None,
+                     required: Iterable[str] = ()) -> PayloadSelector:
+    """
+    Build a with_payload value from caller include/exclude fields.
+
+    Args:
+        include: Only return these payload paths (takes precedence over exclude).
+        exclude: Return everything except these payload paths.
+        required: Paths that are always returned (added to include, never excluded).
+
+    Returns:
+        True (full payload), a list of paths, or a PayloadSelectorExclude.
+    """
+    required = list(required)
+    if include:
+        return list(dict.fromkeys([*include, *required]))
+    if exclude:
+        excluded = [
+            path for path in dict.fromkeys(exclude)
+            if not any(path == field or field.startswith(path + ".") for field in required)
+        ]
+        if excluded:
+            return models.PayloadSelectorExclude(exclude=excluded)
+    return True
+
+
+def hit_payload_selector(layout: Optional[str], include: Optional[Iterable[str]] = None,
+                         exclude: Optional[Iterable[str]] = None) -> PayloadSelector:
+    """
+    Selector for the primary vector search.
+
+    Hits of page-based collections only carry metadata, because result
+    content comes from the context fetch. For generic or not yet detected
+    layouts the caller's include/exclude fields apply, always keeping the
+    page keys so the layout can be detected.
+    """
+    if layout == "page":
+        return list(PAGE_HIT_PAYLOAD_FIELDS)
+    return payload_selector(include, exclude, required=PAGE_KEY_FIELDS)
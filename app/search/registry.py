@@ -0,0 +1,123 @@
+"""
+Registry of long-lived search systems.
+
+Keeps one warm search system per (collection, environment) so requests do
+not rebuild clients or re-check the collection on every call. Collection
+facts (existence, vector config, payload layout) are cached on the system
+and revalidated once they are older than a TTL.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionInfo:
+    """
+    Cached facts about a collection.
+
+    Attributes:
+        exists: Collection was found (or created) at the last check.
+        vectors_config: Vector parameters reported by Qdrant.
+        sparse_vectors: Sparse vector parameters by name (None if there are none).
+        layout: "page" or "generic" payload structure, detected from search
+            hits (None until a search returned hits).
+        checked_at: monotonic time of the last revalidation (None if never).
+    """
+
+    __slots__ = ("exists", "vectors_config", "sparse_vectors", "layout", "checked_at")
+
+    def __init__(self):
+        self.exists = False
+        self.vectors_config: Any = None
+        self.sparse_vectors: Optional[Dict[str, Any]] = None
+        self.layout: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        return self.checked_at is not None and time.monotonic() - self.checked_at <= ttl_seconds
+
+    def mark_checked(self, vectors_config: Any, sparse_vectors: Optional[Dict[str, Any]] = None) -> None:
+        self.exists = True
+        self.vectors_config = vectors_config
+        self.sparse_vectors = sparse_vectors
+        self.checked_at = time.monotonic()
+
+    def expire(self) -> None:
+        self.checked_at = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"exists": self.exists, "layout": self.layout}
+
+
+class SearchSystemRegistry:
+    """
+    LRU registry of warm search systems keyed by (collection, environment).
+
+    The factory builds a system for a key; systems must expose a
+    `collection_info` (CollectionInfo) and an awaitable
+    `refresh_collection_info()` that revalidates it.
+    """
+
+    def __init__(self, factory: Callable[..., Any], ttl_seconds: float = 60, max_entries: int = 128):
+        """
+        Args:
+            factory: Called as factory(collection_name=..., use_production=...).
+            ttl_seconds: How long collection info is trusted before revalidation.
+            max_entries: Maximum number of systems kept (least recently used are dropped).
+        """
+        self._factory = factory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._systems: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._systems)
+
+    @staticmethod
+    def _key(collection_name: str, use_production: bool) -> Tuple[str, str]:
+        return collection_name, "prod" if use_production else "dev"
+
+    async def get(self, collection_name: str, use_production: bool = False) -> Any:
+        """Return a warm system for the collection, revalidating stale collection info."""
+        key = self._key(collection_name, use_production)
+        system = self._systems.get(key)
+        if system is None:
+            system = self._factory(collection_name=collection_name, use_production=use_production)
+            self._systems[key] = system
+            while len(self._systems) > self.max_entries:
+                evicted, _ = self._systems.popitem(last=False)
+                self._locks.pop(evicted, None)
+        self._systems.move_to_end(key)
+
+        if not system.collection_info.is_fresh(self.ttl_seconds):
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                # Another request may have revalidated while we waited
+                if not system.collection_info.is_fresh(self.ttl_seconds):
+                    await system.refresh_collection_info()
+                    logger.debug(f"Revalidated collection info for {key}")
+        return system
+
+    def invalidate(self, collection_name: str) -> int:
+        """Force revalidation of a collection in every environment on next use."""
+        expired = 0
+        for (name, _), system in self._systems.items():
+            if name == collection_name:
+                system.collection_info.expire()
+                expired += 1
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "systems": len(self._systems),
+            "collections": {
+                f"{name}@{env}": system.collection_info.as_dict()
+                for (name, env), system in self._systems.items()
+            },
+        }
@@ -0,0 +1,424 @@
+"""
+Exact full-response cache for /search.
+
+Byte-identical search requests (dashboards, scheduled jobs) are answered
+with the rendered results of an earlier call. Keys are a SHA-256 of the
+canonical request plus a collection version token, so entries are bypassed
+as soon as the collection changes:
+
+- the version token combines Qdrant collection info (points count and
+  indexed vectors), polled at most every `version_poll_seconds`, with a
+  generation counter stored in the backend that POST /cache/invalidate
+  bumps (shared by every replica using the same backend). Overwrites that
+  keep the counts, such as re-ingesting the same page IDs, only show up
+  through the generation counter;
+- entries are fresh for `ttl_seconds`, then served stale for up to
+  `stale_seconds` while one background refresh recomputes them
+  (stale-while-revalidate), so hot entries do not expire under load.
+
+Backends store opaque bytes with a TTL: InMemoryResponseBackend keeps them
+in-process, RespResponseBackend talks the Redis protocol (RESP2) so
+replicas can share one cache. Backend failures are logged and treated as
+misses; they never fail a search.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the cached body format changes, so old entries are ignored
+KEY_VERSION = 1
+
+class ResponseCacheError(Exception):
+    """Raised by backends for failed or rejected commands."""
+
+
+class InMemoryResponseBackend:
+    """In-process LRU store with a byte budget and per-entry expiry."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Raises:
+            ValueError: If max_bytes is not positive.
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.current_bytes -= len(value)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() > expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        self._entries[key] = (value, expires_at)
+        self.current_bytes += len(value)
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def close(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self.current_bytes, "evictions": self.evictions}
+
+
+def _encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise ResponseCacheError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise ResponseCacheError(f"Unexpected reply: {line[:32]!r}")
+
+
+class RespResponseBackend:
+    """
+    Store on a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Speaks RESP2 over a small pool of asyncio connections, using GET,
+    SET ... PX and INCR only; no client library is required.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "search:",
+                 pool_size: int = 4, timeout_seconds: float = 1.0):
+        """
+        Args:
+            url: redis://[:password@]host[:port][/db]
+            prefix: Prefix of every key written (separates applications sharing a server).
+            pool_size: Maximum number of open connections.
+            timeout_seconds: Timeout of a connect or command round trip.
+
+        Raises:
+            ValueError: If the URL is not a redis:// URL or pool_size is not positive.
+        """
+        parsed = urlparse(url)
+        if parsed.scheme != "redis" or not parsed.hostname:
+            raise ValueError(f"Unsupported response cache URL: {url}")
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.host = parsed.hostname
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout_seconds = timeout_seconds
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.connections_opened = 0
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.connections_opened += 1
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        try:
+            for command in setup:
+                await self._round_trip((reader, writer), command)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _round_trip(self, conn, args: Tuple[Any, ...]) -> Any:
+        reader, writer = conn
+        writer.write(_encode_command(*args))
+        await writer.drain()
+        return await _read_reply(reader)
+
+    async def _command(self, *args: Any) -> Any:
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(self._open(), self.timeout_seconds)
+                reply = await asyncio.wait_for(self._round_trip(conn, args), self.timeout_seconds)
+            except ResponseCacheError:
+                # Error reply: the connection is still in sync
+                if conn is not None:
+                    self._idle.append(conn)
+                raise
+            except BaseException as e:
+                # Timeouts, cancellation or I/O errors may leave a reply unread
+                if conn is not None:
+                    conn[1].close()
+                if isinstance(e, (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)):
+                    raise ResponseCacheError(f"{args[0]} failed: {str(e) or type(e).__name__}") from e
+                raise
+            self._idle.append(conn)
+            return reply
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._command("GET", self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        if ttl_seconds:
+            await self._command("SET", self.prefix + key, value, "PX", int(ttl_seconds * 1000))
+        else:
+            await self._command("SET", self.prefix + key, value)
+
+    async def incr(self, key: str) -> int:
+        return await self._command("INCR", self.prefix + key)
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.get(key)
+        return int(value) if value is not None else 0
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"connections_opened": self.connections_opened, "idle_connections": len(self._idle)}
+
+
+class ResponseCache:
+    """
+    Versioned response cache with stale-while-revalidate.
+
+    Values are rendered response bodies (bytes). Each stored value carries
+    its creation time (wall clock, so replicas agree on freshness).
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+
+    def __init__(self, backend: Any, ttl_seconds: float = 60, stale_seconds: float = 300,
+                 version_poll_seconds: float = 5):
+        """
+        Args:
+            backend: InMemoryResponseBackend, RespResponseBackend or any object with
+                the same async get/set/incr/get_counter/close methods.
+            ttl_seconds: How long an entry is served as fresh.
+            stale_seconds: How long after that it is served stale while being refreshed
+                (0 disables stale-while-revalidate).
+            version_poll_seconds: How often collection versions are re-read.
+
+        Raises:
+            ValueError: If ttl_seconds is not positive.
+        """
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = max(0.0, stale_seconds)
+        self.version_poll_seconds = version_poll_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self._versions: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._version_loads: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def make_key(request: Dict[str, Any], version: str) -> str:
+        """Hash a canonical request (JSON-serializable dict) and collection version."""
+        canonical = json.dumps(
+            {"v": KEY_VERSION, "request": request, "version": version},
+            sort_keys=True, separators=(",", ":"), default=str
+        )
+        return "resp:" + hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def _generation_key(collection: str) -> str:
+        return f"gen:{collection}"
+
+    async def collection_version(self, scope: str, collection: str,
+                                 fetch_marker: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the version token of a collection.
+
+        Args:
+            scope: Qdrant cluster the collection lives in.
+            collection: Collection name.
+            fetch_marker: Coroutine function returning a marker that changes with the
+                collection contents (e.g. from its points count).
+        """
+        key = (scope, collection)
+        cached = self._versions.get(key)
+        if cached is not None and time.monotonic() - cached[1] <= self.version_poll_seconds:
+            return cached[0]
+
+        # Concurrent requests share one poll
+        future = self._version_loads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load_version(collection, fetch_marker))
+            self._version_loads[key] = future
+            future.add_done_callback(lambda _: self._version_loads.pop(key, None))
+        version = await asyncio.shield(future)
+        self._versions[key] = (version, time.monotonic())
+        return version
+
+    async def _load_version(self, collection: str, fetch_marker: Callable[[], Awaitable[str]]) -> str:
+        marker = await fetch_marker()
+        try:
+            generation = await self.backend.get_counter(self._generation_key(collection))
+        except ResponseCacheError as e:
+            self.errors += 1
+            logger.warning(f"Response cache generation read failed: {str(e)}")
+            generation = "unknown"
+        return f"{marker}/g{generation}"
+
+    async def get(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Look up a response.
+
+        Returns:
+            (body, ResponseCache.FRESH or ResponseCache.STALE), or (None, None) on a miss.
+        """
+        try:
+            value = await self.backend.get(key)
+        except ResponseCacheError as e:
+            self.errors += 1
+            logger.warning(f"Response cache read failed: {str(e)}")
+            value = None
+        if value is None:
+            self.misses += 1
+            return None, None
+
+        header, _, body = value.partition(b"\n")
+        try:
+            age = time.time() - float(header)
+        except ValueError:
+            self.misses += 1
+            return None, None
+        if age <= self.ttl_seconds:
+            self.hits += 1
+            return body, self.FRESH
+        if age <= self.ttl_seconds + self.stale_seconds:
+            self.stale_hits += 1
+            return body, self.STALE
+        self.misses += 1
+        return None, None
+
+    async def set(self, key: str, body: bytes) -> None:
+        value = f"{time.time():.3f}\n".encode() + body
+        try:
+            await self.backend.set(key, value, self.ttl_seconds + self.stale_seconds)
+        except ResponseCacheError as e:
+            self.errors += 1
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def refresh(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bool:
+        """
+        Recompute a stale entry in the background.
+
+        Returns:
+            False if a refresh of this key is already running in this process.
+        """
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, render))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _refresh(self, key: str, render: Callable[[], Awaitable[bytes]]) -> None:
+        try:
+            await self.set(key, await render())
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"Response cache refresh failed: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def invalidate(self, collection: str) -> None:
+        """
+        Bump the generation of a collection, orphaning its entries in every replica.
+
+        Replicas sharing the backend pick up the new generation at their next
+        version poll; this process does immediately.
+        """
+        try:
+            await self.backend.incr(self._generation_key(collection))
+        except ResponseCacheError as e:
+            self.errors += 1
+            logger.warning(f"Response cache invalidation failed: {str(e)}")
+        for key in [key for key in self._versions if key[1] == collection]:
+            del self._versions[key]
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        stats = {
+            "hits": self.hits + self.stale_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+        stats.update(self.backend.stats())
+        return stats
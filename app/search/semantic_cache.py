@@ -0,0 +1,276 @@
+"""
+Semantic (near-duplicate) result cache.
+
+Keeps the results of recent queries together with their query embeddings,
+grouped by partition (cluster, collection, filter, limit, model, window and
+payload fields). A new query whose embedding has cosine similarity of at
+least `threshold` with a cached one in the same partition is answered from
+the cache, skipping the vector search and context fetches entirely.
+
+Cached vectors of a partition are stored normalized in one float32 NumPy
+matrix, so a lookup is a single matrix-vector product. Cached results keep
+the scores of the query that produced them.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (scope, collection, ...); the collection must be the second element for invalidate()
+PartitionKey = Tuple[Hashable, ...]
+
+# Initial number of rows allocated per partition (doubled when full)
+_INITIAL_ROWS = 16
+
+
+class _Entry:
+    __slots__ = ("partition", "row", "results", "stored_at")
+
+    def __init__(self, partition: "_Partition", row: int, results: Any, stored_at: float):
+        self.partition = partition
+        self.row = row
+        self.results = results
+        self.stored_at = stored_at
+
+
+class _Partition:
+    """Normalized vectors of one partition; row i belongs to entries[i]."""
+
+    __slots__ = ("key", "vectors", "entries")
+
+    def __init__(self, key: PartitionKey, dimensions: int):
+        self.key = key
+        self.vectors = np.empty((_INITIAL_ROWS, dimensions), dtype=np.float32)
+        self.entries: List[_Entry] = []
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarities, shape (len(queries), len(entries))."""
+        return queries @ self.vectors[:len(self.entries)].T
+
+    def append(self, vector: np.ndarray, entry: _Entry) -> None:
+        size = len(self.entries)
+        if size == self.vectors.shape[0]:
+            grown = np.empty((size * 2, self.dimensions), dtype=np.float32)
+            grown[:size] = self.vectors
+            self.vectors = grown
+        self.vectors[size] = vector
+        entry.row = size
+        self.entries.append(entry)
+
+    def remove(self, entry: _Entry) -> None:
+        # Move the last row into the freed slot to keep the matrix dense
+        last = self.entries.pop()
+        if last is not entry:
+            self.vectors[entry.row] = self.vectors[len(self.entries)]
+            last.row = entry.row
+            self.entries[entry.row] = last
+
+
+def _normalize(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SemanticResultCache:
+    """
+    Thread-safe LRU cache of search results looked up by query similarity.
+
+    Entries expire after ttl_seconds and can be invalidated per collection.
+    Returned results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = 1000, threshold: float = 0.95,
+                 ttl_seconds: Optional[float] = 300):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached queries (least recently used are dropped).
+            threshold: Minimum cosine similarity for a cached query to match.
+            ttl_seconds: Entry lifetime in seconds (None or 0 disables expiry).
+
+        Raises:
+            ValueError: If max_entries is not positive or threshold is not in (0, 1].
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._partitions: Dict[PartitionKey, _Partition] = {}
+        self._lru: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _remove(self, entry: _Entry) -> None:
+        del self._lru[id(entry)]
+        partition = entry.partition
+        partition.remove(entry)
+        if not partition.entries:
+            self._partitions.pop(partition.key, None)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.stored_at > self.ttl_seconds
+
+    def get_many(self, partition_key: PartitionKey,
+                 vectors: Sequence[Sequence[float]]) -> List[Optional[Any]]:
+        """
+        Look up the results of several queries of one partition.
+
+        Returns:
+            Cached results per query vector, or None where nothing matched.
+        """
+        found: List[Optional[Any]] = [None] * len(vectors)
+        if not len(vectors):
+            return found
+        queries = _normalize(vectors)
+        now = time.monotonic()
+        with self._lock:
+            partition = self._partitions.get(partition_key)
+            if partition is not None and partition.dimensions == queries.shape[1]:
+                similarities = partition.similarities(queries)
+                if self.ttl_seconds is not None:
+                    # Expired rows (dropped by the next put_many()) must not
+                    # shadow a live match that is slightly less similar
+                    expired = [self._expired(entry, now) for entry in partition.entries]
+                    similarities[:, np.array(expired, dtype=bool)] = -np.inf
+                for index, row in enumerate(similarities.argmax(axis=1)):
+                    if similarities[index, row] < self.threshold:
+                        continue
+                    entry = partition.entries[row]
+                    self._lru.move_to_end(id(entry))
+                    found[index] = entry.results
+
+            hits = sum(1 for results in found if results is not None)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def get(self, partition_key: PartitionKey, vector: Sequence[float]) -> Optional[Any]:
+        """Return the cached results of the most similar query, or None."""
+        return self.get_many(partition_key, [vector])[0]
+
+    def put_many(self, partition_key: PartitionKey, vectors: Sequence[Sequence[float]],
+                 results: Sequence[Any]) -> None:
+        """
+        Store results of several queries of one partition.
+
+        A vector matching a cached query replaces that entry, so repeated
+        queries do not fill the cache with duplicates.
+        """
+        if not len(vectors):
+            return
+        normalized = _normalize(vectors)
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            partition = self._partitions.get(partition_key)
+            if partition is not None and partition.dimensions != normalized.shape[1]:
+                # Embedding dimensions changed: old vectors cannot be compared
+                for entry in list(partition.entries):
+                    self._remove(entry)
+                partition = None
+            if partition is None:
+                partition = _Partition(partition_key, normalized.shape[1])
+                self._partitions[partition_key] = partition
+
+            for vector, value in zip(normalized, results):
+                if partition.entries:
+                    similarities = partition.similarities(vector[np.newaxis])[0]
+                    row = int(similarities.argmax())
+                    if similarities[row] >= self.threshold:
+                        entry = partition.entries[row]
+                        partition.vectors[row] = vector
+                        entry.results = value
+                        entry.stored_at = now
+                        self._lru.move_to_end(id(entry))
+                        continue
+                entry = _Entry(partition, 0, value, now)
+                partition.append(vector, entry)
+                self._lru[id(entry)] = entry
+
+            while len(self._lru) > self.max_entries:
+                self._remove(next(iter(self._lru.values())))
+                self.evictions += 1
+
+    def put(self, partition_key: PartitionKey, vector: Sequence[float], results: Any) -> None:
+        self.put_many(partition_key, [vector], [results])
+
+    def _drop_expired(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        # LRU order is close to insertion order; stop at the first live entry
+        while self._lru:
+            entry = next(iter(self._lru.values()))
+            if not self._expired(entry, now):
+                return
+            self._remove(entry)
+
+    def invalidate(self, collection: str, scope: Optional[Hashable] = None) -> int:
+        """
+        Drop cached results of a collection.
+
+        Args:
+            collection: Collection name.
+            scope: Limit to one scope (Qdrant cluster); all scopes if None.
+
+        Returns:
+            Number of entries removed.
+        """
+        with self._lock:
+            partitions = [
+                partition for key, partition in self._partitions.items()
+                if key[1] == collection and (scope is None or key[0] == scope)
+            ]
+            removed = 0
+            for partition in partitions:
+                for entry in list(partition.entries):
+                    self._remove(entry)
+                    removed += 1
+        if removed:
+            logger.info(f"Invalidated {removed} cached results for collection '{collection}'")
+        return removed
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._partitions.clear()
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy (bytes: cached vectors)."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            vector_bytes = sum(
+                len(partition.entries) * partition.dimensions * 4
+                for partition in self._partitions.values()
+            )
+        return {
+            "entries": len(self._lru),
+            "partitions": len(self._partitions),
+            "bytes": vector_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,67 @@
+"""
+Single-flight deduplication of concurrent identical calls.
+
+When identical requests arrive while the first one is still running, they
+wait for that call and share its result (or exception) instead of running
+the same work again. Nothing is kept once the call finishes, so results are
+never served stale: a request arriving afterwards runs the work itself.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls that share a key.
+
+    The work runs in its own task, so a caller that is cancelled (e.g. its
+    client disconnected) does not cancel the call for the other waiters.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run fn() unless a call with the same key is in flight, then await it.
+
+        Args:
+            key: Hashable identity of the work (must cover every input of fn).
+            fn: Coroutine function doing the work.
+
+        Returns:
+            (result, shared): shared is True when the result came from a call
+            started by another caller.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.executed += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here so an abandoned call does not log "never retrieved"
+            logger.debug(f"Single-flight call failed: {task.exception()!r}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return in-flight calls and lifetime counters."""
+        return {"in_flight": len(self._calls), "executed": self.executed, "shared": self.shared}
@@ -0,0 +1,205 @@
+"""
+BM25 sparse vectors for hybrid (dense + lexical) search.
+
+Dense embeddings blur exact identifiers such as version strings and error
+codes ("ecos 9.3", "E1042"). A sparse named vector holding BM25 term weights
+lets Qdrant match them lexically, and a single query fuses both candidate
+lists (RRF or DBSF) server-side.
+
+Terms are hashed to sparse indices, so no vocabulary has to be shared
+between the indexer and the API. Documents store the BM25 term-frequency
+part; the IDF part is applied by Qdrant at query time (sparse vector with
+`modifier=idf`) from statistics it keeps current as points change. Queries
+therefore only carry a weight of 1 per distinct term.
+
+Usage (populate the sparse vector of an existing collection):
+    python -m app.search.sparse --url http://localhost:6333 --collection content
+"""
+
+import argparse
+import logging
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+from qdrant_client import QdrantClient, models
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPARSE_VECTOR_NAME = "bm25"
+
+# BM25 parameters (Robertson/Sparck Jones defaults, as used by Lucene)
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+# Runs of letters/digits, joined by ".", "-", "_" or "/" into one compound
+# token so version strings and codes ("9.3.1", "e-1042") stay intact
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[._/-][^\W_]+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-cased lexical terms.
+
+    Compound tokens are emitted whole and as their parts, so "ecos-9.3"
+    matches queries for "ecos-9.3", "ecos" and "9".
+    """
+    terms: List[str] = []
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        token = match.group()
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(_PART_RE.findall(token))
+    return terms
+
+
+def term_index(term: str) -> int:
+    """Sparse vector index of a term (stable 32-bit hash)."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _sparse_vector(weights: Dict[int, float]) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[weights[index] for index in indices])
+
+
+def query_sparse_vector(text: str) -> models.SparseVector:
+    """Sparse query vector: weight 1 per distinct term (IDF is applied by Qdrant)."""
+    return _sparse_vector({term_index(term): 1.0 for term in tokenize(text)})
+
+
+def document_sparse_vector(text: str, avg_length: float, k1: float = DEFAULT_K1,
+                           b: float = DEFAULT_B) -> models.SparseVector:
+    """
+    Sparse document vector holding the BM25 term-frequency weights.
+
+    Args:
+        text: Document text.
+        avg_length: Average document length in terms across the collection.
+        k1: Term frequency saturation.
+        b: Document length normalization.
+    """
+    terms = tokenize(text)
+    counts = Counter(term_index(term) for term in terms)
+    length_norm = k1 * (1 - b + b * len(terms) / max(avg_length, 1.0))
+    return _sparse_vector({
+        index: count * (k1 + 1) / (count + length_norm) for index, count in counts.items()
+    })
+
+
+def sparse_vectors_config(name: str = DEFAULT_SPARSE_VECTOR_NAME) -> Dict[str, models.SparseVectorParams]:
+    """sparse_vectors_config for create_collection with an IDF-weighted BM25 vector."""
+    return {name: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+
+
+def _iter_texts(client: QdrantClient, collection_name: str, text_field: str,
+                batch_size: int) -> Iterator[List[Any]]:
+    """Yield batches of (point ID, text or None)."""
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            with_payload=[text_field],
+            with_vectors=False,
+            limit=batch_size,
+            offset=offset,
+        )
+        batch = []
+        for point in points:
+            text = (point.payload or {}).get(text_field)
+            batch.append((point.id, text if isinstance(text, str) and text.strip() else None))
+        yield batch
+        if offset is None:
+            return
+
+
+def index_sparse_vectors(client: QdrantClient, collection_name: str,
+                         vector_name: str = DEFAULT_SPARSE_VECTOR_NAME, text_field: str = "pagecontent",
+                         batch_size: int = 256, avg_length: Optional[float] = None,
+                         k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> Dict[str, Any]:
+    """
+    Compute and store BM25 sparse vectors for every point of a collection.
+
+    Only the sparse named vector is written (update_vectors); dense vectors
+    and payloads are left unchanged. Run it again after bulk ingestion so the
+    average document length stays representative.
+
+    Args:
+        client: Qdrant client connected to the target cluster.
+        collection_name: Collection to index.
+        vector_name: Sparse vector name (must exist in the collection config).
+        text_field: Payload field holding the text.
+        batch_size: Points per scroll/update batch.
+        avg_length: Average document length in terms; measured with an
+            extra pass over the texts when omitted.
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalization.
+
+    Returns:
+        Counts: {"scanned", "indexed", "skipped", "avg_length"}.
+
+    Raises:
+        ValueError: If the collection has no sparse vector named vector_name.
+    """
+    sparse_config = client.get_collection(collection_name).config.params.sparse_vectors or {}
+    if vector_name not in sparse_config:
+        raise ValueError(
+            f"Collection '{collection_name}' has no sparse vector '{vector_name}'. "
+            "Qdrant cannot add named vectors to an existing collection; recreate it with "
+            f"sparse_vectors_config={{'{vector_name}': SparseVectorParams(modifier=Modifier.IDF)}}"
+        )
+
+    if avg_length is None:
+        total_terms = documents = 0
+        for batch in _iter_texts(client, collection_name, text_field, batch_size):
+            for _, text in batch:
+                if text is not None:
+                    total_terms += len(tokenize(text))
+                    documents += 1
+        avg_length = total_terms / documents if documents else 1.0
+
+    counts: Dict[str, Any] = {"scanned": 0, "indexed": 0, "skipped": 0, "avg_length": round(avg_length, 2)}
+    for batch in _iter_texts(client, collection_name, text_field, batch_size):
+        updates = []
+        for point_id, text in batch:
+            counts["scanned"] += 1
+            if text is None:
+                counts["skipped"] += 1
+                continue
+            updates.append(models.PointVectors(
+                id=point_id, vector={vector_name: document_sparse_vector(text, avg_length, k1, b)}
+            ))
+        if updates:
+            client.update_vectors(collection_name=collection_name, points=updates, wait=True)
+        counts["indexed"] += len(updates)
+
+    logger.info(f"Sparse vector indexing for '{collection_name}': {counts}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Populate the BM25 sparse vector of a collection")
+    parser.add_argument("--url", required=True, help="Qdrant URL, e.g. http://localhost:6333")
+    parser.add_argument("--api-key", default=None, help="Qdrant API key")
+    parser.add_argument("--collection", required=True, help="Collection to index")
+    parser.add_argument("--vector-name", default=DEFAULT_SPARSE_VECTOR_NAME)
+    parser.add_argument("--text-field", default="pagecontent", help="Payload field holding the text")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--avg-length", type=float, default=None,
+                        help="Average document length in terms (measured if omitted)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = QdrantClient(url=args.url, api_key=args.api_key)
+    try:
+        print(index_sparse_vectors(
+            client, args.collection, args.vector_name, args.text_field, args.batch_size, args.avg_length
+        ))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+End-to-end benchmark of /search and /search/filenames against local fakes.
+
+Runs the FastAPI app in-process (httpx ASGI transport) with an in-memory
+Qdrant seeded with synthetic page-structured documents and a fake embedding
+provider with configurable latency, so no Qdrant or Ollama host is needed.
+Each scenario is driven at a fixed concurrency and reports p50/p95/p99
+latency, throughput and process RSS. Results can be saved as a JSON
+baseline and later runs compared against it.
+
+Pass --qdrant-url to seed a throwaway collection on a real Qdrant server
+instead (local mode evaluates filters in Python, so context scrolls are far
+slower than on a server; use it to compare runs, not absolute numbers).
+
+Settings read by app.main at import (PAGE_CACHE_ENABLED, CONTEXT_FETCH_MODE,
+...) apply as usual, e.g. `PAGE_CACHE_ENABLED=true python -m benchmarks.bench_api`.
+
+Usage:
+    python -m benchmarks.bench_api [--concurrency 16] [--requests 200]
+        [--embed-latency-ms 20] [--embed-parallel 1] [--scenarios search,filenames]
+        [--qdrant-url http://localhost:6333]
+        [--output results.json] [--baseline benchmarks/baseline.json]
+        [--max-regression 20]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+
+import app.main
+from app.embeddings import AsyncBatchingEmbeddingClient, EmbeddingProviderFactory
+from app.main import AsyncSearchSystem
+from app.search.registry import SearchSystemRegistry
+from benchmarks.fakes import WORDS, FakeEmbeddingClient, seed_collection
+
+COLLECTION = "bench-docs"
+
+# Scenario name -> request builder (request number, rng) -> (path, JSON body)
+RequestBuilder = Callable[[int, random.Random], Tuple[str, Dict[str, Any]]]
+
+
+def _query(rng: random.Random, words: int = 3) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+SCENARIOS: Dict[str, RequestBuilder] = {
+    "search": lambda i, rng: ("/search", {
+        "collection_name": COLLECTION, "search_queries": [_query(rng)], "limit": 5,
+    }),
+    "search_multi": lambda i, rng: ("/search", {
+        "collection_name": COLLECTION, "search_queries": [_query(rng) for _ in range(4)], "limit": 5,
+    }),
+    "filenames": lambda i, rng: ("/search/filenames", {
+        "collection_name": COLLECTION, "query": rng.choice(WORDS), "limit": 10,
+    }),
+    "filenames_list": lambda i, rng: ("/search/filenames", {
+        "collection_name": COLLECTION, "mode": "list", "limit": 100,
+    }),
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated percentile (q in [0, 100]) of a non-empty list."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+async def setup_app(files: int, pages_per_file: int, dimensions: int, embed_latency_ms: float,
+                    qdrant_url: Optional[str] = None, embed_parallel: Optional[int] = None) -> int:
+    """Point the app's shared clients at the fakes (or a real Qdrant); returns the point count."""
+    qclient = AsyncQdrantClient(url=qdrant_url) if qdrant_url else AsyncQdrantClient(":memory:")
+    if await qclient.collection_exists(COLLECTION):
+        await qclient.delete_collection(COLLECTION)
+    points = await seed_collection(qclient, COLLECTION, files=files, pages_per_file=pages_per_file,
+                                   dimensions=dimensions)
+    AsyncSearchSystem._async_qdrant_pool_dev = qclient
+    embedder = FakeEmbeddingClient(dimensions, embed_latency_ms, max_parallel=embed_parallel)
+    batching = EmbeddingProviderFactory._batching_from_env()
+    if batching is not None:
+        embedder = AsyncBatchingEmbeddingClient(embedder, **batching)
+    AsyncSearchSystem._async_embedding_client = embedder
+    app.main.search_registry = SearchSystemRegistry(AsyncSearchSystem)
+    app.main.filename_indexes.clear()
+    app.main.filename_listings.clear()
+    return points
+
+
+async def run_scenario(http: httpx.AsyncClient, build: RequestBuilder, requests: int,
+                       concurrency: int, warmup: int, seed: int = 0) -> Dict[str, float]:
+    """Send `requests` requests from `concurrency` workers and summarize latencies."""
+    rng = random.Random(seed)
+    bodies = [build(i, rng) for i in range(warmup + requests)]
+    for path, body in bodies[:warmup]:
+        await http.post(path, json=body)
+
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(bodies[warmup:])
+
+    async def worker():
+        nonlocal errors
+        for path, body in pending:
+            start = time.perf_counter()
+            response = await http.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3),
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 99), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+async def run(scenarios: List[str], requests: int = 200, concurrency: int = 16, warmup: int = 20,
+              files: int = 20, pages_per_file: int = 10, dimensions: int = 64,
+              embed_latency_ms: float = 20.0, qdrant_url: Optional[str] = None,
+              embed_parallel: Optional[int] = None) -> Dict[str, Any]:
+    # Per-request INFO logs would dominate the measurement
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    points = await setup_app(files, pages_per_file, dimensions, embed_latency_ms, qdrant_url, embed_parallel)
+    headers = {"Authorization": f"Bearer {app.main.API_KEY}"} if app.main.API_KEY_ENABLED else {}
+    transport = httpx.ASGITransport(app=app.main.app)
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "qdrant": "server" if qdrant_url else "local",
+            "points": points,
+            "dimensions": dimensions,
+            "embed_latency_ms": embed_latency_ms,
+            "embed_parallel": embed_parallel,
+            "page_cache": app.main.PAGE_CACHE_ENABLED,
+            "context_fetch_mode": app.main.CONTEXT_FETCH_MODE,
+            "embedding_batching": EmbeddingProviderFactory._batching_from_env() is not None,
+        },
+        "scenarios": {},
+    }
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers,
+                                 timeout=60) as http:
+        for name in scenarios:
+            results["scenarios"][name] = await run_scenario(
+                http, SCENARIOS[name], requests, concurrency, warmup
+            )
+    if qdrant_url:
+        await AsyncSearchSystem._async_qdrant_pool_dev.delete_collection(COLLECTION)
+    await AsyncSearchSystem.close_clients()
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Relative change (percent) of each scenario against the baseline.
+
+    Positive values are regressions: higher latency or lower throughput.
+    """
+    changes = {}
+    for name, row in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        changes[name] = {
+            metric: 100 * (row[metric] - base[metric]) / base[metric]
+            for metric in ("p50_ms", "p95_ms", "p99_ms") if base.get(metric)
+        }
+        if base.get("throughput_rps"):
+            changes[name]["throughput_rps"] = 100 * (base["throughput_rps"] - row["throughput_rps"]) / base["throughput_rps"]
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages-per-file", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, default=64)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-parallel", type=int, default=None,
+                        help="Calls the fake provider serves at once (default: unlimited)")
+    parser.add_argument("--qdrant-url", help="Seed and query this Qdrant server instead of local mode")
+    parser.add_argument("--output", help="Write results as JSON (e.g. to refresh the baseline)")
+    parser.add_argument("--baseline", help="Compare against a JSON file written with --output")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit with status 1 if p95 or throughput regress by more than this percent")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(
+        scenarios, requests=args.requests, concurrency=args.concurrency, warmup=args.warmup,
+        files=args.files, pages_per_file=args.pages_per_file, dimensions=args.dimensions,
+        embed_latency_ms=args.embed_latency_ms, qdrant_url=args.qdrant_url,
+        embed_parallel=args.embed_parallel,
+    ))
+
+    print(f"{'scenario':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>7} {'RSS MB':>8}")
+    for name, row in results["scenarios"].items():
+        print(f"{name:<16} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['throughput_rps']:>8.1f} {row['errors']:>7} {row['rss_mb']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        changes = compare(results, baseline)
+        print(f"\nvs {args.baseline} (positive = regression)")
+        differing = [
+            key for key, value in results["meta"].items()
+            if key not in ("python", "platform") and baseline.get("meta", {}).get(key) != value
+        ]
+        if differing:
+            print(f"Warning: settings differ from the baseline ({', '.join(differing)})")
+        worst = 0.0
+        for name, delta in changes.items():
+            print(f"{name:<16} " + "  ".join(f"{metric} {value:+.1f}%" for metric, value in delta.items()))
+            worst = max(worst, delta.get("p95_ms", 0.0), delta.get("throughput_rps", 0.0))
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"Regression of {worst:.1f}% exceeds --max-regression {args.max_regression}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the page content cleaner.
+
+Compares clean_whitespace against the original two-pass regex cleaner on
+synthetic markdown pages and prints throughput in MB/s.
+
+Usage:
+    python -m benchmarks.bench_cleaning [--pages 200] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+
+from app.search.cleaning import clean_whitespace, legacy_clean_whitespace
+
+WORDS = "the quick brown fox jumps over lazy dog tunnel interface overlay policy".split()
+
+
+def table_page(rng: random.Random, rows: int = 60) -> str:
+    """Markdown table with padded cells, like converted PDF tables."""
+    lines = []
+    for _ in range(rows):
+        cells = [rng.choice(WORDS) + " " * rng.randint(0, 20) for _ in range(5)]
+        lines.append("| " + " |  ".join(cells) + "   |" + " " * rng.randint(0, 5))
+    return "\n".join(lines) + "   \n\n  "
+
+
+def prose_page(rng: random.Random, paragraphs: int = 8) -> str:
+    """Paragraphs of text with occasional double and trailing spaces."""
+    return "\n\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(80)) + ("  " if rng.random() < 0.3 else "")
+        for _ in range(paragraphs)
+    )
+
+
+def throughput(clean: Callable[[str], str], pages: List[str], repeat: int) -> float:
+    """Best-of-3 throughput in MB/s."""
+    size_mb = sum(len(page.encode()) for page in pages) / 1e6
+    best = 0.0
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                clean(page)
+        best = max(best, size_mb * repeat / (time.perf_counter() - start))
+    return best
+
+
+def run(pages: int = 200, repeat: int = 5, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    corpora = {
+        "tables": [table_page(rng) for _ in range(pages)],
+        "prose": [prose_page(rng) for _ in range(pages)],
+    }
+    results = {}
+    for name, corpus in corpora.items():
+        assert [clean_whitespace(p) for p in corpus] == [legacy_clean_whitespace(p) for p in corpus]
+        legacy = throughput(legacy_clean_whitespace, corpus, repeat)
+        current = throughput(clean_whitespace, corpus, repeat)
+        results[name] = {"legacy_mb_s": legacy, "current_mb_s": current, "speedup": current / legacy}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'corpus':<8} {'legacy MB/s':>12} {'current MB/s':>13} {'speedup':>8}")
+    for name, row in run(args.pages, args.repeat).items():
+        print(f"{name:<8} {row['legacy_mb_s']:>12.1f} {row['current_mb_s']:>13.1f} {row['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
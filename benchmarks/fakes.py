@@ -0,0 +1,115 @@
+"""
+In-process stand-ins for the API's external services.
+
+FakeEmbeddingClient replaces Ollama/Gemini with deterministic vectors and a
+configurable latency; seed_collection() fills an in-memory Qdrant
+(AsyncQdrantClient(":memory:")) with synthetic page-structured documents in
+the same payload layout as the ingestion pipeline, with deterministic page
+point IDs so CONTEXT_FETCH_MODE=ids can be measured too.
+
+Local mode evaluates payload filters in Python over every point, so filtered
+context scrolls cost far more than on a Qdrant server; compare runs against
+each other, not against production latencies.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+from typing import List, Optional
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, models
+
+from app.search import page_point_id
+
+WORDS = (
+    "network tunnel interface overlay policy routing vlan switch firewall gateway "
+    "subnet latency packet session controller fabric bridge segment vrf bgp"
+).split()
+
+
+def text_vector(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector derived from the text (same text, same vector)."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeEmbeddingClient:
+    """
+    Async embedding client returning deterministic vectors after a fixed delay.
+
+    With max_parallel set, at most that many calls are served at once and the
+    rest queue, like an Ollama server with OLLAMA_NUM_PARALLEL.
+    """
+
+    def __init__(self, dimensions: int = 64, latency_ms: float = 20.0, model: str = "fake-embed",
+                 max_parallel: Optional[int] = None):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.model = model
+        self.max_parallel = max_parallel
+        self.calls = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        self.calls += 1
+        if self.max_parallel:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_parallel)
+            async with self._slots:
+                await asyncio.sleep(self.latency_ms / 1000)
+        elif self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return np.array([text_vector(text, self.dimensions) for text in texts], dtype=np.float32)
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        return (await self.embed([text]))[0]
+
+
+def page_text(rng: random.Random, words: int) -> str:
+    """Markdown-ish page body with padded spaces, like converted documents."""
+    lines = []
+    for _ in range(max(1, words // 12)):
+        lines.append("  ".join(rng.choice(WORDS) for _ in range(12)) + "   ")
+    return "\n".join(lines)
+
+
+async def seed_collection(client: AsyncQdrantClient, collection_name: str, files: int = 20,
+                          pages_per_file: int = 10, dimensions: int = 64, words_per_page: int = 300,
+                          seed: int = 0) -> int:
+    """
+    Create a collection of synthetic page-structured documents.
+
+    Every point has the payload {"pagecontent", "metadata": {"filename",
+    "page_number"}} used by page-based collections, and the point ID
+    page_point_id(filename, page_number).
+
+    Returns:
+        Number of points written.
+    """
+    rng = random.Random(seed)
+    await client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(size=dimensions, distance=models.Distance.COSINE),
+    )
+
+    count = 0
+    for file_number in range(files):
+        filename = f"{rng.choice(WORDS)}-guide-{file_number:04d}.md"
+        points = []
+        for page_number in range(1, pages_per_file + 1):
+            content = page_text(rng, words_per_page)
+            points.append(models.PointStruct(
+                id=page_point_id(filename, page_number),
+                vector=text_vector(content, dimensions),
+                payload={
+                    "pagecontent": content,
+                    "metadata": {"filename": filename, "page_number": page_number},
+                },
+            ))
+        await client.upsert(collection_name, points=points)
+        count += len(points)
+    return count
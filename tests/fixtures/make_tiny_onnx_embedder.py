@@ -0,0 +1,81 @@
+"""
+Build the tiny ONNX sentence embedding model used by the local provider tests.
+
+The model mimics the layout of an exported sentence-transformers encoder:
+inputs input_ids / attention_mask / token_type_ids (int64, [batch, seq]) and
+a last_hidden_state output ([batch, seq, hidden]); the provider pools it.
+Token vectors are a fixed embedding table followed by one dense layer with
+tanh, so MatMul/Gather weights exist for int8 quantization.
+
+Run from the repository root (needs the onnx and tokenizers packages):
+
+    python tests/fixtures/make_tiny_onnx_embedder.py
+"""
+
+import os
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "tiny-onnx-embedder")
+HIDDEN = 16
+
+WORDS = [
+    "install", "installation", "setup", "configure", "configuration", "server", "database",
+    "backup", "restore", "error", "warning", "network", "password", "reset", "user", "account",
+    "search", "index", "query", "document", "page", "manual", "guide", "how", "to", "the", "a",
+    "of", "and", "for", "in", "on", "with", "is", "what", "why", "when",
+]
+
+
+def build_tokenizer() -> Tokenizer:
+    vocab = {"[PAD]": 0, "[UNK]": 1}
+    for word in WORDS:
+        vocab[word] = len(vocab)
+    tokenizer = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.Lowercase()
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return tokenizer
+
+
+def build_model(vocab_size: int) -> onnx.ModelProto:
+    rng = np.random.default_rng(7)
+    table = rng.normal(size=(vocab_size, HIDDEN)).astype(np.float32)
+    table[0] = 0.0  # [PAD]
+    dense = rng.normal(scale=0.5, size=(HIDDEN, HIDDEN)).astype(np.float32)
+
+    graph = helper.make_graph(
+        nodes=[
+            helper.make_node("Gather", ["embeddings", "input_ids"], ["token_vectors"]),
+            helper.make_node("MatMul", ["token_vectors", "dense"], ["projected"]),
+            helper.make_node("Tanh", ["projected"], ["last_hidden_state"]),
+        ],
+        name="tiny-embedder",
+        inputs=[
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "sequence"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "sequence"]),
+            helper.make_tensor_value_info("token_type_ids", TensorProto.INT64, ["batch", "sequence"]),
+        ],
+        outputs=[
+            helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT,
+                                          ["batch", "sequence", HIDDEN]),
+        ],
+        initializer=[
+            numpy_helper.from_array(table, "embeddings"),
+            numpy_helper.from_array(dense, "dense"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    return model
+
+
+if __name__ == "__main__":
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    tokenizer = build_tokenizer()
+    tokenizer.save(os.path.join(OUTPUT_DIR, "tokenizer.json"))
+    onnx.save(build_model(tokenizer.get_vocab_size()), os.path.join(OUTPUT_DIR, "model.onnx"))
+    print(f"Wrote {OUTPUT_DIR}")
@@ -0,0 +1,78 @@
+"""
+Smoke tests for the offline API benchmark (benchmarks/bench_api.py).
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+import app.main
+from app.main import AsyncSearchSystem
+from benchmarks import bench_api
+from benchmarks.fakes import FakeEmbeddingClient, text_vector
+
+
+@pytest.fixture
+def restore_app_state(monkeypatch):
+    """The benchmark swaps the app's shared clients; restore them afterwards."""
+    monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", AsyncSearchSystem._async_qdrant_pool_dev)
+    monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", AsyncSearchSystem._async_embedding_client)
+    monkeypatch.setattr(app.main, "search_registry", app.main.search_registry)
+    logger = logging.getLogger("app.main")
+    level = logger.level
+    yield
+    logger.setLevel(level)
+    app.main.filename_indexes.clear()
+    app.main.filename_listings.clear()
+
+
+class TestBenchmarkHelpers:
+    """Test fakes and statistics helpers."""
+
+    def test_text_vector_is_deterministic_unit_vector(self):
+        vector = text_vector("tunnel", 16)
+        assert vector == text_vector("tunnel", 16)
+        assert sum(v * v for v in vector) == pytest.approx(1.0)
+
+    def test_fake_embedding_client(self):
+        client = FakeEmbeddingClient(dimensions=8, latency_ms=0)
+        vectors = asyncio.run(client.embed(["a", "b"]))
+        assert len(vectors) == 2 and len(vectors[0]) == 8
+        assert client.calls == 1
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert bench_api.percentile(values, 50) == pytest.approx(50.5)
+        assert bench_api.percentile(values, 99) == pytest.approx(99.01)
+        assert bench_api.percentile([3.0], 95) == 3.0
+
+    def test_compare_reports_regressions_as_positive(self):
+        baseline = {"scenarios": {"search": {"p50_ms": 10, "p95_ms": 20, "p99_ms": 40, "throughput_rps": 100}}}
+        current = {"scenarios": {
+            "search": {"p50_ms": 12, "p95_ms": 20, "p99_ms": 30, "throughput_rps": 80},
+            "new": {"p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "throughput_rps": 1},
+        }}
+
+        changes = bench_api.compare(current, baseline)
+
+        assert set(changes) == {"search"}
+        assert changes["search"]["p50_ms"] == pytest.approx(20.0)
+        assert changes["search"]["p99_ms"] == pytest.approx(-25.0)
+        assert changes["search"]["throughput_rps"] == pytest.approx(20.0)
+
+
+def test_run_all_scenarios(restore_app_state):
+    results = asyncio.run(bench_api.run(
+        list(bench_api.SCENARIOS), requests=6, concurrency=3, warmup=1,
+        files=3, pages_per_file=4, dimensions=8, embed_latency_ms=0,
+    ))
+
+    assert results["meta"]["points"] == 12
+    for name in bench_api.SCENARIOS:
+        row = results["scenarios"][name]
+        assert row["requests"] == 6
+        assert row["errors"] == 0
+        assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+        assert row["throughput_rps"] > 0
+        assert row["rss_mb"] > 0
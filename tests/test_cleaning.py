@@ -0,0 +1,30 @@
+"""
+Unit tests for the content cleaner (app.search.cleaning).
+"""
+
+import random
+
+import pytest
+
+from app.search.cleaning import clean_whitespace, legacy_clean_whitespace
+
+
+class TestCleanWhitespace:
+    """Test that the fast cleaner matches the original regex cleaner."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("| Column1     |     Column2     |", "| Column1 | Column2 |"),
+        ("line one   \nline two  \n\n  para", "line one\nline two\n\n para"),
+        ("  leading and trailing  ", "leading and trailing"),
+        ("tabs\t\tstay  \t", "tabs\t\tstay"),
+        ("", ""),
+        (None, None),
+    ])
+    def test_examples(self, text, expected):
+        assert clean_whitespace(text) == expected
+
+    def test_matches_legacy_on_random_text(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice(" \n\ta|") for _ in range(rng.randint(0, 40)))
+            assert clean_whitespace(text) == legacy_clean_whitespace(text)
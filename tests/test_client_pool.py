@@ -0,0 +1,90 @@
+"""
+Unit tests for the Qdrant client pool (app.search.client_pool).
+"""
+
+import asyncio
+
+import pytest
+
+from app.search.client_pool import ClientPool
+
+
+class FakeClient:
+    def __init__(self, *params):
+        self.params = params
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestClientPool:
+    """Test reuse, keys, eviction, idle timeout and shutdown."""
+
+    def test_same_connection_reuses_client(self):
+        pool = ClientPool(FakeClient)
+
+        async def scenario():
+            first = await pool.acquire("https://q:6333", "secret", True)
+            await pool.release(first)
+            second = await pool.acquire("https://q:6333", "secret", True)
+            other = await pool.acquire("https://q:6333", "other", True)
+            return first, second, other
+
+        first, second, other = run(scenario())
+        assert first is second
+        assert other is not first
+        assert pool.stats()["created"] == 2
+
+    def test_key_hashes_api_key(self):
+        key = ClientPool.make_key("https://q:6333", "secret", False)
+
+        assert "secret" not in key
+        assert key == ClientPool.make_key("https://q:6333", "secret", False)
+
+    def test_lru_eviction_closes_after_release(self):
+        pool = ClientPool(FakeClient, max_clients=1)
+
+        async def scenario():
+            leased = await pool.acquire("http://a", None, None)
+            idle = await pool.acquire("http://b", None, None)
+            assert not leased.closed  # evicted but still in use
+            await pool.release(leased)
+            return leased, idle
+
+        leased, idle = run(scenario())
+        assert leased.closed
+        assert not idle.closed
+        assert len(pool) == 1
+
+    def test_idle_clients_are_closed(self):
+        pool = ClientPool(FakeClient, idle_timeout_seconds=60)
+
+        async def scenario():
+            async with pool.lease("http://a", None, None) as client:
+                pass
+            pool._entries[ClientPool.make_key("http://a", None, None)].last_used -= 120
+            await pool.acquire("http://b", None, None)
+            return client
+
+        assert run(scenario()).closed
+        assert len(pool) == 1
+
+    def test_close_all(self):
+        pool = ClientPool(FakeClient)
+
+        async def scenario():
+            return [await pool.acquire(f"http://{name}", None, None) for name in "ab"]
+
+        clients = run(scenario())
+        run(pool.close_all())
+        assert all(client.closed for client in clients)
+        assert len(pool) == 0
+
+    def test_rejects_empty_pool(self):
+        with pytest.raises(ValueError):
+            ClientPool(FakeClient, max_clients=0)
@@ -0,0 +1,44 @@
+"""
+Unit tests for context window planning (app.search.context).
+"""
+
+from app.search.context import ContextPlan, merge_ranges, page_window
+
+
+def page(filename, number):
+    return {"pagecontent": f"{filename}-{number}", "metadata": {"filename": filename, "page_number": number}}
+
+
+class TestMergeRanges:
+    """Test page range merging."""
+
+    def test_merges_overlapping_and_adjacent_ranges(self):
+        assert merge_ranges([(4, 8), (1, 3), (10, 12), (7, 9)]) == [(1, 12)]
+
+    def test_keeps_disjoint_ranges(self):
+        assert merge_ranges([(20, 22), (1, 3)]) == [(1, 3), (20, 22)]
+
+    def test_page_window_is_clamped(self):
+        assert page_window(2, 5) == (0, 7)
+        assert page_window(998, 5) == (993, 1000)
+
+
+class TestContextPlan:
+    """Test collecting windows and slicing fetched pages back to hits."""
+
+    def test_files_merges_windows_per_file(self):
+        plan = ContextPlan(window_size=1)
+        plan.add("a.md", 3)
+        plan.add("a.md", 4)
+        plan.add("a.md", 10)
+        plan.add("b.md", 1)
+
+        assert dict(plan.files()) == {"a.md": [(2, 5), (9, 11)], "b.md": [(0, 2)]}
+
+    def test_pages_for_slices_window_in_page_order(self):
+        plan = ContextPlan(window_size=1)
+        plan.add("a.md", 3)
+        plan.store("a.md", [page("a.md", n) for n in (5, 2, 4, 3)])
+
+        assert [p["metadata"]["page_number"] for p in plan.pages_for("a.md", 3)] == [2, 3, 4]
+        assert plan.pages_for("missing.md", 3) == []
@@ -0,0 +1,60 @@
+"""
+Unit tests for MMR diversity reranking (app.search.diversity).
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.search.diversity import mmr_rerank, mmr_select
+
+# Two near-duplicates along x and one distinct candidate along y
+VECTORS = np.array([[1.0, 0.0], [0.99, 0.14], [0.0, 1.0]], dtype=np.float32)
+VECTORS /= np.linalg.norm(VECTORS, axis=1, keepdims=True)
+
+
+def point(point_id, vector, score=0.0):
+    return SimpleNamespace(id=point_id, vector=vector, score=score)
+
+
+class TestMmrSelect:
+    """Test the selection order."""
+
+    def test_lambda_one_keeps_relevance_order(self):
+        assert mmr_select(np.array([0.9, 0.8, 0.7]), VECTORS, 3, 1.0) == [0, 1, 2]
+
+    def test_skips_near_duplicates(self):
+        assert mmr_select(np.array([0.9, 0.8, 0.7]), VECTORS, 2, 0.5) == [0, 2]
+
+    def test_k_larger_than_candidates(self):
+        assert sorted(mmr_select(np.array([0.9, 0.8, 0.7]), VECTORS, 10, 0.5)) == [0, 1, 2]
+
+
+class TestMmrRerank:
+    """Test reranking of scored points."""
+
+    def test_reranks_by_query_similarity_and_drops_vectors(self):
+        points = [point(index, vector.tolist()) for index, vector in enumerate(VECTORS)]
+
+        selected = mmr_rerank(points, np.array([1.0, 0.5]), limit=2, lambda_mult=0.5)
+
+        assert [p.id for p in selected] == [1, 2]
+        assert all(p.vector is None for p in selected)
+
+    def test_named_vectors_and_fusion_scores(self):
+        """Hybrid hits carry a dict of vectors; their scores are the relevance."""
+        points = [
+            point(index, {"": vector.tolist(), "bm25": object()}, score)
+            for index, (vector, score) in enumerate(zip(VECTORS, [0.5, 0.4, 0.3]))
+        ]
+
+        selected = mmr_rerank(points, np.array([0.0, 1.0]), limit=2, lambda_mult=0.6, use_scores=True)
+
+        assert [p.id for p in selected] == [0, 2]
+
+    @pytest.mark.parametrize("vectors", [[None, [0.0, 1.0]], [[1.0, 0.0]]])
+    def test_keeps_order_without_vectors(self, vectors):
+        points = [point(index, vector) for index, vector in enumerate(vectors)]
+
+        assert mmr_rerank(points, np.array([0.0, 1.0]), limit=1, lambda_mult=0.5) == points[:1]
@@ -0,0 +1,208 @@
+"""
+Unit tests for the embedding micro-batching scheduler (app.embeddings.batching).
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.embeddings import AsyncBatchingEmbeddingClient, AsyncCachedEmbeddingClient, EmbeddingProviderFactory
+from app.embeddings.base import EmbeddingProviderError
+
+
+class FakeAsyncProvider:
+    model = "fake-model"
+
+    def __init__(self, latency: float = 0.0, fail: bool = False, drop_one: bool = False):
+        self.calls = []
+        self.latency = latency
+        self.fail = fail
+        self.drop_one = drop_one
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise EmbeddingProviderError("provider down")
+        vectors = [[float(len(text))] for text in texts]
+        return vectors[:-1] if self.drop_one else vectors
+
+    async def embed_one(self, text):
+        self.calls.append(("one", text))
+        return [float(len(text))]
+
+
+def gather_embeds(client, batches):
+    async def run():
+        return await asyncio.gather(*(client.embed(texts) for texts in batches), return_exceptions=True)
+    return asyncio.run(run())
+
+
+class TestAsyncBatchingEmbeddingClient:
+    """Test merging of concurrent embed() calls."""
+
+    def test_concurrent_calls_share_one_provider_call(self):
+        provider = FakeAsyncProvider()
+        client = AsyncBatchingEmbeddingClient(provider, max_batch_size=32, max_wait_ms=5)
+
+        results = gather_embeds(client, [["a"], ["bb", "ccc"], ["dddd"]])
+
+        assert [vectors.tolist() for vectors in results] == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+        assert provider.calls == [["a", "bb", "ccc", "dddd"]]
+        assert client.stats() == {
+            "queued_texts": 0, "batches": 1, "texts": 4, "mean_batch_size": 4.0, "rejected": 0
+        }
+
+    def test_full_batch_flushes_without_waiting(self):
+        provider = FakeAsyncProvider()
+        client = AsyncBatchingEmbeddingClient(provider, max_batch_size=3, max_wait_ms=10000)
+
+        start = time.perf_counter()
+        gather_embeds(client, [["a"], ["b"], ["c"]])
+
+        assert time.perf_counter() - start < 1
+        assert provider.calls == [["a", "b", "c"]]
+
+    def test_batches_are_capped_at_max_batch_size(self):
+        provider = FakeAsyncProvider()
+        client = AsyncBatchingEmbeddingClient(provider, max_batch_size=2, max_wait_ms=1)
+
+        results = gather_embeds(client, [["a"], ["b"], ["c"], ["d"], ["e"]])
+
+        assert [result[0][0] for result in results] == [1.0] * 5
+        assert [len(call) for call in provider.calls] == [2, 2, 1]
+
+    def test_duplicate_texts_embedded_once(self):
+        provider = FakeAsyncProvider()
+        client = AsyncBatchingEmbeddingClient(provider, max_wait_ms=1)
+
+        results = gather_embeds(client, [["same"], ["same", "other"]])
+
+        assert [vectors.tolist() for vectors in results] == [[[4.0]], [[4.0], [5.0]]]
+        assert provider.calls == [["same", "other"]]
+
+    def test_provider_error_reaches_every_caller(self):
+        client = AsyncBatchingEmbeddingClient(FakeAsyncProvider(fail=True), max_wait_ms=1)
+
+        results = gather_embeds(client, [["a"], ["b"]])
+
+        assert all(isinstance(result, EmbeddingProviderError) for result in results)
+
+    def test_cancelled_batch_fails_waiting_callers(self):
+        """Cancelling the merged call (e.g. at shutdown) must not leave callers waiting."""
+        client = AsyncBatchingEmbeddingClient(FakeAsyncProvider(latency=10), max_wait_ms=0)
+
+        async def run():
+            callers = [asyncio.ensure_future(client.embed([text])) for text in ("a", "b")]
+            await asyncio.sleep(0.01)
+            for task in list(client._running):
+                task.cancel()
+            return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), timeout=1)
+
+        results = asyncio.run(run())
+        assert all("cancelled" in str(result) for result in results)
+        assert all(isinstance(result, EmbeddingProviderError) for result in results)
+
+    def test_aclose_fails_queued_calls_and_closes_provider(self):
+        provider = FakeAsyncProvider(latency=10)
+        closed = []
+
+        async def aclose():
+            closed.append(True)
+
+        provider.aclose = aclose
+        client = AsyncBatchingEmbeddingClient(provider, max_batch_size=2, max_wait_ms=10000)
+
+        async def run():
+            running = asyncio.ensure_future(client.embed(["a", "b"]))  # Full batch, sent at once
+            queued = asyncio.ensure_future(client.embed(["c"]))
+            await asyncio.sleep(0.01)
+            await client.aclose()
+            return await asyncio.gather(running, queued, return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, EmbeddingProviderError) for result in results)
+        assert closed == [True]
+        assert client.stats()["queued_texts"] == 0
+
+    def test_vector_count_mismatch_is_an_error(self):
+        client = AsyncBatchingEmbeddingClient(FakeAsyncProvider(drop_one=True), max_wait_ms=1)
+
+        results = gather_embeds(client, [["a"], ["b"]])
+
+        assert all("returned 1 vectors for 2 texts" in str(result) for result in results)
+
+    def test_full_queue_rejects_calls(self):
+        client = AsyncBatchingEmbeddingClient(
+            FakeAsyncProvider(), max_batch_size=10, max_wait_ms=5, max_queue_size=2
+        )
+
+        results = gather_embeds(client, [["a", "b"], ["c"]])
+
+        assert results[0].tolist() == [[1.0], [1.0]]
+        assert isinstance(results[1], EmbeddingProviderError)
+        assert client.stats()["rejected"] == 1
+
+    def test_embed_one_passes_through(self):
+        provider = FakeAsyncProvider()
+        client = AsyncBatchingEmbeddingClient(provider)
+
+        assert asyncio.run(client.embed_one("abc")) == [3.0]
+        assert provider.calls == [("one", "abc")]
+        assert client.model == "fake-model"
+
+    def test_on_batch_reports_size_and_wait(self):
+        observed = []
+        client = AsyncBatchingEmbeddingClient(
+            FakeAsyncProvider(), max_wait_ms=2, on_batch=lambda size, wait: observed.append((size, wait))
+        )
+
+        gather_embeds(client, [["a"], ["b"]])
+
+        assert len(observed) == 1
+        size, wait = observed[0]
+        assert size == 2
+        assert 0 <= wait < 1
+
+    def test_rejects_invalid_settings(self):
+        with pytest.raises(ValueError, match="must be at least 1"):
+            AsyncBatchingEmbeddingClient(FakeAsyncProvider(), max_batch_size=0)
+        with pytest.raises(ValueError, match="cannot be negative"):
+            AsyncBatchingEmbeddingClient(FakeAsyncProvider(), max_wait_ms=-1)
+
+
+class TestBatchingFactory:
+    """Test EMBEDDING_BATCHING_* configuration."""
+
+    @pytest.fixture(autouse=True)
+    def ollama_env(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "ollama")
+        monkeypatch.setenv("OLLAMA_HOST", "http://localhost:11434")
+        monkeypatch.setenv("DEFAULT_EMBEDDING_MODEL", "test-model")
+
+    def test_batching_sits_below_the_cache(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCHING_ENABLED", "true")
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_TEXTS", "16")
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_WAIT_MS", "2.5")
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+
+        client = EmbeddingProviderFactory.async_from_env()
+
+        assert isinstance(client, AsyncCachedEmbeddingClient)
+        assert isinstance(client.client, AsyncBatchingEmbeddingClient)
+        assert client.client.max_batch_size == 16
+        assert client.client.max_wait_seconds == pytest.approx(0.0025)
+
+    def test_batching_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("EMBEDDING_BATCHING_ENABLED", raising=False)
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+
+        assert not isinstance(EmbeddingProviderFactory.async_from_env(), AsyncBatchingEmbeddingClient)
+
+    def test_invalid_setting_rejected(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCHING_ENABLED", "true")
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_WAIT_MS", "soon")
+
+        with pytest.raises(ValueError, match="EMBEDDING_BATCH_MAX_WAIT_MS must be a number"):
+            EmbeddingProviderFactory.async_from_env()
@@ -1,19 +1,62 @@
 """
 Unit tests for embedding provider abstraction.
 
-Tests the EmbeddingClient interface, factory, and both Ollama and Gemini implementations.
+Tests the EmbeddingClient interface, factory, and the Ollama, Gemini and local
+ONNX implementations. Local provider tests use the tiny model bundled in
+tests/fixtures/tiny-onnx-embedder and are skipped without onnxruntime/tokenizers.
 """
 
+import asyncio
+import httpx
+import json
+import numpy as np
 import pytest
 import os
-from unittest.mock import Mock, patch, MagicMock
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from app.embeddings import (
+    AsyncGeminiEmbeddingClient,
+    AsyncLocalOnnxEmbeddingClient,
+    AsyncOllamaEmbeddingClient,
     EmbeddingClient,
     EmbeddingProviderFactory,
     OllamaEmbeddingClient,
     GeminiEmbeddingClient,
+    LocalOnnxEmbeddingClient,
 )
-from app.embeddings.base import EmbeddingProviderError
+from app.embeddings.base import EmbeddingProviderError, as_embedding_matrix, close_embedding_client
+from app.embeddings.cache import (
+    AsyncCachedEmbeddingClient,
+    CachedEmbeddingClient,
+    EmbeddingCache,
+)
+
+
+def assert_vectors(actual, expected):
+    """Embeddings must be contiguous float32 arrays equal to expected."""
+    assert isinstance(actual, np.ndarray)
+    assert actual.dtype == np.float32 and actual.flags.c_contiguous
+    np.testing.assert_array_equal(actual, np.asarray(expected, dtype=np.float32))
+
+
+class TestEmbeddingMatrix:
+    """Test conversion of provider output to float32 matrices."""
+
+    def test_float32_matrix_is_not_copied(self):
+        matrix = np.arange(6, dtype=np.float32).reshape(2, 3)
+        assert as_embedding_matrix(matrix) is matrix
+
+    def test_lists_are_converted_and_normalized(self):
+        matrix = as_embedding_matrix([[3, 4], [1, 0]], normalize=True)
+        assert_vectors(matrix, [[0.6, 0.8], [1.0, 0.0]])
+
+    def test_ragged_vectors_are_rejected(self):
+        with pytest.raises(EmbeddingProviderError, match="inconsistent dimensions"):
+            as_embedding_matrix([[1.0, 2.0], [1.0]])
+        with pytest.raises(EmbeddingProviderError, match="2-D"):
+            as_embedding_matrix([1.0, 2.0])
 
 
 class TestEmbeddingProviderFactory:
@@ -27,6 +70,10 @@ class TestEmbeddingProviderFactory:
 
         client = EmbeddingProviderFactory.from_env()
         assert isinstance(client, OllamaEmbeddingClient)
+        assert client.normalize is False
+
+        monkeypatch.setenv("EMBEDDING_NORMALIZE", "true")
+        assert EmbeddingProviderFactory.from_env().normalize is True
 
     def test_factory_creates_gemini_when_configured(self, monkeypatch):
         """Factory should create Gemini client when EMBEDDING_PROVIDER=gemini."""
@@ -39,6 +86,43 @@ class TestEmbeddingProviderFactory:
         client = EmbeddingProviderFactory.from_env()
         assert isinstance(client, GeminiEmbeddingClient)
 
+    def test_async_factory_creates_async_clients(self, monkeypatch):
+        """async_from_env should return the async variant of the configured provider."""
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "ollama")
+        monkeypatch.setenv("OLLAMA_HOST", "http://localhost:11434")
+        monkeypatch.setenv("DEFAULT_EMBEDDING_MODEL", "test-model")
+        assert isinstance(EmbeddingProviderFactory.async_from_env(), AsyncOllamaEmbeddingClient)
+
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+        monkeypatch.setenv("GEMINI_API_KEY", "test-api-key")
+        assert isinstance(EmbeddingProviderFactory.async_from_env(), AsyncGeminiEmbeddingClient)
+
+    def test_factory_wraps_client_in_cache_when_enabled(self, monkeypatch):
+        """EMBEDDING_CACHE_ENABLED=true should wrap the provider in a cache."""
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "ollama")
+        monkeypatch.setenv("OLLAMA_HOST", "http://localhost:11434")
+        monkeypatch.setenv("DEFAULT_EMBEDDING_MODEL", "test-model")
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+        monkeypatch.setenv("EMBEDDING_CACHE_MAX_ENTRIES", "50")
+
+        client = EmbeddingProviderFactory.from_env()
+        assert isinstance(client, CachedEmbeddingClient)
+        assert isinstance(client.client, OllamaEmbeddingClient)
+        assert client.cache.max_entries == 50
+        assert client.model == "test-model"
+        assert isinstance(EmbeddingProviderFactory.async_from_env(), AsyncCachedEmbeddingClient)
+
+    def test_factory_raises_on_invalid_cache_setting(self, monkeypatch):
+        """Non-integer cache settings should raise ValueError."""
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "ollama")
+        monkeypatch.setenv("OLLAMA_HOST", "http://localhost:11434")
+        monkeypatch.setenv("DEFAULT_EMBEDDING_MODEL", "test-model")
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+        monkeypatch.setenv("EMBEDDING_CACHE_TTL_SECONDS", "soon")
+
+        with pytest.raises(ValueError, match="EMBEDDING_CACHE_TTL_SECONDS must be an integer"):
+            EmbeddingProviderFactory.from_env()
+
     def test_factory_raises_on_unknown_provider(self, monkeypatch):
         """Factory should raise ValueError for unknown provider."""
         monkeypatch.setenv("EMBEDDING_PROVIDER", "unknown_provider")
@@ -69,32 +153,71 @@ class TestOllamaEmbeddingClient:
 
     @patch("app.embeddings.ollama_client.OllamaClient")
     def test_embed_one_success(self, mock_ollama_class):
-        """embed_one should return embedding vector from Ollama."""
+        """embed_one should use /api/embed, like embed(), so cached vectors agree."""
         mock_client = Mock()
-        mock_client.embeddings.return_value = {"embedding": [0.1, 0.2, 0.3]}
+        mock_client.embed.return_value = {"embeddings": [[0.1, 0.2, 0.3]]}
         mock_ollama_class.return_value = mock_client
 
         client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
         result = client.embed_one("test query")
 
-        assert result == [0.1, 0.2, 0.3]
-        mock_client.embeddings.assert_called_once_with(model="test-model", prompt="test query")
+        assert_vectors(result, [0.1, 0.2, 0.3])
+        mock_client.embed.assert_called_once_with(model="test-model", input=["test query"])
+        mock_client.embeddings.assert_not_called()
 
     @patch("app.embeddings.ollama_client.OllamaClient")
     def test_embed_multiple_success(self, mock_ollama_class):
-        """embed should return list of embedding vectors."""
+        """embed should return all vectors from a single multi-input call."""
         mock_client = Mock()
-        mock_client.embeddings.side_effect = [
-            {"embedding": [0.1, 0.2]},
-            {"embedding": [0.3, 0.4]},
-        ]
+        mock_client.embed.return_value = {"embeddings": [[0.1, 0.2], [0.3, 0.4]]}
         mock_ollama_class.return_value = mock_client
 
         client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
         result = client.embed(["query1", "query2"])
 
-        assert result == [[0.1, 0.2], [0.3, 0.4]]
-        assert mock_client.embeddings.call_count == 2
+        assert_vectors(result, [[0.1, 0.2], [0.3, 0.4]])
+        mock_client.embed.assert_called_once_with(model="test-model", input=["query1", "query2"])
+
+    @patch("app.embeddings.ollama_client.OllamaClient")
+    def test_embed_chunks_to_max_batch_size(self, mock_ollama_class):
+        """embed should split inputs larger than max_batch_size into chunks."""
+        mock_client = Mock()
+        mock_client.embed.side_effect = lambda model, input: {"embeddings": [[float(len(t))] for t in input]}
+        mock_ollama_class.return_value = mock_client
+
+        client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model", max_batch_size=2)
+        result = client.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        assert_vectors(result, [[1.0], [2.0], [3.0], [4.0], [5.0]])
+        assert [c.kwargs["input"] for c in mock_client.embed.call_args_list] == [
+            ["a", "bb"], ["ccc", "dddd"], ["eeeee"]
+        ]
+
+    @patch("app.embeddings.ollama_client.OllamaClient")
+    def test_normalize_scales_rows_to_unit_length(self, mock_ollama_class):
+        """normalize=True should L2-normalize every vector, leaving zero vectors alone."""
+        mock_client = Mock()
+        mock_client.embed.side_effect = [
+            {"embeddings": [[3.0, 4.0], [0.0, 0.0]]}, {"embeddings": [[0.0, 2.0]]}
+        ]
+        mock_ollama_class.return_value = mock_client
+
+        client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model", normalize=True)
+
+        assert_vectors(client.embed(["a", "b"]), [[0.6, 0.8], [0.0, 0.0]])
+        assert_vectors(client.embed_one("c"), [0.0, 1.0])
+
+    @patch("app.embeddings.ollama_client.OllamaClient")
+    def test_embed_raises_on_mismatched_response_count(self, mock_ollama_class):
+        """embed should raise EmbeddingProviderError if Ollama returns the wrong count."""
+        mock_client = Mock()
+        mock_client.embed.return_value = {"embeddings": [[0.1]]}
+        mock_ollama_class.return_value = mock_client
+
+        client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
+
+        with pytest.raises(EmbeddingProviderError, match="returned 1 embeddings for 2 texts"):
+            client.embed(["query1", "query2"])
 
     @patch("app.embeddings.ollama_client.OllamaClient")
     def test_embed_one_raises_on_empty_text(self, mock_ollama_class):
@@ -116,7 +239,7 @@ class TestOllamaEmbeddingClient:
     def test_embed_one_raises_on_ollama_error(self, mock_ollama_class):
         """embed_one should raise EmbeddingProviderError on Ollama failure."""
         mock_client = Mock()
-        mock_client.embeddings.side_effect = Exception("Ollama connection failed")
+        mock_client.embed.side_effect = Exception("Ollama connection failed")
         mock_ollama_class.return_value = mock_client
 
         client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
@@ -124,6 +247,17 @@ class TestOllamaEmbeddingClient:
         with pytest.raises(EmbeddingProviderError, match="Ollama embedding failed"):
             client.embed_one("test")
 
+    def test_close_releases_http_connections(self):
+        """close()/aclose() close the httpx clients of the ollama clients."""
+        client = OllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
+        async_client = AsyncOllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
+
+        asyncio.run(close_embedding_client(client))
+        asyncio.run(close_embedding_client(async_client))
+
+        assert client.client._client.is_closed
+        assert async_client.client._client.is_closed
+
 
 class TestGeminiEmbeddingClient:
     """Test the Gemini embedding client."""
@@ -141,7 +275,7 @@ class TestGeminiEmbeddingClient:
         )
         assert "not a recommended value" in caplog.text
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_one_success(self, mock_post):
         """embed_one should return embedding vector from Gemini."""
         mock_response = Mock()
@@ -154,7 +288,7 @@ class TestGeminiEmbeddingClient:
         client = GeminiEmbeddingClient(api_key="test-key", output_dimensionality=768)
         result = client.embed_one("test query")
 
-        assert result == [0.1, 0.2, 0.3]
+        assert_vectors(result, [0.1, 0.2, 0.3])
         
         # Verify API call
         call_args = mock_post.call_args
@@ -164,7 +298,7 @@ class TestGeminiEmbeddingClient:
         assert call_args[1]["json"]["task_type"] == "RETRIEVAL_QUERY"
         assert call_args[1]["json"]["output_dimensionality"] == 768
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_multiple_success(self, mock_post):
         """embed should return list of embedding vectors from Gemini batch API."""
         mock_response = Mock()
@@ -180,14 +314,37 @@ class TestGeminiEmbeddingClient:
         client = GeminiEmbeddingClient(api_key="test-key", output_dimensionality=768)
         result = client.embed(["query1", "query2"])
 
-        assert result == [[0.1, 0.2], [0.3, 0.4]]
+        assert_vectors(result, [[0.1, 0.2], [0.3, 0.4]])
         
         # Verify batch API call
         call_args = mock_post.call_args
         assert "batchEmbedContents" in call_args[0][0]
         assert len(call_args[1]["json"]["requests"]) == 2
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
+    def test_embed_chunks_to_batch_limit(self, mock_post):
+        """embed should split inputs into batchEmbedContents calls of at most max_batch_size."""
+        def respond(url, json, headers, timeout):
+            response = Mock()
+            response.status_code = 200
+            response.json.return_value = {
+                "embeddings": [{"values": [0.1]} for _ in json["requests"]]
+            }
+            return response
+        mock_post.side_effect = respond
+
+        client = GeminiEmbeddingClient(api_key="test-key", max_batch_size=2)
+        result = client.embed(["q1", "q2", "q3"])
+
+        assert len(result) == 3
+        assert [len(c.kwargs["json"]["requests"]) for c in mock_post.call_args_list] == [2, 1]
+
+    def test_init_rejects_batch_size_above_api_limit(self):
+        """max_batch_size above the Gemini limit should be rejected."""
+        with pytest.raises(ValueError, match="max_batch_size must be between"):
+            GeminiEmbeddingClient(api_key="test-key", max_batch_size=101)
+
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_one_raises_on_api_error(self, mock_post):
         """embed_one should raise EmbeddingProviderError on non-200 response."""
         mock_response = Mock()
@@ -200,7 +357,7 @@ class TestGeminiEmbeddingClient:
         with pytest.raises(EmbeddingProviderError, match="Gemini API returned 403"):
             client.embed_one("test")
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_one_raises_on_timeout(self, mock_post):
         """embed_one should raise EmbeddingProviderError on timeout."""
         import requests
@@ -211,7 +368,7 @@ class TestGeminiEmbeddingClient:
         with pytest.raises(EmbeddingProviderError, match="timed out"):
             client.embed_one("test")
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_raises_on_empty_list(self, mock_post):
         """embed should raise ValueError for empty list."""
         client = GeminiEmbeddingClient(api_key="test-key")
@@ -219,7 +376,7 @@ class TestGeminiEmbeddingClient:
         with pytest.raises(ValueError, match="texts list cannot be empty"):
             client.embed([])
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_one_raises_on_empty_text(self, mock_post):
         """embed_one should raise ValueError for empty text."""
         client = GeminiEmbeddingClient(api_key="test-key")
@@ -227,7 +384,7 @@ class TestGeminiEmbeddingClient:
         with pytest.raises(ValueError, match="text cannot be empty"):
             client.embed_one("")
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_embed_raises_on_mismatched_response_count(self, mock_post):
         """embed should raise EmbeddingProviderError if response count doesn't match input."""
         mock_response = Mock()
@@ -242,7 +399,7 @@ class TestGeminiEmbeddingClient:
         with pytest.raises(EmbeddingProviderError, match="returned 1 embeddings for 2 texts"):
             client.embed(["query1", "query2"])  # 2 queries
 
-    @patch("app.embeddings.gemini_client.requests.post")
+    @patch("app.embeddings.gemini_client.requests.Session.post")
     def test_error_sanitization(self, mock_post):
         """_sanitize_error should extract error message from Gemini response."""
         mock_response = Mock()
@@ -257,3 +414,379 @@ class TestGeminiEmbeddingClient:
 
         with pytest.raises(EmbeddingProviderError, match="Invalid request format"):
             client.embed_one("test")
+
+
+class _GeminiStandIn(BaseHTTPRequestHandler):
+    """Local Gemini API stand-in recording the client connection of each request."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.client_address, self.path, body))
+        if self.path.endswith(":batchEmbedContents"):
+            data = {"embeddings": [{"values": [float(i)]} for i, _ in enumerate(body["requests"])]}
+        else:
+            data = {"embedding": {"values": [0.5]}}
+        encoded = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gemini_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GeminiStandIn)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestGeminiConnectionReuse:
+    """Test pooled keep-alive connections against a local HTTP stand-in."""
+
+    def _base_url(self, server):
+        return f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+
+    def test_sync_client_reuses_one_connection(self, gemini_server):
+        client = GeminiEmbeddingClient(api_key="test-key", base_url=self._base_url(gemini_server))
+
+        assert client.embed_one("first") == [0.5]
+        assert client.embed_one("second") == [0.5]
+        assert_vectors(client.embed(["a", "b"]), [[0.0], [1.0]])
+        client.close()
+
+        assert len(gemini_server.requests) == 3
+        assert len({address for address, _, _ in gemini_server.requests}) == 1
+        _, path, body = gemini_server.requests[2]
+        assert path == "/v1beta/models/gemini-embedding-001:batchEmbedContents"
+        assert body["requests"][1] == {
+            "content": {"parts": [{"text": "b"}]},
+            "model": "models/gemini-embedding-001",
+            "task_type": "RETRIEVAL_QUERY",
+            "output_dimensionality": 768,
+        }
+
+    @pytest.mark.parametrize("http2", [False, True])
+    def test_async_client_reuses_one_connection(self, gemini_server, http2):
+        client = AsyncGeminiEmbeddingClient(
+            api_key="test-key", base_url=self._base_url(gemini_server), http2=http2, output_dimensionality=None
+        )
+
+        async def run():
+            first = await client.embed_one("first")
+            second = await client.embed(["a"])
+            await client.aclose()
+            return first, second
+
+        assert asyncio.run(run()) == ([0.5], [[0.0]])
+        assert len({address for address, _, _ in gemini_server.requests}) == 1
+        assert gemini_server.requests[0][2] == {"content": {"parts": [{"text": "first"}]}, "task_type": "RETRIEVAL_QUERY"}
+
+    def test_close_reaches_http_client_through_wrappers(self, gemini_server, monkeypatch):
+        """Closing the factory-built stack (cache, batching) closes the pooled HTTP client."""
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", self._base_url(gemini_server))
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+        monkeypatch.setenv("EMBEDDING_BATCHING_ENABLED", "true")
+        client = EmbeddingProviderFactory.async_from_env()
+
+        async def run():
+            await client.embed_one("first")
+            provider = client.client.client
+            assert provider._http is not None
+            await close_embedding_client(client)
+            return provider
+
+        assert asyncio.run(run())._http is None
+
+    def test_rejects_empty_pool(self):
+        with pytest.raises(ValueError, match="pool_size must be at least 1"):
+            GeminiEmbeddingClient(api_key="test-key", pool_size=0)
+
+    def test_factory_reads_http_settings(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_BASE_URL", "http://127.0.0.1:9/v1beta/")
+        monkeypatch.setenv("GEMINI_HTTP_POOL_SIZE", "4")
+        monkeypatch.setenv("GEMINI_HTTP_KEEPALIVE_SECONDS", "15")
+        monkeypatch.setenv("GEMINI_HTTP2", "true")
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+
+        client = EmbeddingProviderFactory.async_from_env()
+
+        assert client._embed_url() == "http://127.0.0.1:9/v1beta/models/gemini-embedding-001:embedContent"
+        assert (client.pool_size, client.keepalive_seconds, client.http2) == (4, 15.0, True)
+
+    def test_factory_rejects_invalid_pool_size(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+        monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+        monkeypatch.setenv("GEMINI_HTTP_POOL_SIZE", "many")
+
+        with pytest.raises(ValueError, match="GEMINI_HTTP_POOL_SIZE must be an integer"):
+            EmbeddingProviderFactory.from_env()
+
+
+TINY_MODEL_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "tiny-onnx-embedder")
+
+
+@pytest.fixture
+def tiny_model():
+    """Directory of the bundled tiny ONNX embedding model."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    return TINY_MODEL_DIR
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class TestLocalOnnxEmbeddingClient:
+    """Test the in-process ONNX embedding client with the bundled tiny model."""
+
+    def test_embed_returns_normalized_vectors_in_order(self, tiny_model):
+        client = LocalOnnxEmbeddingClient(tiny_model)
+        vectors = client.embed(["how to install the server", "install server", "reset password"])
+
+        assert len(vectors) == 3
+        assert all(len(vector) == 16 for vector in vectors)
+        assert all(abs(cosine(vector, vector) - 1.0) < 1e-5 for vector in vectors)
+        # Overlapping words are closer than unrelated ones
+        assert cosine(vectors[0], vectors[1]) > cosine(vectors[0], vectors[2])
+
+    def test_padding_and_chunking_do_not_change_vectors(self, tiny_model):
+        texts = ["install", "how to install the server with a database backup", "reset password", "query"]
+        single = [LocalOnnxEmbeddingClient(tiny_model).embed_one(text) for text in texts]
+        chunked = LocalOnnxEmbeddingClient(tiny_model, max_batch_size=3).embed(texts)
+
+        for expected, actual in zip(single, chunked):
+            assert actual == pytest.approx(expected, abs=1e-5)
+
+    def test_cls_pooling_and_query_prefix(self, tiny_model):
+        mean = LocalOnnxEmbeddingClient(tiny_model).embed_one("install server")
+        cls = LocalOnnxEmbeddingClient(tiny_model, pooling="cls").embed_one("install server")
+        prefixed = LocalOnnxEmbeddingClient(tiny_model, query_prefix="install ").embed_one("server")
+
+        assert cls != pytest.approx(mean)
+        assert cls == pytest.approx(LocalOnnxEmbeddingClient(tiny_model).embed_one("install"), abs=1e-5)
+        assert prefixed == pytest.approx(mean, abs=1e-5)
+
+    def test_int8_quantization(self, tiny_model, tmp_path):
+        model_dir = tmp_path / "tiny"
+        shutil.copytree(tiny_model, model_dir)
+        reference = LocalOnnxEmbeddingClient(str(model_dir)).embed_one("install the database")
+
+        client = LocalOnnxEmbeddingClient(str(model_dir), quantize=True)
+
+        assert (model_dir / "model.int8.onnx").exists()
+        assert client.model == "tiny:int8"
+        assert cosine(client.embed_one("install the database"), reference) > 0.99
+
+    def test_rejects_invalid_input_and_settings(self, tiny_model, tmp_path):
+        client = LocalOnnxEmbeddingClient(tiny_model)
+        with pytest.raises(ValueError):
+            client.embed([])
+        with pytest.raises(ValueError):
+            client.embed_one("   ")
+        with pytest.raises(ValueError, match="pooling"):
+            LocalOnnxEmbeddingClient(tiny_model, pooling="max")
+        with pytest.raises(ValueError, match="not found"):
+            LocalOnnxEmbeddingClient(str(tmp_path))
+
+    def test_async_client_runs_off_the_event_loop(self, tiny_model):
+        client = AsyncLocalOnnxEmbeddingClient(tiny_model, threads=1)
+
+        async def run():
+            return await asyncio.gather(client.embed(["install", "reset"]), client.embed_one("install"))
+
+        (batch, single) = asyncio.run(run())
+        asyncio.run(close_embedding_client(client))
+        assert batch[0] == pytest.approx(single)
+        assert client._executor._shutdown
+
+    def test_factory_creates_local_clients(self, tiny_model, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+        monkeypatch.setenv("LOCAL_EMBEDDING_MODEL_DIR", tiny_model)
+        monkeypatch.setenv("LOCAL_EMBEDDING_THREADS", "2")
+        monkeypatch.setenv("EMBEDDING_MAX_BATCH_SIZE", "8")
+
+        client = EmbeddingProviderFactory.from_env()
+        assert isinstance(client, LocalOnnxEmbeddingClient)
+        assert (client.threads, client.max_batch_size, client.model) == (2, 8, "tiny-onnx-embedder")
+        assert isinstance(EmbeddingProviderFactory.async_from_env(), AsyncLocalOnnxEmbeddingClient)
+
+    def test_factory_requires_model_dir(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+        monkeypatch.delenv("LOCAL_EMBEDDING_MODEL_DIR", raising=False)
+
+        with pytest.raises(ValueError, match="LOCAL_EMBEDDING_MODEL_DIR is required"):
+            EmbeddingProviderFactory.from_env()
+
+
+class TestAsyncEmbeddingClients:
+    """Test the async Ollama and Gemini embedding clients."""
+
+    @patch("app.embeddings.ollama_client.AsyncOllamaClient")
+    def test_async_ollama_embed_one_success(self, mock_ollama_class):
+        """Async embed_one should await Ollama and return the vector."""
+        mock_client = Mock()
+        mock_client.embed = AsyncMock(return_value={"embeddings": [[0.1, 0.2, 0.3]]})
+        mock_ollama_class.return_value = mock_client
+
+        client = AsyncOllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
+        result = asyncio.run(client.embed_one("test query"))
+
+        assert_vectors(result, [0.1, 0.2, 0.3])
+        mock_client.embed.assert_awaited_once_with(model="test-model", input=["test query"])
+
+    @patch("app.embeddings.ollama_client.AsyncOllamaClient")
+    def test_async_ollama_raises_on_error(self, mock_ollama_class):
+        """Async embed_one should wrap Ollama failures in EmbeddingProviderError."""
+        mock_client = Mock()
+        mock_client.embed = AsyncMock(side_effect=Exception("connection refused"))
+        mock_ollama_class.return_value = mock_client
+
+        client = AsyncOllamaEmbeddingClient(host="http://localhost:11434", model="test-model")
+
+        with pytest.raises(EmbeddingProviderError, match="Ollama embedding failed"):
+            asyncio.run(client.embed_one("test"))
+
+    def test_async_gemini_embed_success(self):
+        """Async embed should send one batch request and parse the vectors."""
+        seen = {}
+
+        def handler(request):
+            seen["url"] = str(request.url)
+            seen["key"] = request.headers["x-goog-api-key"]
+            return httpx.Response(200, json={"embeddings": [{"values": [0.1]}, {"values": [0.2]}]})
+
+        client = AsyncGeminiEmbeddingClient(api_key="test-key")
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        result = asyncio.run(client.embed(["query1", "query2"]))
+
+        assert_vectors(result, [[0.1], [0.2]])
+        assert "batchEmbedContents" in seen["url"]
+        assert seen["key"] == "test-key"
+
+    def test_async_gemini_raises_on_api_error(self):
+        """Async embed_one should raise EmbeddingProviderError on non-200 response."""
+        def handler(request):
+            return httpx.Response(403, json={"error": {"message": "Invalid API key"}})
+
+        client = AsyncGeminiEmbeddingClient(api_key="test-key")
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(EmbeddingProviderError, match="Invalid API key"):
+            asyncio.run(client.embed_one("test"))
+
+
+class TestEmbeddingCache:
+    """Test the query embedding cache and its client wrappers."""
+
+    def _inner(self):
+        inner = Mock()
+        inner.model = "test-model"
+        inner.embed_one.side_effect = lambda text: [float(len(text))]
+        inner.embed.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        return inner
+
+    def test_repeated_query_hits_cache(self):
+        """Second lookup of the same (whitespace-normalized) text should skip the provider."""
+        inner = self._inner()
+        client = CachedEmbeddingClient(inner, provider="ollama")
+
+        assert client.embed_one("ecos  release notes") == client.embed_one(" ecos release notes ")
+        assert inner.embed_one.call_count == 1
+        assert client.cache.stats()["hits"] == 1
+        assert client.cache.stats()["misses"] == 1
+
+    def test_embed_only_sends_missing_texts(self):
+        """embed should call the provider once with only the uncached texts, preserving order."""
+        inner = self._inner()
+        client = CachedEmbeddingClient(inner, provider="ollama")
+        client.embed_one("bb")
+
+        result = client.embed(["a", "bb", "ccc"])
+
+        assert_vectors(result, [[1.0], [2.0], [3.0]])
+        inner.embed.assert_called_once_with(["a", "ccc"])
+
+    def test_key_includes_model(self):
+        """Different models must not share cache entries."""
+        cache = EmbeddingCache()
+        first, second = self._inner(), self._inner()
+        second.model = "other-model"
+
+        CachedEmbeddingClient(first, provider="ollama", cache=cache).embed_one("q")
+        CachedEmbeddingClient(second, provider="ollama", cache=cache).embed_one("q")
+
+        assert second.embed_one.call_count == 1
+        assert len(cache) == 2
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """Least-recently-used entries should be evicted when limits are exceeded."""
+        cache = EmbeddingCache(max_entries=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+        assert cache.get("b") is None
+        assert cache.get("a") == [1.0]
+
+        cache = EmbeddingCache(max_entries=100, max_bytes=64 * 2)
+        cache.put("a", [0.0] * 2)
+        cache.put("b", [0.0] * 2)
+        cache.put("c", [0.0] * 2)
+        assert cache.get("a") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_caches_compact_read_only_rows(self):
+        """Cached vectors should be float32 copies, accounted at 4 bytes per dimension."""
+        inner = Mock()
+        inner.model = "test-model"
+        provider_matrix = np.ones((2, 8), dtype=np.float32)
+        inner.embed.return_value = provider_matrix
+        client = CachedEmbeddingClient(inner, provider="local")
+
+        client.embed(["a", "b"])
+        cached = client.cache.get(client._key("a"))
+
+        assert cached.dtype == np.float32 and not cached.flags.writeable
+        assert not np.shares_memory(cached, provider_matrix)
+        assert client.cache.stats()["bytes"] == 2 * 8 * 4
+        assert_vectors(client.embed(["b", "a"]), np.ones((2, 8)))
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Entries older than the TTL should be treated as misses."""
+        now = [1000.0]
+        monkeypatch.setattr("app.embeddings.cache.time.monotonic", lambda: now[0])
+        cache = EmbeddingCache(ttl_seconds=10)
+        cache.put("a", [1.0])
+
+        now[0] += 11
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_async_wrapper_hits_cache(self):
+        """Async wrapper should await the provider only on a miss."""
+        inner = Mock()
+        inner.embed_one = AsyncMock(return_value=[0.5])
+        client = AsyncCachedEmbeddingClient(inner, provider="gemini")
+
+        async def run():
+            await client.embed_one("q")
+            return await client.embed_one("q")
+
+        assert asyncio.run(run()) == [0.5]
+        inner.embed_one.assert_awaited_once_with("q")
@@ -0,0 +1,196 @@
+"""
+Unit tests for the filename index (app.search.filename_index).
+"""
+
+import asyncio
+
+from qdrant_client import AsyncQdrantClient, models
+
+import pytest
+
+from app.search.filename_index import (
+    FilenameIndex, FilenameIndexManager, FilenameListing, create_filename_index, facet_filenames,
+    load_filename_counts_faceted, load_filenames, load_filenames_faceted, page_filenames
+)
+
+FILENAMES = [
+    "ecos_9.3_release_notes.md",
+    "ecos_9.2_release_notes.md",
+    "orchestrator_9.3_user_guide.md",
+    "sd-wan_deployment_guide.md",
+]
+
+
+class TestFilenameIndex:
+    """Test substring, fuzzy and incremental behaviour."""
+
+    def test_substring_matches_rank_first(self):
+        index = FilenameIndex(FILENAMES)
+
+        results = index.search("ecos 9.3")
+
+        # Filenames matching only one of the terms score below the threshold
+        assert [name for name, _ in results] == ["ecos_9.3_release_notes.md"]
+        assert index.search("ecos 9.3", min_score=0.4)[1][0] in (
+            "ecos_9.2_release_notes.md", "orchestrator_9.3_user_guide.md"
+        )
+
+    def test_all_matches_returned_with_scores(self):
+        index = FilenameIndex(FILENAMES)
+
+        results = index.search("9.3", limit=10)
+
+        assert {name for name, _ in results} == {
+            "ecos_9.3_release_notes.md", "orchestrator_9.3_user_guide.md"
+        }
+        assert all(0 < score <= 1 for _, score in results)
+
+    def test_fuzzy_match_tolerates_typos(self):
+        index = FilenameIndex(FILENAMES)
+
+        assert index.search("deploymnet guide")[0][0] == "sd-wan_deployment_guide.md"
+
+    def test_update_applies_diff(self):
+        index = FilenameIndex(FILENAMES)
+
+        added, removed = index.update(FILENAMES[1:] + ["new_guide.md"])
+
+        assert (added, removed) == (1, 1)
+        assert FILENAMES[0] not in index
+        assert index.search("new guide")[0][0] == "new_guide.md"
+        assert index.search("ecos 9.3") == []
+
+
+class TestFilenameListing:
+    """Test facet-based listing and cursor pagination."""
+
+    @pytest.mark.filterwarnings("ignore:Payload indexes have no effect")
+    def test_facet_lists_distinct_filenames_with_counts(self, caplog):
+        client = AsyncQdrantClient(":memory:")
+
+        async def run():
+            await client.create_collection(
+                "docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+            )
+            await client.upsert("docs", points=[
+                models.PointStruct(id=i, vector=[1.0, 0.5],
+                                   payload={"metadata": {"filename": FILENAMES[i % 3], "page_number": i}})
+                for i in range(7)
+            ])
+            await create_filename_index(client, "docs")
+            return (await facet_filenames(client, "docs"),
+                    await load_filenames_faceted(client, "docs", max_values=2),
+                    await load_filename_counts_faceted(client, "docs", max_values=2))
+
+        values, truncated_load, truncated_counts = asyncio.run(run())
+        assert sorted(values) == sorted([(FILENAMES[0], 3), (FILENAMES[1], 2), (FILENAMES[2], 2)])
+        # Truncated facets fall back to a complete scroll
+        assert truncated_load == set(FILENAMES[:3])
+        assert sorted(truncated_counts) == sorted(values)
+        # The full scroll is not silent
+        assert sum("listing them with a full scroll" in message for message in caplog.messages) == 2
+
+    def test_cursor_pages_through_all_filenames(self):
+        values = [(name, 1) for name in FILENAMES]
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = page_filenames(values, limit=3, cursor=cursor)
+            seen.extend(name for name, _ in page)
+            if cursor is None:
+                break
+
+        assert seen == sorted(FILENAMES)
+
+    def test_cursor_is_stable_when_filenames_are_added(self):
+        values = [(name, 1) for name in FILENAMES]
+        first, cursor = page_filenames(values, limit=2)
+
+        values.append(("aaa_new.md", 1))
+        second, _ = page_filenames(values, limit=2, cursor=cursor)
+
+        assert first[-1][0] < second[0][0]
+        assert "aaa_new.md" not in [name for name, _ in second]
+
+    def test_query_filters_listing(self):
+        page, cursor = page_filenames([(name, 1) for name in FILENAMES], limit=10, query="RELEASE")
+
+        assert [name for name, _ in page] == sorted(FILENAMES[:2])
+        assert cursor is None
+
+    def test_listing_reports_total_and_updates(self):
+        listing = FilenameListing([(name, 1) for name in FILENAMES])
+
+        page, cursor, total = listing.page(limit=1, query="release")
+        assert (page, total) == ([(FILENAMES[1], 1)], 2)
+        assert listing.page(limit=1, cursor=cursor, query="release") == ([(FILENAMES[0], 1)], None, 2)
+
+        assert listing.update([(FILENAMES[0], 5), ("new.md", 1)]) == (1, 3)
+        assert listing.page(limit=10) == ([(FILENAMES[0], 5), ("new.md", 1)], None, 2)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            page_filenames([], limit=1, cursor="%%%")
+
+
+class TestFilenameIndexManager:
+    """Test loading from Qdrant and background refresh."""
+
+    def test_load_and_refresh(self):
+        client = AsyncQdrantClient(":memory:")
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return await load_filenames(client, "docs", batch_size=2)
+
+        async def run():
+            await client.create_collection(
+                "docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+            )
+            await client.upsert("docs", points=[
+                models.PointStruct(id=i, vector=[1.0, 0.5],
+                                   payload={"metadata": {"filename": FILENAMES[i % 2], "page_number": i}})
+                for i in range(5)
+            ])
+            manager = FilenameIndexManager(refresh_seconds=60)
+            index = await manager.get("dev", "docs", loader)
+            assert len(index) == 2
+            assert await manager.get("dev", "docs", loader) is index
+            assert len(loads) == 1
+
+            await client.upsert("docs", points=[models.PointStruct(
+                id=10, vector=[1.0, 0.5], payload={"metadata": {"filename": FILENAMES[3], "page_number": 1}}
+            )])
+            manager.refresh_seconds = -1
+            await manager.get("dev", "docs", loader)
+            await asyncio.sleep(0.05)
+            return index
+
+        index = asyncio.run(run())
+        assert len(loads) == 2
+        assert FILENAMES[3] in index
+
+    def test_cancelled_first_caller_does_not_fail_waiters(self):
+        """The shared load survives the caller that started it going away."""
+        release = None
+
+        async def loader():
+            await release.wait()
+            return FILENAMES
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            manager = FilenameIndexManager()
+            first = asyncio.create_task(manager.get("dev", "docs", loader))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(manager.get("dev", "docs", loader))
+            await asyncio.sleep(0)
+            first.cancel()
+            release.set()
+            index = await second
+            assert first.cancelled()
+            return index
+
+        assert len(asyncio.run(run())) == len(FILENAMES)
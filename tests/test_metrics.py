@@ -0,0 +1,202 @@
+"""
+Unit tests for Prometheus metrics (app.metrics) and the /metrics endpoint.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from qdrant_client import AsyncQdrantClient, models
+
+import app.main
+from app.embeddings import CachedEmbeddingClient, EmbeddingProviderFactory
+from app.main import AsyncSearchSystem
+from app.metrics import (
+    REGISTRY, AsyncInstrumentedEmbeddingClient, CollectionLabels, InstrumentedEmbeddingClient, RequestTimings,
+    count_request_event, instrument_embedding_client, request_timings, stage_timer
+)
+from app.search.registry import SearchSystemRegistry
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class FakeProvider:
+    model = "fake-model"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def embed(self, texts):
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+
+class FakeAsyncProvider(FakeProvider):
+    async def embed(self, texts):
+        return FakeProvider.embed(self, texts)
+
+    async def embed_one(self, text):
+        return FakeProvider.embed_one(self, text)
+
+
+class TestEmbeddingMetrics:
+    """Test provider call and error counters."""
+
+    def test_counts_calls_texts_and_errors(self):
+        client = instrument_embedding_client(FakeProvider(), "test-sync")
+        assert isinstance(client, InstrumentedEmbeddingClient)
+        assert client.model == "fake-model"
+
+        client.embed(["a", "b", "c"])
+        client.embed_one("d")
+        with pytest.raises(RuntimeError):
+            instrument_embedding_client(FakeProvider(fail=True), "test-sync").embed(["e"])
+
+        assert sample("embedding_provider_calls_total", provider="test-sync") == 3
+        assert sample("embedding_provider_texts_total", provider="test-sync") == 5
+        assert sample("embedding_provider_errors_total", provider="test-sync") == 1
+
+    def test_async_client(self):
+        client = instrument_embedding_client(FakeAsyncProvider(), "test-async")
+        assert isinstance(client, AsyncInstrumentedEmbeddingClient)
+
+        asyncio.run(client.embed(["a", "b"]))
+
+        assert sample("embedding_provider_calls_total", provider="test-async") == 1
+
+    def test_factory_instruments_below_cache(self, monkeypatch):
+        """Cache hits must not count as provider calls."""
+        monkeypatch.setenv("EMBEDDING_PROVIDER", "ollama")
+        monkeypatch.setenv("OLLAMA_HOST", "http://localhost:11434")
+        monkeypatch.setenv("DEFAULT_EMBEDDING_MODEL", "test-model")
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+
+        client = EmbeddingProviderFactory.from_env(
+            wrap=lambda provider_client, provider: instrument_embedding_client(FakeProvider(), "test-cached")
+        )
+        assert isinstance(client, CachedEmbeddingClient)
+
+        client.embed(["same query"])
+        client.embed(["same query"])
+
+        assert sample("embedding_provider_calls_total", provider="test-cached") == 1
+
+
+@pytest.fixture
+def http(monkeypatch):
+    """TestClient searching an in-memory collection 'metrics-docs' with a fake embedder."""
+    qclient = AsyncQdrantClient(":memory:")
+
+    async def setup():
+        await qclient.create_collection(
+            "metrics-docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+        )
+        await qclient.upsert("metrics-docs", points=[models.PointStruct(
+            id=1, vector=[1.0, 0.0],
+            payload={"pagecontent": "page  one", "metadata": {"filename": "a.md", "page_number": 1}},
+        )])
+
+    asyncio.run(setup())
+    monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", qclient)
+    monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client",
+                        instrument_embedding_client(FakeAsyncProvider(), "test-endpoint"))
+    monkeypatch.setattr(app.main, "search_registry", SearchSystemRegistry(AsyncSearchSystem))
+    monkeypatch.setattr(app.main.SearchSystem, "_page_cache", app.main.PageCache())
+    return TestClient(app.main.app)
+
+
+class TestMetricsEndpoint:
+    """Test /metrics exposition after a search."""
+
+    def test_stage_histograms_and_cache_stats(self, http):
+        response = http.post("/search", json={"collection_name": "metrics-docs", "search_queries": ["q"]})
+        assert response.status_code == 200
+        text = http.get("/metrics").text
+
+        for stage in ("embed", "vector_search", "context", "clean", "assemble"):
+            assert f'search_stage_duration_seconds_count{{collection="metrics-docs",stage="{stage}"}}' in text
+        assert 'embedding_provider_calls_total{provider="test-endpoint"} 1.0' in text
+        assert 'cache_hit_ratio{cache="page"}' in text
+        assert 'http_request_duration_seconds_count{method="POST",path="/search",status="200"}' in text
+        assert 'http_requests_in_flight{path="/metrics"} 1.0' in text
+
+    def test_unresolved_collection_is_labelled_other(self):
+        """Names that never resolved to a collection must not create label values."""
+        with stage_timer("embed", "never-resolved-collection"):
+            pass
+
+        assert sample("search_stage_duration_seconds_count", stage="embed",
+                      collection="never-resolved-collection") == 0
+        assert sample("search_stage_duration_seconds_count", stage="embed", collection="other") >= 1
+
+
+class TestCollectionLabels:
+    """Test the bounded collection label set."""
+
+    def test_caps_distinct_values(self):
+        labels = CollectionLabels(max_values=2)
+        for name in ("a", "b", "c"):
+            labels.admit(name)
+
+        assert [labels.label(name) for name in ("a", "b", "c", "d")] == ["a", "b", "other", "other"]
+        labels.clear()
+        assert labels.label("a") == "other"
+
+
+class TestRequestTimings:
+    """Test per-request timings (Server-Timing header and timings block)."""
+
+    def test_stage_timer_records_into_current_request(self):
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            with stage_timer("embed", "docs"):
+                pass
+            with stage_timer("embed", "docs"):
+                pass
+            count_request_event("context_fetches", 2)
+        finally:
+            request_timings.reset(token)
+
+        assert set(timings.durations) == {"embed"}
+        assert timings.as_dict()["context_fetches"] == 2
+        header = timings.server_timing()
+        assert header.startswith("embed;dur=")
+        assert 'context_fetches;desc="2"' in header
+        assert "total;dur=" in header
+
+    def test_no_current_request_is_ignored(self):
+        with stage_timer("embed", "docs"):
+            count_request_event("context_fetches")
+        assert request_timings.get() is None
+
+    def test_server_timing_header_and_timings_block(self, http):
+        response = http.post("/search", json={
+            "collection_name": "metrics-docs", "search_queries": ["q"], "include_timings": True
+        })
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["results"][0][0]["combined_page"] == "page one"
+        timings = body["timings"]
+        for stage in ("embed", "vector_search", "context", "clean", "assemble", "serialize"):
+            assert timings[f"{stage}_ms"] >= 0
+        assert timings["context_fetches"] == 1
+        assert timings["total_ms"] >= timings["embed_ms"]
+
+        header = response.headers["Server-Timing"]
+        for stage in ("embed", "vector_search", "context", "serialize", "total"):
+            assert f"{stage};dur=" in header
+        assert 'context_fetches;desc="1"' in header
+
+    def test_timings_block_is_optional(self, http):
+        response = http.post("/search", json={"collection_name": "metrics-docs", "search_queries": ["q"]})
+
+        assert set(response.json()) == {"results"}
+        assert "Server-Timing" in response.headers
@@ -0,0 +1,60 @@
+"""
+Unit tests for the cleaned page cache (app.search.page_cache).
+"""
+
+from app.search.page_cache import PageCache
+
+
+def page(number, text="text"):
+    return {"pagecontent": text, "metadata": {"filename": "a.md", "page_number": number}}
+
+
+class TestPageCache:
+    """Test lookups, absent pages, eviction and invalidation."""
+
+    def test_get_returns_found_and_missing(self):
+        cache = PageCache()
+        cache.put_pages("dev", "content", "a.md", [1, 2, 3], [page(1), page(2)])
+
+        found, missing = cache.get_pages("dev", "content", "a.md", [1, 2, 3, 4])
+
+        assert [p["metadata"]["page_number"] for p in found] == [1, 2]
+        # Page 3 was requested but absent: cached as absent, not missing
+        assert missing == [4]
+
+    def test_scopes_are_isolated(self):
+        cache = PageCache()
+        cache.put_pages("dev", "content", "a.md", [1], [page(1)])
+
+        assert cache.get_pages("prod", "content", "a.md", [1]) == ([], [1])
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        cache = PageCache(max_bytes=3 * (256 + 4))
+        cache.put_pages("dev", "content", "a.md", [1, 2, 3], [page(n) for n in (1, 2, 3)])
+        cache.get_pages("dev", "content", "a.md", [1])
+        cache.put_pages("dev", "content", "a.md", [4], [page(4)])
+
+        assert cache.get_pages("dev", "content", "a.md", [2])[1] == [2]
+        assert cache.get_pages("dev", "content", "a.md", [1])[1] == []
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("app.search.page_cache.time.monotonic", lambda: now[0])
+        cache = PageCache(ttl_seconds=5)
+        cache.put_pages("dev", "content", "a.md", [1], [page(1)])
+
+        now[0] += 6
+        assert cache.get_pages("dev", "content", "a.md", [1]) == ([], [1])
+        assert len(cache) == 0
+
+    def test_invalidate_collection(self):
+        cache = PageCache()
+        cache.put_pages("dev", "content", "a.md", [1, 2], [page(1), page(2)])
+        cache.put_pages("prod", "content", "a.md", [1], [page(1)])
+        cache.put_pages("dev", "other", "a.md", [1], [page(1)])
+
+        assert cache.invalidate("content", scope="prod") == 1
+        assert cache.invalidate("content") == 2
+        assert len(cache) == 1
+        assert cache.stats()["bytes"] == 256 + 4
@@ -0,0 +1,29 @@
+"""
+Unit tests for payload selectors (app.search.projection).
+"""
+
+from qdrant_client import models
+
+from app.search.projection import PAGE_KEY_FIELDS, hit_payload_selector, payload_selector
+
+
+class TestPayloadSelector:
+    """Test include/exclude handling and stage selectors."""
+
+    def test_defaults_to_full_payload(self):
+        assert payload_selector() is True
+
+    def test_include_adds_required_fields(self):
+        assert payload_selector(["source"], required=["metadata.filename"]) == ["source", "metadata.filename"]
+
+    def test_exclude_never_drops_required_fields(self):
+        selector = payload_selector(exclude=["pagecontent", "metadata"], required=PAGE_KEY_FIELDS)
+
+        assert selector == models.PayloadSelectorExclude(exclude=["pagecontent"])
+        assert payload_selector(exclude=["metadata.page_number"], required=PAGE_KEY_FIELDS) is True
+
+    def test_page_hits_only_request_metadata(self):
+        assert hit_payload_selector("page", include=["source"]) == ["metadata"]
+
+    def test_unknown_layout_keeps_page_keys(self):
+        assert hit_payload_selector(None, include=["source"]) == ["source", *PAGE_KEY_FIELDS]
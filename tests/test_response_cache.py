@@ -0,0 +1,350 @@
+"""
+Unit tests for the exact response cache (app.search.response_cache) and
+its use by /search.
+
+The Redis-protocol backend runs against RespStandIn, a minimal local RESP2
+server implementing the commands the backend uses.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from qdrant_client import AsyncQdrantClient, models
+
+import app.main
+from app.main import AsyncSearchSystem
+from app.search.registry import SearchSystemRegistry
+from app.search.response_cache import (
+    InMemoryResponseBackend, RespResponseBackend, ResponseCache, ResponseCacheError
+)
+
+
+class RespStandIn:
+    """Local RESP2 server with GET, SET [PX], INCR, AUTH, SELECT and PING."""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.connections = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        authenticated = self.password is None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                command = args[0].decode().upper()
+                self.commands.append(command)
+                if command == "AUTH":
+                    authenticated = args[1].decode() == self.password
+                    writer.write(b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n")
+                elif not authenticated:
+                    writer.write(b"-NOAUTH Authentication required\r\n")
+                elif command in ("PING", "SELECT"):
+                    writer.write(b"+OK\r\n")
+                elif command == "GET":
+                    value, expires_at = self.data.get(args[1], (None, None))
+                    if value is None or (expires_at is not None and time.monotonic() > expires_at):
+                        writer.write(b"$-1\r\n")
+                    else:
+                        writer.write(b"$%d\r\n%s\r\n" % (len(value), value))
+                elif command == "SET":
+                    expires_at = None
+                    if len(args) == 5 and args[3].upper() == b"PX":
+                        expires_at = time.monotonic() + int(args[4]) / 1000
+                    self.data[args[1]] = (args[2], expires_at)
+                    writer.write(b"+OK\r\n")
+                elif command == "INCR":
+                    value = int(self.data.get(args[1], (b"0", None))[0]) + 1
+                    self.data[args[1]] = (str(value).encode(), None)
+                    writer.write(b":%d\r\n" % value)
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def marker():
+    return "100-100-1"
+
+
+class TestInMemoryResponseBackend:
+    """Test expiry, byte budget and counters."""
+
+    def test_expiry_and_lru_budget(self):
+        async def run():
+            backend = InMemoryResponseBackend(max_bytes=10)
+            await backend.set("a", b"12345", ttl_seconds=60)
+            await backend.set("b", b"12345")
+            await backend.get("a")
+            await backend.set("c", b"123")
+            assert await backend.get("b") is None
+            assert await backend.get("a") == b"12345"
+
+            await backend.set("d", b"1", ttl_seconds=0.01)
+            await asyncio.sleep(0.02)
+            assert await backend.get("d") is None
+            assert await backend.incr("gen") == 1
+            assert await backend.get_counter("gen") == 1
+            return backend.stats()
+
+        assert asyncio.run(run())["evictions"] == 1
+
+
+class TestResponseCache:
+    """Test keys, freshness, stale-while-revalidate and versioning."""
+
+    def test_key_is_canonical_and_versioned(self):
+        request = {"collection": "content", "queries": ["q"], "filter": {"a": {"match_value": 1}}}
+        reordered = {"filter": {"a": {"match_value": 1}}, "queries": ["q"], "collection": "content"}
+
+        assert ResponseCache.make_key(request, "v1") == ResponseCache.make_key(reordered, "v1")
+        assert ResponseCache.make_key(request, "v1") != ResponseCache.make_key(request, "v2")
+        assert ResponseCache.make_key(request, "v1") != ResponseCache.make_key({**request, "limit": 3}, "v1")
+
+    def test_fresh_stale_and_expired(self, monkeypatch):
+        async def run():
+            cache = ResponseCache(InMemoryResponseBackend(), ttl_seconds=10, stale_seconds=20)
+            now = time.time()
+            await cache.set("k", b"[1]")
+            fresh = await cache.get("k")
+            monkeypatch.setattr(time, "time", lambda: now + 15)
+            stale = await cache.get("k")
+            monkeypatch.setattr(time, "time", lambda: now + 31)
+            expired = await cache.get("k")
+            return fresh, stale, expired, cache.stats()
+
+        fresh, stale, expired, stats = asyncio.run(run())
+        assert fresh == (b"[1]", ResponseCache.FRESH)
+        assert stale == (b"[1]", ResponseCache.STALE)
+        assert expired == (None, None)
+        assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (2, 1, 1)
+
+    def test_refresh_runs_once_per_key(self):
+        calls = []
+
+        async def render():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"[2]"
+
+        async def run():
+            cache = ResponseCache(InMemoryResponseBackend())
+            assert cache.refresh("k", render)
+            assert not cache.refresh("k", render)
+            await asyncio.gather(*cache._tasks)
+            return await cache.get("k"), cache.refreshes
+
+        assert asyncio.run(run()) == ((b"[2]", ResponseCache.FRESH), 1)
+        assert len(calls) == 1
+
+    def test_version_polled_and_bumped_by_invalidate(self):
+        polls = []
+
+        async def counting_marker():
+            polls.append(1)
+            return "7-7-1"
+
+        async def run():
+            cache = ResponseCache(InMemoryResponseBackend(), version_poll_seconds=60)
+            first = await asyncio.gather(*[
+                cache.collection_version("dev", "content", counting_marker) for _ in range(5)
+            ])
+            await cache.invalidate("content")
+            second = await cache.collection_version("dev", "content", counting_marker)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert set(first) == {"7-7-1/g0"}
+        assert second == "7-7-1/g1"
+        assert len(polls) == 2
+
+    def test_backend_errors_are_misses(self):
+        class BrokenBackend(InMemoryResponseBackend):
+            async def get(self, key):
+                raise ResponseCacheError("down")
+
+            async def set(self, key, value, ttl_seconds=None):
+                raise ResponseCacheError("down")
+
+        async def run():
+            cache = ResponseCache(BrokenBackend())
+            await cache.set("k", b"[1]")
+            return await cache.get("k"), cache.errors
+
+        assert asyncio.run(run()) == ((None, None), 2)
+
+
+class TestRespResponseBackend:
+    """Test the Redis-protocol backend against a local stand-in."""
+
+    def test_get_set_incr_and_connection_reuse(self):
+        async def run():
+            server = RespStandIn(password="s3cret")
+            port = await server.start()
+            backend = RespResponseBackend(f"redis://:s3cret@127.0.0.1:{port}/2", prefix="t:")
+            try:
+                assert await backend.get("missing") is None
+                await backend.set("k", b"binary\r\nvalue", ttl_seconds=60)
+                value = await backend.get("k")
+                counts = [await backend.incr("gen") for _ in range(3)]
+                await backend.set("short", b"x", ttl_seconds=0.01)
+                await asyncio.sleep(0.02)
+                expired = await backend.get("short")
+            finally:
+                await backend.close()
+                await server.stop()
+            return value, counts, expired, server
+
+        value, counts, expired, server = asyncio.run(run())
+        assert value == b"binary\r\nvalue"
+        assert counts == [1, 2, 3]
+        assert expired is None
+        assert b"t:k" in server.data
+        assert server.connections == 1
+        assert server.commands[:2] == ["AUTH", "SELECT"]
+
+    def test_replicas_share_entries_and_invalidation(self):
+        async def run():
+            server = RespStandIn()
+            port = await server.start()
+            url = f"redis://127.0.0.1:{port}"
+            replica_a = ResponseCache(RespResponseBackend(url), version_poll_seconds=0)
+            replica_b = ResponseCache(RespResponseBackend(url), version_poll_seconds=0)
+            try:
+                key_a = ResponseCache.make_key({"q": 1}, await replica_a.collection_version("dev", "c", marker))
+                await replica_a.set(key_a, b"[1]")
+                key_b = ResponseCache.make_key({"q": 1}, await replica_b.collection_version("dev", "c", marker))
+                shared = await replica_b.get(key_b)
+
+                await replica_a.invalidate("c")
+                version_b = await replica_b.collection_version("dev", "c", marker)
+            finally:
+                await replica_a.close()
+                await replica_b.close()
+                await server.stop()
+            return key_a == key_b, shared, version_b
+
+        same_key, shared, version_b = asyncio.run(run())
+        assert same_key
+        assert shared == (b"[1]", ResponseCache.FRESH)
+        assert version_b.endswith("/g1")
+
+    def test_unreachable_server_raises_cache_error(self):
+        async def run():
+            server = RespStandIn()
+            port = await server.start()
+            await server.stop()
+            backend = RespResponseBackend(f"redis://127.0.0.1:{port}", timeout_seconds=0.5)
+            with pytest.raises(ResponseCacheError):
+                await backend.get("k")
+
+        asyncio.run(run())
+
+    def test_rejects_other_schemes(self):
+        with pytest.raises(ValueError):
+            RespResponseBackend("http://localhost:6379")
+
+
+@pytest.fixture
+def http(monkeypatch):
+    """TestClient with an in-process response cache over an in-memory collection 'cached-docs'."""
+    qclient = AsyncQdrantClient(":memory:")
+
+    async def setup():
+        await qclient.create_collection(
+            "cached-docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+        )
+        await qclient.upsert("cached-docs", points=[models.PointStruct(
+            id=1, vector=[1.0, 0.0],
+            payload={"pagecontent": "page one", "metadata": {"filename": "a.md", "page_number": 1}},
+        )])
+
+    class FakeAsyncEmbedder:
+        async def embed(self, texts):
+            return [[1.0, 0.0] for _ in texts]
+
+        async def embed_one(self, text):
+            return [1.0, 0.0]
+
+    asyncio.run(setup())
+    monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", qclient)
+    monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", FakeAsyncEmbedder())
+    monkeypatch.setattr(app.main, "search_registry", SearchSystemRegistry(AsyncSearchSystem))
+    monkeypatch.setattr(app.main, "response_cache", ResponseCache(
+        InMemoryResponseBackend(), version_poll_seconds=0
+    ))
+    return TestClient(app.main.app), qclient
+
+
+class TestSearchResponseCache:
+    """Test /search answers from the response cache."""
+
+    REQUEST = {"collection_name": "cached-docs", "search_queries": ["q"]}
+
+    def test_identical_request_hits_until_collection_changes(self, http, monkeypatch):
+        client, qclient = http
+        first = client.post("/search", json=self.REQUEST)
+        assert first.headers["x-cache"] == "MISS"
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("search should be served from the cache")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(AsyncSearchSystem, "batch_search", fail)
+            second = client.post("/search", json=self.REQUEST)
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert "response_cache_hits" in second.headers["server-timing"]
+
+        # Different body: different key
+        assert client.post("/search", json={**self.REQUEST, "limit": 2}).headers["x-cache"] == "MISS"
+
+        # New points change the collection version
+        asyncio.run(qclient.upsert("cached-docs", points=[models.PointStruct(
+            id=2, vector=[0.9, 0.1],
+            payload={"pagecontent": "page two", "metadata": {"filename": "a.md", "page_number": 2}},
+        )]))
+        third = client.post("/search", json=self.REQUEST)
+        assert third.headers["x-cache"] == "MISS"
+        assert "page two" in third.text
+
+    def test_invalidate_endpoint_bumps_generation(self, http):
+        client, _ = http
+        client.post("/search", json=self.REQUEST)
+        assert client.post("/search", json=self.REQUEST).headers["x-cache"] == "HIT"
+
+        assert client.post("/cache/invalidate", json={"collection_name": "cached-docs"}).status_code == 200
+        assert client.post("/search", json=self.REQUEST).headers["x-cache"] == "MISS"
+
+    def test_custom_qdrant_parameters_bypass_cache(self, http, monkeypatch):
+        client, qclient = http
+
+        async def create(cls, *args, **kwargs):
+            system = AsyncSearchSystem(*args, **kwargs)
+            system.qclient = qclient
+            return system
+
+        monkeypatch.setattr(AsyncSearchSystem, "create", classmethod(create))
+        response = client.post("/search", json={**self.REQUEST, "qdrant_url": "http://other:6333"})
+        assert response.status_code == 200
+        assert "x-cache" not in response.headers
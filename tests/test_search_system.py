@@ -0,0 +1,825 @@
+"""
+Unit tests for the search pipeline in app.main.
+
+Runs SearchSystem and AsyncSearchSystem against an in-memory Qdrant
+collection seeded with page-structured documents and a deterministic
+fake embedding provider.
+"""
+
+import asyncio
+import hashlib
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+import app.main
+from app.main import AsyncSearchSystem, SearchSystem
+from app.metrics import RequestTimings, request_timings
+from app.search.client_pool import ClientPool
+from app.search.page_cache import PageCache
+from app.search.point_ids import assign_page_point_ids, page_point_id
+from app.search.registry import SearchSystemRegistry
+from app.search.semantic_cache import SemanticResultCache
+from app.search.sparse import index_sparse_vectors, sparse_vectors_config
+
+COLLECTION = "content"
+DIM = 8
+FILES = {"manual-a.md": 6, "manual-b.md": 4}
+
+
+def fake_vector(text: str):
+    """Deterministic unit-ish vector derived from the text hash."""
+    digest = hashlib.sha256(text.encode()).digest()
+    return [b / 255.0 + 0.01 for b in digest[:DIM]]
+
+
+class FakeEmbeddingClient:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [fake_vector(t) for t in texts]
+
+    def embed_one(self, text):
+        self.calls.append([text])
+        return fake_vector(text)
+
+
+class FakeAsyncEmbeddingClient(FakeEmbeddingClient):
+    async def embed(self, texts):
+        return FakeEmbeddingClient.embed(self, texts)
+
+    async def embed_one(self, text):
+        return FakeEmbeddingClient.embed_one(self, text)
+
+
+def seed_points():
+    points = []
+    point_id = 0
+    for filename, pages in FILES.items():
+        for page in range(1, pages + 1):
+            text = f"{filename} page {page}"
+            points.append(models.PointStruct(
+                id=point_id,
+                vector=fake_vector(text),
+                payload={
+                    "pagecontent": f"content   of {text}  \n",
+                    "metadata": {"filename": filename, "page_number": page},
+                },
+            ))
+            point_id += 1
+    return points
+
+
+@pytest.fixture
+def sync_system(monkeypatch):
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION,
+        vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+    )
+    client.upsert(COLLECTION, points=seed_points())
+    monkeypatch.setattr(SearchSystem, "_qdrant_pool_dev", client)
+    monkeypatch.setattr(SearchSystem, "_embedding_client", FakeEmbeddingClient())
+    return SearchSystem(collection_name=COLLECTION, context_window_size=1)
+
+
+@pytest.fixture
+def hybrid_system(monkeypatch):
+    """Sync system on a collection with a populated BM25 sparse vector."""
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION,
+        vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+        sparse_vectors_config=sparse_vectors_config(),
+    )
+    client.upsert(COLLECTION, points=seed_points())
+    # manual-a.md page 5 is the only page mentioning the error code
+    client.set_payload(COLLECTION, {"pagecontent": "Upgrade fails with error E1042"}, points=[4])
+    index_sparse_vectors(client, COLLECTION)
+    monkeypatch.setattr(SearchSystem, "_qdrant_pool_dev", client)
+    monkeypatch.setattr(SearchSystem, "_embedding_client", FakeEmbeddingClient())
+    return SearchSystem(collection_name=COLLECTION, context_window_size=0)
+
+
+def clustered_points(query):
+    """
+    Seed points where manual-a.md pages 1-3 are near-duplicates and
+    manual-b.md page 1 is a little less relevant but points elsewhere.
+    """
+    q = np.array(fake_vector(query))
+    q /= np.linalg.norm(q)
+    basis = [q]
+    for axis in range(DIM):  # Gram-Schmidt: directions orthogonal to the query
+        v = np.eye(DIM)[axis] - sum((np.eye(DIM)[axis] @ b) * b for b in basis)
+        if np.linalg.norm(v) > 1e-6:
+            basis.append(v / np.linalg.norm(v))
+    _, e2, e3, e4 = basis[:4]
+    vectors = {
+        0: np.cos(0.5) * q + np.sin(0.5) * e2 + 0.01 * e4,
+        1: np.cos(0.5) * q + np.sin(0.5) * e2 + 0.02 * e4,
+        2: np.cos(0.5) * q + np.sin(0.5) * e2 + 0.03 * e4,
+        6: np.cos(0.7) * q + np.sin(0.7) * e3,
+    }
+    points = seed_points()
+    for point in points:
+        point.vector = vectors.get(point.id, -q).tolist()
+    return points
+
+
+@pytest.fixture
+def clustered_system(monkeypatch):
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION,
+        vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+    )
+    client.upsert(COLLECTION, points=clustered_points("clustered query"))
+    monkeypatch.setattr(SearchSystem, "_qdrant_pool_dev", client)
+    monkeypatch.setattr(SearchSystem, "_embedding_client", FakeEmbeddingClient())
+    return SearchSystem(collection_name=COLLECTION, context_window_size=1)
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    client = AsyncQdrantClient(":memory:")
+
+    async def setup():
+        await client.create_collection(
+            COLLECTION,
+            vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+        )
+        await client.upsert(COLLECTION, points=seed_points())
+
+    asyncio.run(setup())
+    monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", client)
+    monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", FakeAsyncEmbeddingClient())
+    return client
+
+
+class TestSearchSystem:
+    """Test the sync search pipeline."""
+
+    def test_batch_search_returns_context_window(self, sync_system):
+        """Exact-match query should return the hit page with its neighbours."""
+        results = sync_system.batch_search(["manual-a.md page 3"], filter=None, limit=1)
+
+        assert len(results) == 1
+        hit = results[0][0]
+        assert hit["filename"] == "manual-a.md"
+        assert hit["center_page"] == 3
+        assert hit["page_numbers"] == [2, 3, 4]
+
+    def test_batch_search_deduplicates_pages_within_query(self, sync_system):
+        """Pages already returned for a query should not repeat in later hits."""
+        results = sync_system.batch_search(["manual-a.md page 3"], filter=None, limit=5)
+
+        seen = []
+        for hit in results[0]:
+            for page in hit["page_numbers"]:
+                seen.append((hit["filename"], page))
+        assert len(seen) == len(set(seen))
+
+    def test_batch_search_embeds_all_queries_in_one_call(self, sync_system):
+        """All search_queries should be embedded with a single provider call."""
+        queries = ["manual-a.md page 1", "manual-a.md page 2", "manual-b.md page 3"]
+        sync_system.batch_search(queries, filter=None, limit=1)
+
+        assert sync_system.embedding_client.calls == [queries]
+
+    def test_context_fetched_once_per_file(self, sync_system, monkeypatch):
+        """Context retrieval should cost one scroll per distinct file, not one per hit."""
+        calls = []
+        original_scroll = sync_system.qclient.scroll
+
+        def counting_scroll(**kwargs):
+            calls.append(kwargs)
+            return original_scroll(**kwargs)
+
+        monkeypatch.setattr(sync_system.qclient, "scroll", counting_scroll)
+        queries = ["manual-a.md page 2", "manual-a.md page 5", "manual-b.md page 1"]
+        results = sync_system.batch_search(queries, filter=None, limit=4)
+
+        assert sum(len(r) for r in results) == 12
+        assert len(calls) == len({hit["filename"] for r in results for hit in r})
+
+    def test_context_ignores_files_containing_the_filename(self, sync_system):
+        """Pages of a file whose name contains the hit filename must not leak in."""
+        sync_system.qclient.upsert(COLLECTION, points=[models.PointStruct(
+            id=100,
+            vector=fake_vector("other"),
+            payload={
+                "pagecontent": "backup page",
+                "metadata": {"filename": "manual-a.md.bak", "page_number": 3},
+            },
+        )])
+
+        results = sync_system.batch_search(["manual-a.md page 3"], filter=None, limit=1)
+
+        assert "backup page" not in results[0][0]["combined_page"]
+
+    def test_iter_batch_search_matches_batch_search(self, sync_system):
+        """The generator should yield the same per-query results, one query at a time."""
+        queries = ["manual-a.md page 2", "manual-a.md page 3", "manual-b.md page 1"]
+        expected = sync_system.batch_search(queries, filter=None, limit=2)
+
+        assert list(sync_system.iter_batch_search(queries, filter=None, limit=2)) == expected
+
+    def test_page_hits_fetch_metadata_only(self, sync_system, monkeypatch):
+        """Once the layout is known, hits should not ship pagecontent; results stay the same."""
+        queries = ["manual-a.md page 3", "manual-b.md page 2"]
+        expected = sync_system.batch_search(queries, filter=None, limit=2)
+        assert sync_system.collection_info.layout == "page"
+
+        requests = []
+        original = sync_system.qclient.query_batch_points
+
+        def recording_query(**kwargs):
+            requests.extend(kwargs["requests"])
+            return original(**kwargs)
+
+        monkeypatch.setattr(sync_system.qclient, "query_batch_points", recording_query)
+
+        assert sync_system.batch_search(queries, filter=None, limit=2) == expected
+        assert all(r.with_payload == ["metadata"] for r in requests)
+
+    def test_payload_include_for_generic_hits(self, sync_system):
+        """Caller include fields should limit the payload returned for generic hits."""
+        sync_system.qclient.upsert(COLLECTION, points=[models.PointStruct(
+            id=200,
+            vector=fake_vector("generic"),
+            payload={"source": "generic.md", "metadata": {"team": "docs", "owner": "x"}},
+        )])
+
+        results = sync_system.batch_search(["generic"], filter=None, limit=1,
+                                           payload_include=["source", "metadata.team"])
+
+        assert results[0][0] == {"score": results[0][0]["score"], "filename": "generic.md",
+                                 "metadata": {"team": "docs"}}
+
+    def test_page_cache_serves_repeated_context(self, sync_system, monkeypatch):
+        """A repeated search should read context pages from the page cache."""
+        sync_system.page_cache = PageCache()
+        expected = sync_system.batch_search(["manual-b.md page 4"], filter=None, limit=1)
+
+        monkeypatch.setattr(sync_system.qclient, "scroll", None)
+        assert sync_system.batch_search(["manual-b.md page 4"], filter=None, limit=1) == expected
+        assert expected[0][0]["combined_page"] == "content of manual-b.md page 3 content of manual-b.md page 4"
+
+    def test_semantic_cache_skips_search_for_cached_queries(self, sync_system, monkeypatch):
+        """Cached queries skip Qdrant; only uncached queries of a batch are searched."""
+        sync_system.semantic_cache = SemanticResultCache(threshold=0.999)
+        first = sync_system.batch_search(["manual-a.md page 2"], filter=None, limit=2)
+
+        searched = []
+        original = sync_system.qclient.query_batch_points
+
+        def query_batch_points(collection_name, requests):
+            searched.append(len(requests))
+            return original(collection_name=collection_name, requests=requests)
+
+        monkeypatch.setattr(sync_system.qclient, "query_batch_points", query_batch_points)
+        results = sync_system.batch_search(["manual-a.md page 2", "manual-b.md page 1"], filter=None, limit=2)
+
+        assert results[0] == first[0]
+        assert results[1] == sync_system.batch_search(["manual-b.md page 1"], filter=None, limit=2)[0]
+        assert searched == [1]
+
+        # Another limit is another partition
+        sync_system.batch_search(["manual-a.md page 2"], filter=None, limit=3)
+        assert searched == [1, 1]
+
+    def test_custom_client_is_closed_explicitly(self, sync_system, monkeypatch):
+        """Custom parameters get a per-instance client that close() releases once."""
+        created = []
+
+        def create(*args, **kwargs):
+            client = QdrantClient(":memory:")
+            created.append(client)
+            return client
+
+        monkeypatch.setattr(SearchSystem, "_create_qdrant_client", staticmethod(create))
+        monkeypatch.setattr(SearchSystem, "_ensure_collection", lambda self: None)
+        system = SearchSystem(collection_name=COLLECTION, qdrant_url="http://qdrant.test:6333",
+                              qdrant_api_key="secret")
+
+        assert system.qclient is created[0] and system.custom_client
+        assert system.flight_scope == ClientPool.make_key("http://qdrant.test:6333", "secret", None)
+        system.close()
+        system.close()
+        assert system.qclient is None
+
+
+class TestHybridSearch:
+    """Test dense + BM25 sparse search fused by Qdrant."""
+
+    def test_hybrid_fusion_env_is_validated(self, monkeypatch):
+        """HYBRID_FUSION accepts rrf/dbsf and names itself when misconfigured."""
+        monkeypatch.setenv("HYBRID_FUSION", "DBSF")
+        assert app.main._hybrid_fusion_from_env() == models.Fusion.DBSF
+        monkeypatch.setenv("HYBRID_FUSION", "weighted")
+        with pytest.raises(ValueError, match="HYBRID_FUSION must be 'rrf' or 'dbsf'"):
+            app.main._hybrid_fusion_from_env()
+
+    def test_hybrid_finds_exact_code_in_one_query(self, hybrid_system, monkeypatch):
+        """The page with the error code should rank first, with one query_batch_points call."""
+        searched = []
+        original = hybrid_system.qclient.query_batch_points
+
+        def query_batch_points(collection_name, requests):
+            searched.append(requests)
+            return original(collection_name=collection_name, requests=requests)
+
+        monkeypatch.setattr(hybrid_system.qclient, "query_batch_points", query_batch_points)
+        results = hybrid_system.batch_search(
+            ["error E1042", "manual-b.md page 2"], filter=None, limit=1, search_mode="hybrid"
+        )
+
+        assert (results[0][0]["filename"], results[0][0]["center_page"]) == ("manual-a.md", 5)
+        assert len(searched) == 1
+        request = searched[0][0]
+        assert isinstance(request.query, models.FusionQuery)
+        assert [prefetch.using for prefetch in request.prefetch] == [None, "bm25"]
+
+    def test_search_mode_env_default_and_filters(self, hybrid_system, monkeypatch):
+        """SEARCH_MODE=hybrid applies by default, and filters restrict both prefetches."""
+        monkeypatch.setattr(app.main, "SEARCH_MODE", "hybrid")
+        only_b = {"metadata.filename": {"match_value": "manual-b.md"}}
+
+        assert hybrid_system.batch_search(["error E1042"], filter=None, limit=1)[0][0]["center_page"] == 5
+        results = hybrid_system.batch_search(["error E1042"], filter=only_b, limit=2)
+        assert {hit["filename"] for hit in results[0]} == {"manual-b.md"}
+
+    def test_hybrid_bypasses_semantic_cache(self, hybrid_system):
+        """Near-identical embeddings can differ in exact terms, so hybrid results are not cached."""
+        hybrid_system.semantic_cache = SemanticResultCache(threshold=0.5)
+        hybrid_system.batch_search(["error E1042"], filter=None, limit=1, search_mode="hybrid")
+
+        assert len(hybrid_system.semantic_cache) == 0
+
+    def test_collection_without_sparse_vector_falls_back_to_dense(self, sync_system):
+        """Hybrid requests on a collection without the sparse vector run a dense search."""
+        queries = ["manual-a.md page 3"]
+        expected = sync_system.batch_search(queries, filter=None, limit=2)
+
+        assert sync_system.batch_search(queries, filter=None, limit=2, search_mode="hybrid") == expected
+
+    def test_async_hybrid_matches_sync(self, hybrid_system, monkeypatch):
+        """The async pipeline should send the same fused query as the sync path."""
+        client = AsyncQdrantClient(":memory:")
+
+        async def run():
+            await client.create_collection(
+                COLLECTION,
+                vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+                sparse_vectors_config=sparse_vectors_config(),
+            )
+            points = hybrid_system.qclient.scroll(COLLECTION, limit=100, with_payload=True, with_vectors=True)[0]
+            await client.upsert(COLLECTION, points=[
+                models.PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points
+            ])
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=0)
+            return await system.batch_search(["error E1042"], filter=None, limit=2, search_mode="hybrid")
+
+        monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", client)
+        monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", FakeAsyncEmbeddingClient())
+        expected = hybrid_system.batch_search(["error E1042"], filter=None, limit=2, search_mode="hybrid")
+        assert asyncio.run(run()) == expected
+
+
+class TestDiversityReranking:
+    """Test MMR reranking of oversampled hits."""
+
+    QUERY = ["clustered query"]
+
+    def test_mmr_spreads_hits_over_documents(self, clustered_system, monkeypatch):
+        """Near-duplicate adjacent pages give way to a hit with its own context."""
+        searched = []
+        original = clustered_system.qclient.query_batch_points
+
+        def query_batch_points(collection_name, requests):
+            searched.append(requests[0])
+            return original(collection_name=collection_name, requests=requests)
+
+        monkeypatch.setattr(clustered_system.qclient, "query_batch_points", query_batch_points)
+        dense = clustered_system.batch_search(self.QUERY, filter=None, limit=2)
+        diverse = clustered_system.batch_search(self.QUERY, filter=None, limit=2, mmr=True, mmr_lambda=0.5)
+
+        assert [hit["filename"] for hit in dense[0]] == ["manual-a.md", "manual-a.md"]
+        assert [hit["filename"] for hit in diverse[0]] == ["manual-a.md", "manual-b.md"]
+        assert diverse[0][1]["center_page"] == 1 and diverse[0][1]["combined_page"]
+        assert (searched[1].limit, searched[1].with_vector) == (2 * app.main.MMR_OVERSAMPLE, True)
+        assert searched[0].with_vector is False
+
+    def test_lambda_one_keeps_relevance_order(self, clustered_system):
+        expected = clustered_system.batch_search(self.QUERY, filter=None, limit=3)
+
+        assert clustered_system.batch_search(self.QUERY, filter=None, limit=3, mmr=True, mmr_lambda=1.0) == expected
+
+    def test_env_default_and_semantic_cache_partition(self, clustered_system, monkeypatch):
+        """MMR_ENABLED applies by default; dense and MMR results are cached apart."""
+        clustered_system.semantic_cache = SemanticResultCache(threshold=0.99)
+        dense = clustered_system.batch_search(self.QUERY, filter=None, limit=2)
+        monkeypatch.setattr(app.main, "MMR_ENABLED", True)
+        monkeypatch.setattr(app.main, "MMR_LAMBDA", 0.5)
+
+        diverse = clustered_system.batch_search(self.QUERY, filter=None, limit=2)
+
+        assert diverse != dense
+        assert diverse[0][1]["filename"] == "manual-b.md"
+        assert clustered_system.batch_search(self.QUERY, filter=None, limit=2, mmr=False) == dense
+
+    def test_async_and_streaming_match_sync(self, clustered_system, monkeypatch):
+        client = AsyncQdrantClient(":memory:")
+
+        async def run():
+            await client.create_collection(
+                COLLECTION,
+                vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+            )
+            await client.upsert(COLLECTION, points=clustered_points(self.QUERY[0]))
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            args = dict(filter=None, limit=2, mmr=True, mmr_lambda=0.5)
+            batch = await system.batch_search(self.QUERY, **args)
+            streamed = [results async for results in system.iter_batch_search(self.QUERY, **args)]
+            return batch, streamed
+
+        monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", client)
+        monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", FakeAsyncEmbeddingClient())
+        expected = clustered_system.batch_search(self.QUERY, filter=None, limit=2, mmr=True, mmr_lambda=0.5)
+
+        assert asyncio.run(run()) == (expected, expected)
+        assert list(clustered_system.iter_batch_search(
+            self.QUERY, filter=None, limit=2, mmr=True, mmr_lambda=0.5
+        )) == expected
+
+
+class TestDeterministicPageIds:
+    """Test page ID migration and ID-based context retrieval."""
+
+    def test_migration_assigns_page_ids(self, sync_system):
+        """Every page point should be re-keyed to uuid5(filename, page_number)."""
+        counts = assign_page_point_ids(sync_system.qclient, COLLECTION, batch_size=3)
+
+        assert counts["migrated"] == sum(FILES.values())
+        points, _ = sync_system.qclient.scroll(COLLECTION, limit=100)
+        assert {str(p.id) for p in points} == {
+            page_point_id(filename, page)
+            for filename, pages in FILES.items()
+            for page in range(1, pages + 1)
+        }
+        assert assign_page_point_ids(sync_system.qclient, COLLECTION)["migrated"] == 0
+
+    def test_migration_rejects_duplicate_pages(self, sync_system):
+        """Two points for the same page must abort the migration before any write."""
+        sync_system.qclient.upsert(COLLECTION, points=[models.PointStruct(
+            id=100,
+            vector=fake_vector("dup"),
+            payload={"pagecontent": "dup", "metadata": {"filename": "manual-a.md", "page_number": 1}},
+        )])
+
+        with pytest.raises(ValueError, match="Duplicate page"):
+            assign_page_point_ids(sync_system.qclient, COLLECTION)
+        assert sync_system.qclient.count(COLLECTION).count == sum(FILES.values()) + 1
+
+    def test_ids_mode_matches_scroll_mode_without_scrolling(self, sync_system, monkeypatch):
+        """CONTEXT_FETCH_MODE=ids should return the same results with a single retrieve."""
+        queries = ["manual-a.md page 2", "manual-b.md page 4"]
+        expected = sync_system.batch_search(queries, filter=None, limit=3)
+        assign_page_point_ids(sync_system.qclient, COLLECTION)
+
+        monkeypatch.setattr(app.main, "CONTEXT_FETCH_MODE", "ids")
+        monkeypatch.setattr(sync_system.qclient, "scroll", None)
+        retrieve_calls = []
+        original_retrieve = sync_system.qclient.retrieve
+
+        def counting_retrieve(**kwargs):
+            retrieve_calls.append(kwargs)
+            return original_retrieve(**kwargs)
+
+        monkeypatch.setattr(sync_system.qclient, "retrieve", counting_retrieve)
+
+        actual = sync_system.batch_search(queries, filter=None, limit=3)
+        # Re-upserted points may change scores of the float32 queries in the last bit
+        def pop_scores(results):
+            return [[hit.pop("score") for hit in hits] for hits in results]
+        assert pop_scores(actual) == [pytest.approx(scores) for scores in pop_scores(expected)]
+        assert actual == expected
+        assert len(retrieve_calls) == 1
+
+
+class TestAsyncSearchSystem:
+    """Test the async search pipeline."""
+
+    def test_async_matches_sync_results(self, sync_system, async_client):
+        """Async pipeline should return the same results as the sync path."""
+        queries = ["manual-a.md page 3", "manual-b.md page 1"]
+
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            return await system.batch_search(queries, filter=None, limit=3)
+
+        expected = sync_system.batch_search(queries, filter=None, limit=3)
+        assert asyncio.run(run()) == expected
+
+    def test_concurrent_searches_share_event_loop(self, async_client):
+        """Many searches should run concurrently on one event loop."""
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            return await asyncio.gather(*(
+                system.batch_search([f"manual-b.md page {n}"], filter=None, limit=1)
+                for n in range(1, 5)
+            ))
+
+        results = asyncio.run(run())
+        assert [r[0][0]["center_page"] for r in results] == [1, 2, 3, 4]
+
+    def test_collection_marker_ignores_segment_count(self, async_client, monkeypatch):
+        """Optimizer segment merges must not flush the response cache."""
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            info = await system.qclient.get_collection(COLLECTION)
+            before = await system.collection_marker()
+
+            async def merged_segments(collection_name):
+                return info.model_copy(update={"segments_count": info.segments_count + 3})
+
+            monkeypatch.setattr(system.qclient, "get_collection", merged_segments)
+            return before, await system.collection_marker()
+
+        before, after = asyncio.run(run())
+        assert before == after
+
+    def test_identical_concurrent_searches_run_once(self, async_client, monkeypatch):
+        """Concurrent identical searches should share one embedding call and one Qdrant query."""
+        embedder = AsyncSearchSystem._async_embedding_client
+        queries = []
+        original = async_client.query_batch_points
+
+        async def counting_query(*args, **kwargs):
+            queries.append(1)
+            await asyncio.sleep(0.01)
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(async_client, "query_batch_points", counting_query)
+
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            same = [system.batch_search(["manual-a.md page 2"], filter=None, limit=2) for _ in range(4)]
+            other = system.batch_search(["manual-a.md page 2"], filter=None, limit=3)
+            return await asyncio.gather(*same, other)
+
+        results = asyncio.run(run())
+
+        assert all(result == results[0] for result in results[:4])
+        assert len(results[4][0]) == 3
+        assert len(queries) == 2
+        # The search with another limit still shares the in-flight embedding call
+        assert embedder.calls == [["manual-a.md page 2"]]
+
+    def test_coalesced_requests_report_shared_stage_timings(self, async_client):
+        """Waiters get the stage timings of the shared call, not an empty block."""
+        async def timed_search(system):
+            timings = RequestTimings()
+            request_timings.set(timings)
+            await system.batch_search(["manual-a.md page 4"], filter=None, limit=2)
+            return timings
+
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            return await asyncio.gather(*(timed_search(system) for _ in range(3)))
+
+        leader, *waiters = asyncio.run(run())
+
+        for timings in (leader, *waiters):
+            assert {"embed", "vector_search", "context", "assemble"} <= set(timings.durations)
+        assert all(timings.counts.get("coalesced_search") == 1 for timings in waiters)
+        assert "coalesced_search" not in leader.counts
+
+    def test_single_flight_can_be_disabled(self, async_client, monkeypatch):
+        monkeypatch.setattr(app.main, "SINGLE_FLIGHT_ENABLED", False)
+        embedder = AsyncSearchSystem._async_embedding_client
+
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            await asyncio.gather(*(system.batch_search(["manual-b.md page 1"], filter=None) for _ in range(3)))
+
+        asyncio.run(run())
+        assert len(embedder.calls) == 3
+
+    def test_async_iter_batch_search(self, sync_system, async_client):
+        """The async generator should yield each query's results in order."""
+        queries = ["manual-a.md page 3", "manual-b.md page 2"]
+
+        async def run():
+            system = await AsyncSearchSystem.create(collection_name=COLLECTION, context_window_size=1)
+            return [results async for results in system.iter_batch_search(queries, filter=None, limit=2)]
+
+        assert asyncio.run(run()) == sync_system.batch_search(queries, filter=None, limit=2)
+
+    def test_custom_params_reuse_pooled_client(self, async_client, monkeypatch):
+        """Requests with the same custom Qdrant parameters should share one client."""
+        created = []
+
+        def factory(*params):
+            created.append(params)
+            return async_client
+
+        monkeypatch.setattr(AsyncSearchSystem, "_client_pool", ClientPool(factory))
+
+        async def run():
+            for _ in range(3):
+                system = await AsyncSearchSystem.create(collection_name=COLLECTION,
+                                                        qdrant_url="http://custom:6333",
+                                                        qdrant_api_key="secret")
+                await system.batch_search(["manual-a.md page 1"], filter=None, limit=1)
+                await system.aclose()
+
+        asyncio.run(run())
+        assert len(created) == 1
+
+    def test_custom_params_conflict_with_production(self, async_client):
+        """Custom Qdrant params and use_production together should be rejected."""
+        with pytest.raises(ValueError, match="Cannot use both"):
+            AsyncSearchSystem(collection_name=COLLECTION, use_production=True,
+                              qdrant_url="http://localhost:6333")
+
+
+class TestSearchSystemRegistry:
+    """Test reuse of warm search systems."""
+
+    def count_exists_calls(self, client, monkeypatch):
+        calls = []
+        original = client.collection_exists
+
+        async def counting_exists(*args, **kwargs):
+            calls.append(args)
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(client, "collection_exists", counting_exists)
+        return calls
+
+    def test_registry_reuses_system_and_skips_checks(self, async_client, monkeypatch):
+        """Repeated requests should reuse one system and check the collection once per TTL."""
+        calls = self.count_exists_calls(async_client, monkeypatch)
+        registry = SearchSystemRegistry(AsyncSearchSystem, ttl_seconds=60)
+
+        async def run():
+            first = await registry.get(COLLECTION)
+            second = await registry.get(COLLECTION)
+            results = await second.batch_search(["manual-a.md page 3"], filter=None, limit=1,
+                                                context_window_size=2)
+            return first, second, results
+
+        first, second, results = asyncio.run(run())
+        assert first is second
+        assert len(calls) == 1
+        assert first.collection_info.vectors_config.size == DIM
+        assert first.collection_info.layout == "page"
+        assert results[0][0]["page_numbers"] == [1, 2, 3, 4, 5]
+
+    def test_registry_revalidates_after_invalidate(self, async_client, monkeypatch):
+        """Invalidated or expired collection info should be checked again."""
+        calls = self.count_exists_calls(async_client, monkeypatch)
+        registry = SearchSystemRegistry(AsyncSearchSystem, ttl_seconds=60)
+
+        async def run():
+            await registry.get(COLLECTION)
+            assert registry.invalidate(COLLECTION) == 1
+            await registry.get(COLLECTION)
+            registry.ttl_seconds = -1
+            await registry.get(COLLECTION)
+
+        asyncio.run(run())
+        assert len(calls) == 3
+
+
+class TestStreamingSearch:
+    """Test NDJSON and SSE streaming of /search."""
+
+    @pytest.fixture
+    def http_client(self, async_client, monkeypatch):
+        monkeypatch.setattr(app.main, "search_registry", SearchSystemRegistry(AsyncSearchSystem))
+        return TestClient(app.main.app)
+
+    def search_body(self, **extra):
+        return {
+            "collection_name": COLLECTION,
+            "search_queries": ["manual-a.md page 3", "manual-b.md page 1"],
+            "limit": 2,
+            "context_window_size": 1,
+            **extra,
+        }
+
+    def test_ndjson_stream(self, http_client):
+        """Each query should arrive as one NDJSON line, followed by a done event."""
+        expected = http_client.post("/search", json=self.search_body()).json()["results"]
+
+        response = http_client.post("/search", json=self.search_body(stream="ndjson"))
+
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["event"] for e in events] == ["result", "result", "done"]
+        assert [e["results"] for e in events[:2]] == expected
+        assert events[1]["query"] == "manual-b.md page 1"
+
+    def test_sse_stream(self, http_client):
+        """SSE mode should send one event per query."""
+        response = http_client.post("/search", json=self.search_body(stream="sse"))
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        messages = [m for m in response.text.split("\n\n") if m]
+        assert [m.splitlines()[0] for m in messages] == ["event: result", "event: result", "event: done"]
+        assert json.loads(messages[0].splitlines()[1][len("data: "):])["query_index"] == 0
+
+    def test_unknown_stream_format_rejected(self, http_client):
+        response = http_client.post("/search", json=self.search_body(stream="xml"))
+
+        assert response.status_code == 422
+
+
+class TestFilenameSearchEndpoint:
+    """Test /search/filenames."""
+
+    @pytest.fixture
+    def loads(self, monkeypatch):
+        """Record filename index loads instead of reading Qdrant."""
+        loads = []
+
+        async def load(request, custom_config):
+            loads.append((request.qdrant_url, request.qdrant_api_key))
+            return set(FILES)
+
+        monkeypatch.setattr(app.main, "_load_collection_filenames", load)
+        monkeypatch.setattr(app.main, "filename_indexes", app.main.FilenameIndexManager())
+        return loads
+
+    def test_index_is_scoped_by_credentials(self, loads):
+        """Cached filenames are only served to callers with the same URL and API key."""
+        http_client = TestClient(app.main.app)
+
+        def search(**connection):
+            body = {"collection_name": COLLECTION, "query": "manual", **connection}
+            return http_client.post("/search/filenames", json=body)
+
+        custom = {"qdrant_url": "http://qdrant:6333", "qdrant_api_key": "secret"}
+        assert search(**custom).json()["total_matches"] == 2
+        search(**custom)
+        search(qdrant_url="http://qdrant:6333", qdrant_api_key="wrong")
+        search(qdrant_api_key="secret")
+        search()
+
+        assert loads == [
+            ("http://qdrant:6333", "secret"), ("http://qdrant:6333", "wrong"), (None, "secret"), (None, None)
+        ]
+
+    def test_list_mode_pages_from_cached_listing(self, monkeypatch):
+        """List pages come from one load of the listing and report the real total."""
+        loads = []
+
+        async def load(request, custom_config):
+            loads.append(request.cursor)
+            return [("manual-a.md", 6), ("manual-b.md", 4), ("notes.md", 1)]
+
+        monkeypatch.setattr(app.main, "_load_filename_counts", load)
+        listings = app.main.FilenameIndexManager(factory=app.main.FilenameListing)
+        monkeypatch.setattr(app.main, "filename_listings", listings)
+        http_client = TestClient(app.main.app)
+        body = {"collection_name": COLLECTION, "mode": "list", "query": "manual", "limit": 1}
+
+        first = http_client.post("/search/filenames", json=body).json()
+        second = http_client.post("/search/filenames", json={**body, "cursor": first["next_cursor"]}).json()
+
+        assert first["filenames"] == [{"filename": "manual-a.md", "pages": 6}]
+        assert second["filenames"] == [{"filename": "manual-b.md", "pages": 4}]
+        assert (first["total_matches"], second["total_matches"], second["next_cursor"]) == (2, 2, None)
+        assert loads == [None]
+
+
+class TestShutdown:
+    """Test application teardown."""
+
+    def test_lifespan_closes_embedding_clients(self, monkeypatch):
+        closed = []
+
+        class ClosingEmbedder(FakeAsyncEmbeddingClient):
+            async def aclose(self):
+                closed.append("async")
+
+        class ClosingSyncEmbedder(FakeEmbeddingClient):
+            def close(self):
+                closed.append("sync")
+
+        monkeypatch.setattr(AsyncSearchSystem, "_async_embedding_client", ClosingEmbedder())
+        monkeypatch.setattr(SearchSystem, "_embedding_client", ClosingSyncEmbedder())
+        monkeypatch.setattr(AsyncSearchSystem, "_async_qdrant_pool_dev", None)
+        with TestClient(app.main.app):
+            pass
+
+        assert closed == ["async", "sync"]
+        assert AsyncSearchSystem._async_embedding_client is None
+        assert SearchSystem._embedding_client is None
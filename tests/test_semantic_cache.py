@@ -0,0 +1,114 @@
+"""
+Unit tests for the semantic result cache (app.search.semantic_cache).
+"""
+
+import math
+import time
+
+import pytest
+
+from app.search.semantic_cache import SemanticResultCache
+
+PARTITION = ("dev", "content", "model", "null", 5)
+
+
+class TestSemanticResultCache:
+    """Test similarity lookups, partitions, eviction, expiry and invalidation."""
+
+    def test_near_duplicate_vector_hits(self):
+        cache = SemanticResultCache(threshold=0.99)
+        cache.put(PARTITION, [1.0, 0.0, 0.0], ["a"])
+
+        # Same direction, different length, plus a small perturbation
+        assert cache.get(PARTITION, [2.0, 0.01, 0.0]) == ["a"]
+        assert cache.get(PARTITION, [0.0, 1.0, 0.0]) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_get_many_picks_most_similar_entry(self):
+        cache = SemanticResultCache(threshold=0.9)
+        cache.put_many(PARTITION, [[1.0, 0.0], [0.0, 1.0]], ["x", "y"])
+
+        assert cache.get_many(PARTITION, [[0.1, 1.0], [1.0, 0.1], [1.0, 1.0]]) == ["y", "x", None]
+
+    def test_partitions_are_isolated(self):
+        cache = SemanticResultCache()
+        cache.put(PARTITION, [1.0, 0.0], ["a"])
+
+        assert cache.get(("prod", "content", "model", "null", 5), [1.0, 0.0]) is None
+        assert cache.get(("dev", "content", "model", "null", 10), [1.0, 0.0]) is None
+
+    def test_matching_vector_replaces_entry(self):
+        cache = SemanticResultCache()
+        cache.put(PARTITION, [1.0, 0.0], ["old"])
+        cache.put(PARTITION, [1.0, 0.0], ["new"])
+
+        assert len(cache) == 1
+        assert cache.get(PARTITION, [1.0, 0.0]) == ["new"]
+
+    def test_lru_eviction_keeps_matrix_consistent(self):
+        cache = SemanticResultCache(max_entries=2, threshold=0.99)
+        cache.put_many(PARTITION, [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], [["x"], ["y"]])
+        cache.get(PARTITION, [1.0, 0.0, 0.0])
+        cache.put(PARTITION, [0.0, 0.0, 1.0], ["z"])
+
+        assert cache.get(PARTITION, [0.0, 1.0, 0.0]) is None
+        assert cache.get(PARTITION, [1.0, 0.0, 0.0]) == ["x"]
+        assert cache.get(PARTITION, [0.0, 0.0, 1.0]) == ["z"]
+        assert cache.stats()["evictions"] == 1
+
+    def test_partition_grows_beyond_initial_rows(self):
+        cache = SemanticResultCache(threshold=0.999)
+        vectors = [[1.0 if i == j else 0.0 for j in range(40)] for i in range(40)]
+        cache.put_many(PARTITION, vectors, list(range(40)))
+
+        assert cache.get_many(PARTITION, vectors) == list(range(40))
+
+    def test_expired_entries_miss(self):
+        cache = SemanticResultCache(ttl_seconds=0.05)
+        cache.put(PARTITION, [1.0, 0.0], ["a"])
+        time.sleep(0.1)
+
+        assert cache.get(PARTITION, [1.0, 0.0]) is None
+        cache.put(PARTITION, [0.0, 1.0], ["b"])
+        assert len(cache) == 1
+
+    def test_expired_best_match_does_not_hide_live_match(self):
+        cache = SemanticResultCache(threshold=0.9, ttl_seconds=0.2)
+        angle = math.radians(40)
+        cache.put(PARTITION, [1.0, 0.0], ["expired"])
+        time.sleep(0.15)
+        cache.put(PARTITION, [math.cos(angle), math.sin(angle)], ["live"])
+        time.sleep(0.1)
+
+        # 15 degrees from the expired entry, 25 degrees (cos 0.906) from the live one
+        query = [math.cos(math.radians(15)), math.sin(math.radians(15))]
+        assert cache.get(PARTITION, query) == ["live"]
+        assert cache.stats()["hits"] == 1
+
+    def test_dimension_change_resets_partition(self):
+        cache = SemanticResultCache()
+        cache.put(PARTITION, [1.0, 0.0], ["a"])
+
+        assert cache.get(PARTITION, [1.0, 0.0, 0.0]) is None
+        cache.put(PARTITION, [1.0, 0.0, 0.0], ["b"])
+        assert cache.get(PARTITION, [1.0, 0.0, 0.0]) == ["b"]
+        assert len(cache) == 1
+
+    def test_invalidate_collection(self):
+        cache = SemanticResultCache()
+        cache.put(PARTITION, [1.0, 0.0], ["a"])
+        cache.put(("prod", "content", "model", "null", 5), [1.0, 0.0], ["b"])
+        cache.put(("dev", "other", "model", "null", 5), [1.0, 0.0], ["c"])
+
+        assert cache.invalidate("content", scope="prod") == 1
+        assert cache.invalidate("content") == 1
+        assert cache.get(PARTITION, [1.0, 0.0]) is None
+        assert cache.get(("dev", "other", "model", "null", 5), [1.0, 0.0]) == ["c"]
+        assert cache.stats()["partitions"] == 1
+
+    def test_rejects_invalid_settings(self):
+        with pytest.raises(ValueError):
+            SemanticResultCache(max_entries=0)
+        with pytest.raises(ValueError):
+            SemanticResultCache(threshold=1.5)
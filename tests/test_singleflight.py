@@ -0,0 +1,91 @@
+"""
+Unit tests for single-flight call deduplication (app.search.singleflight).
+"""
+
+import asyncio
+
+import pytest
+
+from app.search.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical calls."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        async def run():
+            return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert [shared for _, shared in results] == [False, True, True, True, True]
+        assert all(result is results[0][0] for result, _ in results)
+        assert flights.stats() == {"in_flight": 0, "executed": 1, "shared": 4}
+
+    def test_different_keys_run_separately(self):
+        flights = SingleFlight()
+
+        async def run():
+            return await asyncio.gather(
+                flights.do("a", lambda: asyncio.sleep(0, result="a")),
+                flights.do("b", lambda: asyncio.sleep(0, result="b")),
+            )
+
+        assert asyncio.run(run()) == [("a", False), ("b", False)]
+
+    def test_finished_calls_are_not_reused(self):
+        """Sequential calls must each run (no result caching)."""
+        flights = SingleFlight()
+        counter = iter(range(10))
+
+        async def run():
+            first, _ = await flights.do("key", lambda: asyncio.sleep(0, result=next(counter)))
+            second, shared = await flights.do("key", lambda: asyncio.sleep(0, result=next(counter)))
+            return first, second, shared
+
+        assert asyncio.run(run()) == (0, 1, False)
+        assert len(flights) == 0
+
+    def test_exception_is_shared_and_cleared(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        async def run():
+            results = await asyncio.gather(*(flights.do("key", fail) for _ in range(3)), return_exceptions=True)
+            retry, shared = await flights.do("key", lambda: asyncio.sleep(0, result="ok"))
+            return results, retry, shared
+
+        results, retry, shared = asyncio.run(run())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert (retry, shared) == ("ok", False)
+
+    def test_cancelled_waiter_does_not_cancel_others(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.ensure_future(flights.do("key", work))
+            second = asyncio.ensure_future(flights.do("key", work))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(run()) == ("done", True)
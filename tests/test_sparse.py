@@ -0,0 +1,103 @@
+"""
+Unit tests for BM25 sparse vectors (app.search.sparse).
+"""
+
+import pytest
+from qdrant_client import QdrantClient, models
+
+from app.search.sparse import (
+    document_sparse_vector, index_sparse_vectors, query_sparse_vector, sparse_vectors_config, term_index,
+    tokenize
+)
+
+TEXTS = [
+    "Release notes for ECOS 9.3: fixes error E1042 on upgrade.",
+    "ECOS 9.4 release notes and upgrade guide.",
+    "Configuring tunnels and overlay policies.",
+    "Reset the appliance password.",
+]
+
+
+def weights(vector):
+    return dict(zip(vector.indices, vector.values))
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "content",
+        vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE),
+        sparse_vectors_config=sparse_vectors_config(),
+    )
+    client.upsert("content", points=[
+        models.PointStruct(id=index, vector=[1.0, float(index)], payload={"pagecontent": text})
+        for index, text in enumerate(TEXTS)
+    ] + [models.PointStruct(id=99, vector=[1.0, 0.0], payload={"other": "no text"})])
+    return client
+
+
+class TestTokenize:
+    """Test term extraction."""
+
+    def test_keeps_versions_and_codes_whole(self):
+        assert tokenize("ECOS 9.3 error E1042") == ["ecos", "9.3", "9", "3", "error", "e1042"]
+
+    def test_compound_tokens_add_their_parts(self):
+        assert tokenize("ecos-9.3.1 path_to") == [
+            "ecos-9.3.1", "ecos", "9", "3", "1", "path_to", "path", "to"
+        ]
+
+    def test_punctuation_only_text_has_no_terms(self):
+        assert tokenize(" -- ... ") == []
+
+
+class TestSparseVectors:
+    """Test query and document weighting."""
+
+    def test_query_vector_has_unit_weight_per_distinct_term(self):
+        vector = query_sparse_vector("E1042 e1042 reset")
+
+        assert weights(vector) == {term_index("e1042"): 1.0, term_index("reset"): 1.0}
+        assert vector.indices == sorted(vector.indices)
+
+    def test_document_weights_saturate_and_favor_short_documents(self):
+        once = weights(document_sparse_vector("upgrade", avg_length=4))[term_index("upgrade")]
+        twice = weights(document_sparse_vector("upgrade upgrade", avg_length=4))[term_index("upgrade")]
+        long_doc = weights(document_sparse_vector("upgrade " + "x " * 20, avg_length=4))[term_index("upgrade")]
+
+        assert once < twice < 2 * once
+        assert twice < 1.2 + 1  # Bounded by k1 + 1
+        assert long_doc < once
+
+
+class TestIndexSparseVectors:
+    """Test the ingestion helper against an in-memory Qdrant."""
+
+    def test_indexes_text_points_and_keeps_dense_vectors(self, client):
+        counts = index_sparse_vectors(client, "content", batch_size=2)
+
+        assert {key: counts[key] for key in ("scanned", "indexed", "skipped")} == {
+            "scanned": 5, "indexed": 4, "skipped": 1
+        }
+        assert counts["avg_length"] > 0
+        point = client.retrieve("content", [1], with_vectors=True)[0]
+        assert set(point.vector) == {"", "bm25"}
+
+    def test_exact_code_ranks_first(self, client):
+        index_sparse_vectors(client, "content")
+
+        hits = client.query_points(
+            "content", query=query_sparse_vector("E1042"), using="bm25", limit=2
+        ).points
+
+        assert [hit.id for hit in hits] == [0]
+
+    def test_requires_sparse_vector_config(self):
+        client = QdrantClient(":memory:")
+        client.create_collection(
+            "dense", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+        )
+
+        with pytest.raises(ValueError, match="no sparse vector 'bm25'"):
+            index_sparse_vectors(client, "dense")